@@ -0,0 +1,76 @@
+# tests/conftest.py
+import os
+import sys
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zoom_benchmark
+import zoom_utils as utils
+
+
+def benchmark_options(**overrides) -> argparse.Namespace:
+    """Options for the benchmark's fake Zoom server: one small recording file of each kind, served at full speed."""
+    options = {'mp4_mb': 1, 'size_spread': 0, 'm4a_mb': 0, 'vtt_kb': 16, 'latency_ms': 0, 'throttle_mbps': 0,
+               'layout': 'page', 'embed_urls': False, 'port': 0}
+    options.update(overrides)
+    return argparse.Namespace(**options)
+
+
+def start_recording_server(options):
+    """
+    Starts the benchmark's fake Zoom server on a free port. Every request's path and headers are kept in
+    server.requests, and an If-Range that doesn't match the file's ETag gets the whole file, as a real server would.
+    """
+    requests_seen = []
+
+    class RecordingHandler(zoom_benchmark.make_handler(options)):
+        def do_GET(self, head_only=False):
+            requests_seen.append((self.path, dict(self.headers)))
+            if_range = self.headers.get('If-Range')
+            if if_range and 'Range' in self.headers:
+                recording_id, file_name = self.path.strip('/').split('/')[1:3]
+                sizes = dict(zoom_benchmark._media_files(int(recording_id), options))
+                if if_range != f'"{recording_id}-{file_name}-{sizes.get(file_name)}"':
+                    del self.headers['Range']
+            super().do_GET(head_only)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RecordingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.options = options
+    server.requests = requests_seen
+    server.origin = f'http://127.0.0.1:{server.server_address[1]}'
+    return server
+
+
+@pytest.fixture(autouse=True)
+def keep_every_file(monkeypatch):
+    # importing zoom_benchmark applies zoom_downloader's REMOVE_EXTENSIONS, which would skip the .vtt payloads
+    monkeypatch.setattr(utils, 'SKIP_EXTENSIONS', [])
+
+
+@pytest.fixture
+def zoom_server():
+    server = start_recording_server(benchmark_options())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def media_file(zoom_server):
+    """Returns (url, size, ETag, bytes) of one of the fake server's files, by extension."""
+    def describe(extension: str = '.mp4', recording_id: int = 1):
+        file_name, size = next((file_name, size) for file_name, size in zoom_benchmark._media_files(recording_id, zoom_server.options)
+                               if file_name.endswith(extension))
+        header = zoom_benchmark._payload_header(file_name, size)
+        block = zoom_benchmark._pattern_block(recording_id, file_name)
+        trailer = zoom_benchmark._payload_trailer(file_name)
+        payload = zoom_benchmark._payload_range(header, block, 0, size, size, trailer)
+        return f'{zoom_server.origin}/media/{recording_id}/{file_name}', size, f'"{recording_id}-{file_name}-{size}"', payload
+    return describe
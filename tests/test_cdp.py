@@ -0,0 +1,54 @@
+# tests/test_cdp.py
+import types
+
+import zoom_cdp
+import zoom_utils as utils
+
+FIRST_TAB = {'sessionId': 'S1', 'targetInfo': {'targetId': 'T1', 'type': 'page'}, 'waitingForDebugger': False}
+
+
+class FakeConnection:
+    """
+    Stands in for a DevTools connection to a browser with one tab open. Like Chrome, the browser-level
+    Target.setAutoAttach reports that tab once, before the command returns, and never again.
+    """
+
+    def __init__(self):
+        self.listeners = {}
+        self.commands = []
+        self.reported = False
+
+    def on(self, method, callback):
+        self.listeners.setdefault(method, []).append(callback)
+
+    def set_raw_filter(self, method, pattern):
+        pass
+
+    def post(self, method, params=None, session_id=None):
+        self.commands.append((method, params or {}, session_id))
+
+    def send(self, method, params=None, session_id=None, timeout=10):
+        self.post(method, params, session_id)
+        if method == 'Target.setAutoAttach' and session_id is None and not self.reported:
+            self.reported = True
+            for callback in self.listeners.get('Target.attachedToTarget', []):
+                callback(FIRST_TAB, None)
+        return {}
+
+    def attach_to_targets(self):
+        zoom_cdp.CdpConnection.attach_to_targets(self)
+
+
+def test_first_tab_gets_the_block_list_and_network_capture(monkeypatch):
+    connection = FakeConnection()
+    monkeypatch.setattr(zoom_cdp.CdpConnection, 'for_driver', classmethod(lambda cls, driver: connection))
+    monkeypatch.setattr(utils, 'BLOCKED_URL_PATTERNS', ['*.woff2'])
+    driver = types.SimpleNamespace()
+
+    assert utils.start_cdp_listeners(driver) is connection
+
+    first_tab_commands = [(method, params) for method, params, session_id in connection.commands if session_id == 'S1']
+    assert ('Network.setBlockedURLs', {'urls': ['*.woff2']}) in first_tab_commands
+    assert ('Network.enable', {}) in first_tab_commands
+    assert ('Page.enable', {}) in first_tab_commands
+    assert [method for method, _, session_id in connection.commands if session_id is None].count('Target.setAutoAttach') == 1
@@ -0,0 +1,45 @@
+# tests/test_content_index.py
+import os
+import threading
+
+import zoom_utils as utils
+
+PAYLOAD = os.urandom(64 * 1024)
+
+
+def staged(tmp_path, folder_name: str, file_name: str, data: bytes) -> str:
+    folder = tmp_path / 'staging' / folder_name
+    folder.mkdir(parents=True)
+    (folder / file_name).write_bytes(data)
+    return str(folder)
+
+
+def test_identical_file_arriving_while_the_first_is_queued_is_stored_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, 'BACKGROUND_MOVES', True)
+    output = tmp_path / 'output'
+    output.mkdir()
+    # hold the mover, so the first file is still queued when the second one is filed
+    gate = threading.Event()
+    utils.get_background_mover().after_pending(gate.wait)
+
+    assert utils.move_downloads_to_destination(staged(tmp_path, 'a', 'one.bin', PAYLOAD), str(output)) == ['one.bin']
+    assert utils.get_content_index(str(output)).is_pending('one.bin')
+    threading.Timer(0.2, gate.set).start()
+    assert utils.move_downloads_to_destination(staged(tmp_path, 'b', 'two.bin', PAYLOAD), str(output)) == ['two.bin']
+    utils.wait_for_pending_moves()
+
+    assert os.path.samefile(output / 'one.bin', output / 'two.bin')
+    # the index file is reloaded from its appended lines
+    reloaded = utils.ContentIndex(str(output))
+    assert set(reloaded.entries) == {'one.bin', 'two.bin'}
+    assert reloaded.entries['one.bin']['sha256'] == reloaded.entries['two.bin']['sha256'] is not None
+
+
+def test_index_skips_a_line_cut_off_mid_append(tmp_path):
+    (tmp_path / 'a.bin').write_bytes(PAYLOAD)
+    content_index = utils.ContentIndex(str(tmp_path))
+    content_index.add('a.bin', 'f' * 64)
+    with open(content_index.index_path, 'a', encoding='utf-8') as file_handle:
+        file_handle.write('{"name": "b.bi')
+
+    assert utils.ContentIndex(str(tmp_path)).entries['a.bin']['sha256'] == 'f' * 64
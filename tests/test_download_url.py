@@ -0,0 +1,92 @@
+# tests/test_download_url.py
+import os
+
+import requests
+
+import zoom_utils as utils
+
+SEGMENT = 256 * 1024
+
+
+def range_requests(server, url_path: str) -> list:
+    """The Range headers of the GETs for url_path after the one-byte probe."""
+    return [headers.get('Range') for path, headers in server.requests if path == url_path and headers.get('Range') != 'bytes=0-0']
+
+
+def read(path: str) -> bytes:
+    with open(path, 'rb') as file_handle:
+        return file_handle.read()
+
+
+def test_segmented_download_fetches_every_range_once(tmp_path, zoom_server, media_file):
+    url, size, etag, payload = media_file('.mp4')
+    dest_path = str(tmp_path / 'video.mp4')
+
+    assert utils.download_url(requests.Session(), url, dest_path, connections=4, segment_size=SEGMENT)
+
+    assert read(dest_path) == payload
+    expected_ranges = {f'bytes={start}-{min(start + SEGMENT, size) - 1}' for start in range(0, size, SEGMENT)}
+    assert sorted(range_requests(zoom_server, url[len(zoom_server.origin):])) == sorted(expected_ranges)
+    assert not os.path.exists(dest_path + utils.PARTIAL_SUFFIX)
+    assert not os.path.exists(dest_path + utils.RESUME_SIDECAR_SUFFIX)
+
+
+def test_segmented_resume_skips_completed_segments(tmp_path, zoom_server, media_file):
+    url, size, etag, payload = media_file('.mp4')
+    dest_path = str(tmp_path / 'video.mp4')
+    with open(dest_path + utils.PARTIAL_SUFFIX, 'wb') as file_handle:
+        file_handle.write(payload[:SEGMENT])
+        file_handle.truncate(size)
+    utils.write_resume_sidecar(dest_path, {'url': url, 'page_url': None, 'expected_size': size, 'etag': etag,
+                                           'last_modified': None, 'segment_size': SEGMENT, 'completed_segments': [0]})
+
+    assert utils.download_url(requests.Session(), url, dest_path, connections=4, segment_size=SEGMENT)
+
+    assert read(dest_path) == payload
+    fetched = range_requests(zoom_server, url[len(zoom_server.origin):])
+    assert f'bytes=0-{SEGMENT - 1}' not in fetched
+    assert len(fetched) == size // SEGMENT - 1
+
+
+def test_single_stream_resume_appends_with_if_range(tmp_path, zoom_server, media_file):
+    url, size, etag, payload = media_file('.vtt')
+    dest_path = str(tmp_path / 'transcript.vtt')
+    offset = 5000
+    with open(dest_path + utils.PARTIAL_SUFFIX, 'wb') as file_handle:
+        file_handle.write(payload[:offset])
+    utils.write_resume_sidecar(dest_path, {'url': url, 'page_url': None, 'expected_size': size, 'etag': etag,
+                                           'last_modified': None, 'segment_size': None, 'completed_segments': []})
+
+    assert utils.download_url(requests.Session(), url, dest_path, connections=1)
+
+    assert read(dest_path) == payload
+    resume_request = [headers for path, headers in zoom_server.requests if headers.get('Range') == f'bytes={offset}-']
+    assert len(resume_request) == 1 and resume_request[0].get('If-Range') == etag
+
+
+def test_partial_of_a_changed_file_is_discarded(tmp_path, zoom_server, media_file):
+    url, size, etag, payload = media_file('.vtt')
+    dest_path = str(tmp_path / 'transcript.vtt')
+    with open(dest_path + utils.PARTIAL_SUFFIX, 'wb') as file_handle:
+        file_handle.write(b'x' * 5000)
+    utils.write_resume_sidecar(dest_path, {'url': url, 'page_url': None, 'expected_size': size, 'etag': '"an-older-version"',
+                                           'last_modified': None, 'segment_size': None, 'completed_segments': []})
+
+    assert utils.download_url(requests.Session(), url, dest_path, connections=1)
+
+    assert read(dest_path) == payload
+    assert range_requests(zoom_server, url[len(zoom_server.origin):]) == [None]
+
+
+def test_if_range_mismatch_restarts_from_the_beginning(tmp_path, zoom_server, media_file):
+    # the file changed between the probe and the resumed request: the server answers 200 with the whole file
+    url, size, etag, payload = media_file('.vtt')
+    dest_path = str(tmp_path / 'transcript.vtt')
+    with open(dest_path + utils.PARTIAL_SUFFIX, 'wb') as file_handle:
+        file_handle.write(b'x' * 5000)
+    state = {'url': url, 'expected_size': size, 'etag': '"an-older-version"', 'segment_size': None, 'completed_segments': []}
+    remote = {'supports_ranges': True, 'total_size': size, 'etag': etag, 'last_modified': None, 'content_type': 'text/vtt'}
+
+    assert utils._download_single_stream(requests.Session(), url, dest_path, state, remote, timeout=30)
+
+    assert read(dest_path + utils.PARTIAL_SUFFIX) == payload
@@ -0,0 +1,50 @@
+# tests/test_http_fast_path.py
+import os
+
+import requests
+
+import zoom_utils as utils
+from conftest import benchmark_options, start_recording_server
+
+INLINE_DATA_PAGE = r"""<script>
+window.__data__ = {"viewMp4Url":"https:\/\/ssrweb.zoom.us\/replay\/2024\/01\/01\/GMT20240101_Recording.mp4?fid=abc&tid=1",
+"transcriptUrl":"https://ssrweb.zoom.us/replay/GMT20240101_Recording.transcript.vtt",
+"trackingPixel":"https:\/\/ads.example.com\/pixel.mp4",
+"again":"https:\/\/ssrweb.zoom.us\/replay\/2024\/01\/01\/GMT20240101_Recording.mp4?fid=abc&tid=1"};
+</script>"""
+
+
+def test_embedded_urls_are_unescaped_deduplicated_and_filtered_by_host():
+    assert utils.extract_embedded_media_urls(INLINE_DATA_PAGE) == [
+        'https://ssrweb.zoom.us/replay/2024/01/01/GMT20240101_Recording.mp4?fid=abc&tid=1',
+        'https://ssrweb.zoom.us/replay/GMT20240101_Recording.transcript.vtt',
+    ]
+
+
+def test_player_in_iframes_resolves_to_nothing(monkeypatch):
+    # like mpc-edu, the page itself only holds the player's iframe, so the browser has to take over
+    monkeypatch.setattr(utils, 'HTTP_FAST_PATH_MEDIA_HOSTS', ['127.0.0.1'])
+    server = start_recording_server(benchmark_options(layout='nested'))
+    try:
+        assert utils.resolve_share_page_over_http(f'{server.origin}/rec/share/1', session=requests.Session()) == []
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_share_page_with_embedded_urls_downloads_without_a_browser(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, 'HTTP_FAST_PATH_MEDIA_HOSTS', ['127.0.0.1'])
+    server = start_recording_server(benchmark_options(embed_urls=True))
+    try:
+        share_url = f'{server.origin}/rec/share/1'
+        media_urls = utils.resolve_share_page_over_http(share_url, session=requests.Session())
+        assert [media_url.rsplit('/', 1)[-1] for media_url in media_urls] == [
+            'GMT20240101-100001_Recording_1920x1080.mp4', 'GMT20240101-100001_Recording.transcript.vtt']
+
+        downloaded = utils.download_share_over_http(share_url, str(tmp_path), session=requests.Session())
+        assert sorted(downloaded) == sorted(media_url.rsplit('/', 1)[-1] for media_url in media_urls)
+        for file_name in downloaded:
+            assert os.path.getsize(tmp_path / file_name) > 0
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,111 @@
+# tests/test_jobstore.py
+import time
+
+import zoom_utils as utils
+from zoom_jobstore import JobStore
+
+
+def make_jobs(*links, title='Lecture'):
+    return [{'title': title, 'link': link, 'index': position, 'number': position, 'aliases': []}
+            for position, link in enumerate(links, start=1)]
+
+
+def open_store(path, owner, **options):
+    store = JobStore(str(path), **options)
+    # every store in a test lives in this process, so each stands in for another process by its owner
+    store.owner = owner
+    return store
+
+
+def test_claims_in_list_order_until_empty(tmp_path):
+    store = open_store(tmp_path / 'jobs.sqlite', 'host:1')
+    assert store.ingest(make_jobs('L1', 'L2'), str) == 2
+
+    assert [store.claim()['link'], store.claim()['link'], store.claim()] == ['L1', 'L2', None]
+    assert store.counts() == {'leased': 2}
+
+
+def test_expired_lease_is_claimed_by_another_process(tmp_path):
+    first = open_store(tmp_path / 'jobs.sqlite', 'host:1', lease_seconds=0.2)
+    second = open_store(tmp_path / 'jobs.sqlite', 'host:2', lease_seconds=0.2)
+    first.ingest(make_jobs('L1'), str)
+    job = first.claim()
+
+    assert second.claim() is None
+    time.sleep(0.3)
+    reclaimed = second.claim()
+    assert reclaimed['store_id'] == job['store_id'] and reclaimed['attempts'] == 2
+    # the first process lost the link, so neither handing it back nor finishing it touches the new lease
+    first.release(job)
+    assert not first.finish(job, 'failed', error='too late')
+    assert second.counts() == {'leased': 1}
+    assert second.finish(reclaimed, 'done', files=['Lecture_1.mp4'])
+    assert second.counts() == {'done': 1}
+
+
+def test_release_hands_the_link_back_without_using_an_attempt(tmp_path):
+    store = open_store(tmp_path / 'jobs.sqlite', 'host:1')
+    store.ingest(make_jobs('L1'), str)
+    store.release(store.claim())
+
+    assert store.counts() == {'pending': 1}
+    assert store.claim()['attempts'] == 1
+
+
+def test_failed_links_are_retried_until_attempts_run_out(tmp_path):
+    store = open_store(tmp_path / 'jobs.sqlite', 'host:1', max_attempts=2)
+    store.ingest(make_jobs('L1'), str)
+    for _ in range(2):
+        store.finish(store.claim(), 'failed', error='no files')
+        store.ingest(make_jobs('L1'), str)
+
+    assert store.counts() == {'failed': 1}
+
+
+def test_ingest_merges_aliases_of_a_stored_link(tmp_path):
+    store = open_store(tmp_path / 'jobs.sqlite', 'host:1')
+    store.ingest(make_jobs('L1', title='Lecture'), str)
+    jobs = make_jobs('L1', title='Recap')
+    jobs[0]['aliases'] = [{'title': 'Lecture', 'index': 1}, {'title': 'Review', 'index': 2}]
+
+    assert store.ingest(jobs, str) == 0
+    assert store.claim()['aliases'] == [{'title': 'Recap', 'index': 1}, {'title': 'Review', 'index': 2}]
+    # the claim carried every alias, so none is left over for later
+    assert store.take_unlinked_aliases() == []
+
+
+def test_aliases_added_to_a_done_link_are_handed_out_once(tmp_path):
+    store = open_store(tmp_path / 'jobs.sqlite', 'host:1')
+    store.ingest(make_jobs('L1', title='Lecture'), str)
+    store.finish(store.claim(), 'done', files=['Lecture_1.mp4'], size_bytes=10)
+
+    store.ingest(make_jobs('L1', title='Recap'), str)
+    unlinked = store.take_unlinked_aliases()
+    assert [(job['title'], job['aliases'], job['files']) for job in unlinked] == [
+        ('Lecture', [{'title': 'Recap', 'index': 1}], ['Lecture_1.mp4'])]
+    assert store.take_unlinked_aliases() == []
+    store.ingest(make_jobs('L1', title='Recap'), str)
+    assert store.take_unlinked_aliases() == []
+
+
+def test_requeue_files_reopens_the_links_that_made_them(tmp_path):
+    store = open_store(tmp_path / 'jobs.sqlite', 'host:1')
+    store.ingest(make_jobs('L1', 'L2'), str)
+    store.finish(store.claim(), 'done', files=['Lecture_1.mp4'])
+    store.finish(store.claim(), 'done', files=['Lecture_2.mp4'])
+
+    assert store.requeue_files(['Lecture_2.mp4']) == 1
+    assert store.claim()['link'] == 'L2'
+
+
+def test_recordings_sharing_an_id_are_told_apart_by_start_time(tmp_path):
+    share = 'https://a.zoom.us/rec/share/AbC-123'
+    assert utils.normalize_share_id(f'{share}?startTime=1700000000000') == 'AbC-123?startTime=1700000000000'
+    # the same recording, in seconds, on another tenant and with a passcode
+    assert utils.normalize_share_id(f'https://b.zoom.us/rec/play/AbC-123?pwd=x&startTime=1700000000') == \
+        'AbC-123?startTime=1700000000000'
+    assert utils.normalize_share_id(f'{share}?pwd=x') == 'AbC-123'
+
+    store = open_store(tmp_path / 'jobs.sqlite', 'host:1')
+    links = [f'{share}?startTime=1700000000000', f'{share}?startTime=1700003600000', f'{share}?startTime=1700000000&pwd=x']
+    assert store.ingest(make_jobs(*links), utils.normalize_share_id) == 2
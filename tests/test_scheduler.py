@@ -0,0 +1,114 @@
+# tests/test_scheduler.py
+import time
+import queue
+import threading
+
+import pytest
+
+from zoom_scheduler import LinkScheduler
+
+FAILED = {'status': 'failed', 'files': [], 'failure': 'network'}
+DONE = {'status': 'done', 'files': ['Lecture_1.mp4']}
+
+
+def make_queue(*links):
+    job_queue = queue.Queue()
+    for number, link in enumerate(links, start=1):
+        job_queue.put({'title': 'Lecture', 'link': link, 'index': number, 'number': number})
+    return job_queue
+
+
+def test_failed_link_comes_back_after_a_growing_backoff():
+    scheduler = LinkScheduler(make_queue('https://a.zoom.us/rec/1'), max_retries=2, backoff_seconds=0.2, retry_failures=['network'])
+    job = scheduler.get()
+
+    first_delay = scheduler.complete(job, FAILED)
+    assert 0.1 <= first_delay <= 0.2
+    with pytest.raises(queue.Empty):
+        scheduler.get(block=False)
+    retried = scheduler.get()
+    assert retried is job and job['retries'] == 1
+
+    assert 0.2 <= scheduler.complete(job, FAILED) <= 0.4
+    assert scheduler.get() is job
+    # out of retries, so this result is final
+    assert scheduler.complete(job, FAILED) is None
+    with pytest.raises(queue.Empty):
+        scheduler.get()
+
+
+def test_retry_after_outlasts_the_backoff_and_other_failures_are_final():
+    scheduler = LinkScheduler(make_queue('https://a.zoom.us/rec/1', 'https://a.zoom.us/rec/2'), backoff_seconds=0.01,
+                              retry_failures=['rate_limited'])
+    rate_limited = scheduler.get()
+    assert scheduler.complete(rate_limited, {'status': 'failed', 'files': [], 'failure': 'rate_limited', 'retry_after': 5}) == 5
+    assert scheduler.complete(scheduler.get(), FAILED) is None
+    assert scheduler.close() == [rate_limited]
+    assert rate_limited['last_result']['failure'] == 'rate_limited'
+
+
+def test_busy_host_lets_links_for_other_hosts_go_ahead():
+    scheduler = LinkScheduler(make_queue('https://a.zoom.us/rec/1', 'https://a.zoom.us/rec/2', 'https://b.zoom.us/rec/3'),
+                              host_concurrency=1)
+    first = scheduler.get()
+    assert scheduler.get(block=False)['number'] == 3
+    with pytest.raises(queue.Empty):
+        scheduler.get(block=False)
+
+    scheduler.complete(first, DONE)
+    assert scheduler.get(block=False)['number'] == 2
+
+
+def test_link_starts_on_a_host_are_paced():
+    scheduler = LinkScheduler(make_queue('https://a.zoom.us/rec/1', 'https://a.zoom.us/rec/2', 'https://b.zoom.us/rec/3'),
+                              host_links_per_minute=120)
+    assert scheduler.get(block=False)['number'] == 1
+    # a.zoom.us has to wait half a second for its next start, b.zoom.us doesn't
+    assert scheduler.get(block=False)['number'] == 3
+    started = time.monotonic()
+    assert scheduler.get()['number'] == 2
+    assert 0.3 <= time.monotonic() - started <= 1.5
+
+
+class CountingQueue(queue.Queue):
+    """Counts the asks for a link and checks that none is made while the scheduler's lock is held."""
+
+    def __init__(self, scheduler_lock=None):
+        super().__init__()
+        self.asks = 0
+        self.asked_while_locked = False
+        self.scheduler_lock = scheduler_lock
+
+    def get_nowait(self):
+        self.asks += 1
+        if self.scheduler_lock is not None:
+            # another thread stands in for a worker calling complete() meanwhile
+            acquired = []
+            checker = threading.Thread(target=self._try_lock, args=(acquired,))
+            checker.start()
+            checker.join()
+            self.asked_while_locked = acquired != [True]
+        return super().get_nowait()
+
+    def _try_lock(self, acquired: list):
+        acquired.append(self.scheduler_lock.acquire(timeout=1))
+        if acquired[-1]:
+            self.scheduler_lock.release()
+
+
+def test_empty_queue_is_not_asked_again_until_the_poll_interval_passes():
+    job_queue = CountingQueue()
+    job_queue.put({'title': 'Lecture', 'link': 'https://a.zoom.us/rec/1', 'index': 1, 'number': 1})
+    scheduler = LinkScheduler(job_queue, empty_poll_seconds=0.3)
+    job_queue.scheduler_lock = scheduler._condition
+    first = scheduler.get()
+    for _ in range(5):
+        with pytest.raises(queue.Empty):
+            scheduler.get(block=False)
+    assert job_queue.asks == 2 and not job_queue.asked_while_locked
+
+    time.sleep(0.35)
+    with pytest.raises(queue.Empty):
+        scheduler.get(block=False)
+    assert job_queue.asks == 3
+    scheduler.complete(first, DONE)
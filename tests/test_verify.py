@@ -0,0 +1,62 @@
+# tests/test_verify.py
+import pytest
+
+import zoom_verify
+
+FTYP = (24).to_bytes(4, 'big') + b'ftypisom' + (512).to_bytes(4, 'big') + b'isommp41'
+MOOV = (16).to_bytes(4, 'big') + b'moov' + bytes(8)
+MDAT = (8 + 1000).to_bytes(4, 'big') + b'mdat' + bytes(1000)
+LARGE_MDAT = (1).to_bytes(4, 'big') + b'mdat' + (16 + 1000).to_bytes(8, 'big') + bytes(1000)
+VTT = b'WEBVTT\n\n1\n00:00:00.000 --> 00:00:05.000\nHello.\n\n2\n00:00:05.000 --> 00:00:09.500\nGoodbye.\n'
+
+
+def write(tmp_path, file_name: str, data: bytes) -> str:
+    path = tmp_path / file_name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('data', [FTYP + MOOV + MDAT, FTYP + MDAT + MOOV, FTYP + MOOV + LARGE_MDAT],
+                         ids=['moov_first', 'moov_last', 'large_mdat'])
+def test_complete_mp4_passes(tmp_path, data):
+    assert zoom_verify.verify_file(write(tmp_path, 'video.mp4', data)) is None
+
+
+@pytest.mark.parametrize('data, problem', [
+    ((FTYP + MOOV + MDAT)[:-1], "'mdat' box needs"),
+    (FTYP + MOOV + MDAT + b'\x00\x00\x00', 'stray byte'),
+    ((FTYP + MOOV + LARGE_MDAT)[:len(FTYP + MOOV) + 12], 'box header cut off'),
+    (FTYP + MDAT, "no 'moov' box"),
+    (MOOV + MDAT, "doesn't start with an 'ftyp' box"),
+    (FTYP + MOOV + b'\x00\x00\x00\x10\x01\x02\x03\x04' + bytes(8), 'no valid box'),
+    (b'', 'empty file'),
+], ids=['cut_mdat', 'stray_bytes', 'cut_large_box_header', 'no_moov', 'no_ftyp', 'garbage_box', 'empty'])
+def test_truncated_or_damaged_mp4_is_caught(tmp_path, data, problem):
+    assert problem in zoom_verify.verify_file(write(tmp_path, 'audio.m4a', data))
+
+
+def test_complete_vtt_passes(tmp_path):
+    assert zoom_verify.verify_file(write(tmp_path, 'transcript.vtt', VTT)) is None
+    assert zoom_verify.verify_file(write(tmp_path, 'bom.vtt', b'\xef\xbb\xbf' + VTT)) is None
+
+
+@pytest.mark.parametrize('data, problem', [
+    (VTT[:VTT.rindex(b'-->') + 8], 'last cue timing line is cut off'),
+    (VTT[:VTT.rindex(b'Goodbye')], 'last cue has no text'),
+    (b'WEBVTTX\n\n' + VTT[8:], 'no WEBVTT header'),
+], ids=['cut_timing_line', 'cut_cue_text', 'bad_header'])
+def test_truncated_vtt_is_caught(tmp_path, data, problem):
+    assert zoom_verify.verify_file(write(tmp_path, 'transcript.vtt', data)) == problem
+
+
+def test_other_files_are_not_checked(tmp_path):
+    assert zoom_verify.verify_file(write(tmp_path, 'notes.txt', b'')) is None
+
+
+def test_verify_folder_reports_only_damaged_files(tmp_path):
+    write(tmp_path, 'good.mp4', FTYP + MOOV + MDAT)
+    write(tmp_path, 'cut.mp4', (FTYP + MOOV + MDAT)[:200])
+    checked_count, checked_bytes, problems = zoom_verify.verify_folder(str(tmp_path))
+
+    assert checked_count == 2 and checked_bytes == len(FTYP + MOOV + MDAT) + 200
+    assert list(problems) == ['cut.mp4']
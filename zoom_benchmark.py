@@ -0,0 +1,369 @@
+# zoom_benchmark.py
+"""
+Offline benchmark for zoom_downloader. Serves fake Zoom share pages from a local HTTP server (Continue interstitial,
+Download control either in the page or inside nested iframes like mpc-edu, MP4/M4A/VTT payloads with optional
+latency and throttling), runs zoom_downloader.main() against a generated links file and reports links/min, MB/s and
+per-phase latencies.
+
+    python zoom_benchmark.py --links 20 --workers 2 --mp4-mb 50 --latency-ms 100 --throttle-mbps 20
+    python zoom_benchmark.py --links 20 --report bench.json
+    python zoom_benchmark.py --links 20 --compare bench.json   # exits with 1 on a regression
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import zoom_downloader
+import zoom_metrics as metrics
+import zoom_utils as utils
+
+PATTERN_BLOCK_BYTES = 64 * 1024
+SEND_CHUNK_BYTES = 64 * 1024
+
+SHARE_PAGE = """<!doctype html>
+<html><head><title>Fake Zoom recording {recording_id}</title></head>
+<body>
+<div id="interstitial"><p>This recording is shared with you.</p><button id="continue">Continue</button></div>
+<div id="player" style="display:none">{player}</div>
+{embedded}
+<script>
+document.getElementById('continue').addEventListener('click', function () {{
+    document.getElementById('interstitial').style.display = 'none';
+    document.getElementById('player').style.display = 'block';
+}});
+</script>
+</body></html>
+"""
+
+DOWNLOAD_CONTROL = """<button aria-label="Download" id="download">Download</button>
+<script>
+document.getElementById('download').addEventListener('click', function () {{
+    {media_urls}.forEach(function (url, position) {{
+        setTimeout(function () {{
+            var anchor = document.createElement('a');
+            anchor.href = url;
+            anchor.download = '';
+            document.body.appendChild(anchor);
+            anchor.click();
+        }}, position * 300);
+    }});
+}});
+</script>
+"""
+
+IFRAME_PAGE = """<!doctype html>
+<html><body>{content}</body></html>
+"""
+
+
+def _media_files(recording_id: int, options) -> list:
+    """(file name, size in bytes) of each file a fake recording offers."""
+    stamp = f'GMT20240101-{100000 + recording_id:06d}'
+    # with a size spread, videos range from mp4_mb up to (1 + size_spread) times that, in a fixed shuffled order
+    size_factor = 1 + options.size_spread * ((recording_id * 7) % 10) / 9
+    files = [(f'{stamp}_Recording_1920x1080.mp4', int(options.mp4_mb * size_factor * 1024 * 1024))]
+    if options.m4a_mb:
+        files.append((f'{stamp}_Recording.m4a', int(options.m4a_mb * 1024 * 1024)))
+    if options.vtt_kb:
+        files.append((f'{stamp}_Recording.transcript.vtt', int(options.vtt_kb * 1024)))
+    return files
+
+
+def _payload_header(file_name: str, size: int) -> bytes:
+    """
+    Container header for a payload, so downloaded files look like what Zoom serves and pass the downloader's
+    verification: ISO-BMFF ftyp and (empty) moov boxes followed by an mdat box that runs to the end of the file for
+    MP4/M4A, the WEBVTT signature for transcripts.
+    """
+    if file_name.endswith('.vtt'):
+        return b'WEBVTT\n\n'
+    brand = b'M4A ' if file_name.endswith('.m4a') else b'isom'
+    ftyp = (24).to_bytes(4, 'big') + b'ftyp' + brand + (512).to_bytes(4, 'big') + brand + b'mp41'
+    moov = (8).to_bytes(4, 'big') + b'moov'
+    mdat_size = size - len(ftyp) - len(moov)
+    if mdat_size < 2 ** 32:
+        return ftyp + moov + mdat_size.to_bytes(4, 'big') + b'mdat'
+    return ftyp + moov + (1).to_bytes(4, 'big') + b'mdat' + mdat_size.to_bytes(8, 'big')
+
+
+def _payload_trailer(file_name: str) -> bytes:
+    """Bytes a payload ends with: a complete last cue for transcripts, whose filler is cut off at an arbitrary point."""
+    if file_name.endswith('.vtt'):
+        return b'\n\n99999\n00:00:00.000 --> 00:00:01.000\nEnd of transcript.\n'
+    return b''
+
+
+def _pattern_block(recording_id: int, file_name: str) -> bytes:
+    """Filler that differs per file, so the downloader's content dedupe doesn't turn the benchmark into hardlinks."""
+    if file_name.endswith('.vtt'):
+        cue = f'{recording_id}\n00:00:00.000 --> 00:00:05.000\nFake transcript line for recording {recording_id}.\n\n'.encode()
+        return (cue * (PATTERN_BLOCK_BYTES // len(cue) + 1))[:PATTERN_BLOCK_BYTES]
+    seed = f'{recording_id}/{file_name}'.encode()
+    return b''.join(hashlib.sha256(seed + counter.to_bytes(4, 'big')).digest() for counter in range(PATTERN_BLOCK_BYTES // 32))
+
+
+def _payload_range(header: bytes, block: bytes, start: int, end: int, size: int = None, trailer: bytes = b'') -> bytes:
+    """Bytes start..end (exclusive) of a size-byte payload made of header, block repeated, and trailer."""
+    chunk = bytearray()
+    position = start
+    trailer_start = size - len(trailer) if size is not None else end
+    while position < end:
+        if position >= trailer_start:
+            piece = trailer[position - trailer_start:end - trailer_start]
+        elif position < len(header):
+            piece = header[position:min(end, len(header))]
+        else:
+            block_offset = (position - len(header)) % len(block)
+            piece = block[block_offset:block_offset + (min(end, trailer_start) - position)]
+        chunk += piece
+        position += len(piece)
+    return bytes(chunk)
+
+
+def make_handler(options):
+    """Request handler class serving the fake share pages, player iframes and media files described by options."""
+    payload_cache = {}
+    cache_lock = threading.Lock()
+
+    def payload_parts(recording_id: int, file_name: str, size: int):
+        with cache_lock:
+            key = (recording_id, file_name)
+            if key not in payload_cache:
+                payload_cache[key] = (_payload_header(file_name, size), _pattern_block(recording_id, file_name), _payload_trailer(file_name))
+            return payload_cache[key]
+
+    class FakeZoomHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_html(self, html: str):
+            body = html.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _media_urls(self, recording_id: int) -> str:
+            origin = f"http://{self.headers.get('Host', '127.0.0.1')}"
+            return json.dumps([f'{origin}/media/{recording_id}/{file_name}' for file_name, _ in _media_files(recording_id, options)])
+
+        def do_HEAD(self):
+            self.do_GET(head_only=True)
+
+        def do_GET(self, head_only=False):
+            if options.latency_ms:
+                time.sleep(options.latency_ms / 1000)
+            parts = self.path.split('?', 1)[0].strip('/').split('/')
+            try:
+                if parts[:2] == ['rec', 'share'] and len(parts) == 3:
+                    return self._share_page(int(parts[2]))
+                if parts[0] == 'player' and len(parts) in (2, 3):
+                    return self._player_frame(int(parts[1]), inner=len(parts) == 3)
+                if parts[0] == 'media' and len(parts) == 3:
+                    return self._media(int(parts[1]), parts[2], head_only)
+            except (ValueError, BrokenPipeError, ConnectionResetError):
+                return
+            self.send_error(404)
+
+        def _share_page(self, recording_id: int):
+            if options.layout == 'nested':
+                player = f'<iframe src="/player/{recording_id}" width="1200" height="700"></iframe>'
+            else:
+                player = DOWNLOAD_CONTROL.format(media_urls=self._media_urls(recording_id))
+            # with --embed-urls the page carries its media URLs the way some share pages do, for the HTTP fast path
+            embedded = f'<script>window.__data__ = {{"viewMp4Url": {self._media_urls(recording_id)}}};</script>' if options.embed_urls else ''
+            self._send_html(SHARE_PAGE.format(recording_id=recording_id, player=player, embedded=embedded))
+
+        def _player_frame(self, recording_id: int, inner: bool):
+            if inner:
+                content = DOWNLOAD_CONTROL.format(media_urls=self._media_urls(recording_id))
+            else:
+                content = f'<iframe src="/player/{recording_id}/inner" width="1100" height="600"></iframe>'
+            self._send_html(IFRAME_PAGE.format(content=content))
+
+        def _media(self, recording_id: int, file_name: str, head_only: bool):
+            sizes = dict(_media_files(recording_id, options))
+            if file_name not in sizes:
+                self.send_error(404)
+                return
+            size = sizes[file_name]
+            start, end = 0, size
+            range_header = self.headers.get('Range', '')
+            if range_header.startswith('bytes='):
+                first, _, last = range_header[6:].split(',')[0].partition('-')
+                start = int(first or 0)
+                end = min(size, int(last) + 1) if last else size
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end - 1}/{size}')
+            else:
+                self.send_response(200)
+            content_type = {'mp4': 'video/mp4', 'm4a': 'audio/mp4', 'vtt': 'text/vtt'}[file_name.rsplit('.', 1)[-1]]
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(end - start))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', f'"{recording_id}-{file_name}-{size}"')
+            self.send_header('Content-Disposition', f'attachment; filename="{file_name}"')
+            self.end_headers()
+            if head_only:
+                return
+            header, block, trailer = payload_parts(recording_id, file_name, size)
+            # each response is paced on its own, like a per-connection limit on a CDN
+            bytes_per_second = options.throttle_mbps * 1024 * 1024 / 8 if options.throttle_mbps else 0
+            response_start = time.time()
+            position = start
+            while position < end:
+                chunk_end = min(end, position + SEND_CHUNK_BYTES)
+                self.wfile.write(_payload_range(header, block, position, chunk_end, size, trailer))
+                position = chunk_end
+                if bytes_per_second:
+                    ahead = (position - start) / bytes_per_second - (time.time() - response_start)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    return FakeZoomHandler
+
+
+def start_fake_zoom_server(options):
+    """Starts the fake Zoom server on a free local port in a background thread."""
+    server = ThreadingHTTPServer(('127.0.0.1', options.port), make_handler(options))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _folder_bytes(folder: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file() and not entry.name.startswith('.'))
+
+
+def run_benchmark(options) -> dict:
+    """Runs zoom_downloader.main() against the fake server and returns the benchmark report."""
+    server = start_fake_zoom_server(options)
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    work_dir = tempfile.mkdtemp(prefix='zoom_benchmark_')
+    output_dir = os.path.join(work_dir, 'output')
+    links_path = os.path.join(work_dir, 'zoom_links.txt')
+    with open(links_path, 'w', encoding='utf-8') as file_handle:
+        for recording_id in range(1, options.links + 1):
+            file_handle.write(f'Benchmark Title {(recording_id - 1) % options.titles + 1}\t{base_url}/rec/share/{recording_id}\n')
+
+    zoom_downloader.INPUT_TXT = links_path
+    zoom_downloader.BASE_OUTPUT_PATH = output_dir
+    zoom_downloader.WORKER_COUNT = options.workers
+    zoom_downloader.PIPELINE_MODE = options.pipeline
+    zoom_downloader.SCHEDULING_POLICY = options.policy
+    # a fresh job store, or a second run would find every link already done
+    zoom_downloader.JOB_STORE_PATH = os.path.join(work_dir, 'zoom_jobs.sqlite')
+    utils.HEADLESS = not options.show_browser
+    utils.SELECTOR_CACHE_PATH = os.path.join(work_dir, 'selector_cache.json')
+    # the fake host isn't Zoom's CDN, so it has to be trusted explicitly for the HTTP fast path
+    utils.HTTP_FAST_PATH_MEDIA_HOSTS = list(utils.HTTP_FAST_PATH_MEDIA_HOSTS) + ['127.0.0.1']
+    if options.keep_all_files:
+        utils.SKIP_EXTENSIONS = []
+    metrics.JSONL_PATH = os.path.join(work_dir, 'zoom_metrics.jsonl')
+    metrics.PROMETHEUS_PATH = None
+
+    run_start = time.time()
+    try:
+        zoom_downloader.main()
+    finally:
+        server.shutdown()
+    wall_seconds = time.time() - run_start
+
+    link_records = []
+    if os.path.exists(metrics.JSONL_PATH):
+        with open(metrics.JSONL_PATH, 'r', encoding='utf-8') as file_handle:
+            link_records = [json.loads(line) for line in file_handle if line.strip()]
+    phase_samples = {}
+    for record in link_records:
+        for name, seconds in record['phases'].items():
+            phase_samples.setdefault(name, []).append(seconds)
+    downloaded_bytes = _folder_bytes(output_dir) if os.path.isdir(output_dir) else 0
+    done_links = sum(1 for record in link_records if record['status'] == 'done')
+
+    report = {
+        'links': options.links,
+        'done': done_links,
+        'wall_seconds': round(wall_seconds, 2),
+        'links_per_minute': round(done_links / wall_seconds * 60, 2) if wall_seconds else 0,
+        'megabytes_per_second': round(downloaded_bytes / wall_seconds / 1e6, 2) if wall_seconds else 0,
+        'downloaded_bytes': downloaded_bytes,
+        'phases': {name: {'p50': round(metrics.percentile(samples, 0.5), 3),
+                          'p90': round(metrics.percentile(samples, 0.9), 3),
+                          'max': round(max(samples), 3)}
+                   for name, samples in phase_samples.items()},
+        'options': vars(options),
+    }
+    if options.keep_output:
+        print(f'\nBenchmark files kept in {work_dir}')
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def compare_reports(report: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a description of every headline number that is worse than baseline by more than tolerance."""
+    regressions = []
+    for key in ('links_per_minute', 'megabytes_per_second'):
+        if baseline.get(key) and report[key] < baseline[key] * (1 - tolerance):
+            regressions.append(f'{key}: {report[key]} vs baseline {baseline[key]}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark zoom_downloader against a local fake Zoom server.')
+    parser.add_argument('--links', type=int, default=10, help='number of recordings to generate')
+    parser.add_argument('--titles', type=int, default=2, help='number of document titles the links are spread over')
+    parser.add_argument('--mp4-mb', type=float, default=20, help='size of each recording video')
+    parser.add_argument('--size-spread', type=float, default=0, help='make videos up to this many times larger than --mp4-mb, varying by link')
+    parser.add_argument('--m4a-mb', type=float, default=2, help='size of each audio file (0 for none)')
+    parser.add_argument('--vtt-kb', type=float, default=16, help='size of each transcript (0 for none)')
+    parser.add_argument('--latency-ms', type=int, default=0, help='delay added before every response')
+    parser.add_argument('--throttle-mbps', type=float, default=0, help='per-connection speed limit in megabits/s (0 for none)')
+    parser.add_argument('--layout', choices=('page', 'nested'), default='page',
+                        help="'page': Download button in the share page; 'nested': inside two iframes, like mpc-edu")
+    parser.add_argument('--embed-urls', action='store_true', help='put media URLs in the share page (exercises the HTTP fast path)')
+    parser.add_argument('--workers', type=int, default=zoom_downloader.WORKER_COUNT)
+    parser.add_argument('--pipeline', action='store_true', default=zoom_downloader.PIPELINE_MODE)
+    parser.add_argument('--policy', choices=('listed', 'largest_first', 'smallest_first'), default=zoom_downloader.SCHEDULING_POLICY)
+    parser.add_argument('--keep-all-files', action='store_true', help='ignore REMOVE_EXTENSIONS and download every file')
+    parser.add_argument('--show-browser', action='store_true')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--keep-output', action='store_true', help="don't delete the downloaded files afterwards")
+    parser.add_argument('--report', help='write the report as JSON to this path')
+    parser.add_argument('--compare', help='baseline report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed slowdown against the baseline (0.15 = 15%%)')
+    options = parser.parse_args()
+
+    report = run_benchmark(options)
+    print('\nBenchmark:')
+    print(f"  Links done: {report['done']}/{report['links']} in {report['wall_seconds']}s")
+    print(f"  Links/min: {report['links_per_minute']}")
+    print(f"  MB/s: {report['megabytes_per_second']}")
+    for name, summary in sorted(report['phases'].items(), key=lambda item: -item[1]['p50']):
+        print(f"  {name:<20} p50 {summary['p50']:.2f}s  p90 {summary['p90']:.2f}s  max {summary['max']:.2f}s")
+    if options.report:
+        with open(options.report, 'w', encoding='utf-8') as file_handle:
+            json.dump(report, file_handle, indent=2)
+    if options.compare:
+        with open(options.compare, 'r', encoding='utf-8') as file_handle:
+            regressions = compare_reports(report, json.load(file_handle), options.tolerance)
+        if regressions:
+            print('\nRegressions against baseline:')
+            for regression in regressions:
+                print(' -', regression)
+            sys.exit(1)
+        print('\nNo regressions against baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,460 @@
+# zoom_cdp.py
+import os
+import re
+import json
+import time
+import queue
+import itertools
+import threading
+import requests
+import websocket
+
+
+class CdpConnection:
+    """
+    A raw DevTools websocket to the browser target of a running Chrome.
+    Unlike driver.execute_cdp_cmd, it receives events, which are handed to the callbacks registered with on().
+    """
+
+    def __init__(self, websocket_url: str):
+        # Chrome refuses DevTools websockets that send an Origin header unless --remote-allow-origins is set
+        self._ws = websocket.create_connection(websocket_url, timeout=10, suppress_origin=True)
+        self._ws.settimeout(None)
+        self._message_ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._listeners = {}
+        self._raw_filters = {}
+        self.closed = False
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    @classmethod
+    def for_driver(cls, driver):
+        """Opens a connection to the browser behind a local chromedriver session."""
+        debugger_address = driver.capabilities.get('goog:chromeOptions', {}).get('debuggerAddress')
+        if not debugger_address:
+            raise RuntimeError('Browser does not expose a DevTools debugger address')
+        version_info = requests.get(f'http://{debugger_address}/json/version', timeout=5).json()
+        return cls(version_info['webSocketDebuggerUrl'])
+
+    def on(self, method: str, callback):
+        """Registers callback(params, session_id) for every event named method."""
+        self._listeners.setdefault(method, []).append(callback)
+
+    def attach_to_targets(self):
+        """
+        Auto-attaches to every existing and future page at browser level; flatten gives each one a sessionId. Targets
+        already attached are reported only once, so this is called after every Target.attachedToTarget listener is
+        registered.
+        """
+        self.send('Target.setAutoAttach', {'autoAttach': True, 'waitForDebuggerOnStart': False, 'flatten': True})
+
+    def set_raw_filter(self, method: str, pattern):
+        """
+        Only decode method events whose raw JSON text matches pattern. Everything else is dropped before json.loads,
+        which keeps busy domains like Network cheap when only a few of their events matter.
+        """
+        self._raw_filters[method] = re.compile(pattern) if isinstance(pattern, str) else pattern
+
+    def post(self, method: str, params: dict = None, session_id: str = None):
+        """Sends a DevTools command without waiting for the reply. Safe to call from an event callback."""
+        message = {'id': next(self._message_ids), 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        with self._send_lock:
+            self._ws.send(json.dumps(message))
+
+    def send(self, method: str, params: dict = None, session_id: str = None, timeout: float = 10):
+        """Sends a DevTools command and waits for its result. Raises RuntimeError on a protocol error."""
+        message_id = next(self._message_ids)
+        message = {'id': message_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        reply = {'event': threading.Event()}
+        self._pending[message_id] = reply
+        try:
+            with self._send_lock:
+                self._ws.send(json.dumps(message))
+            if not reply['event'].wait(timeout):
+                raise TimeoutError(f'No reply to {method} within {timeout}s')
+        finally:
+            self._pending.pop(message_id, None)
+        if 'error' in reply.get('message', {}):
+            raise RuntimeError(f"{method} failed: {reply['message']['error'].get('message')}")
+        return reply.get('message', {}).get('result', {})
+
+    def close(self):
+        self.closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+    def _read_loop(self):
+        while not self.closed:
+            try:
+                raw_message = self._ws.recv()
+            except Exception:
+                break
+            # Chrome serialises events as {"method":"Domain.event",...}, so the method can be read without decoding
+            if raw_message.startswith('{"method":"'):
+                method = raw_message[11:raw_message.find('"', 11)]
+                if method not in self._listeners:
+                    continue
+                raw_filter = self._raw_filters.get(method)
+                if raw_filter is not None and not raw_filter.search(raw_message):
+                    continue
+            try:
+                message = json.loads(raw_message)
+            except Exception:
+                continue
+            if 'id' in message:
+                reply = self._pending.get(message['id'])
+                if reply is not None:
+                    reply['message'] = message
+                    reply['event'].set()
+                continue
+            for callback in self._listeners.get(message.get('method'), []):
+                try:
+                    callback(message.get('params', {}), message.get('sessionId'))
+                except Exception:
+                    pass
+        self.closed = True
+        # wake up anyone still waiting on a reply from a browser that went away
+        for reply in list(self._pending.values()):
+            reply['event'].set()
+
+
+class DownloadTracker:
+    """
+    Follows Chrome downloads through Browser.downloadWillBegin / Browser.downloadProgress events.
+    Each download is remembered by GUID together with the folder it was started in, its byte counts and its state
+    ('inProgress', 'completed' or 'canceled'), so callers can wait for exactly the downloads of one folder.
+
+    Chrome has a single download folder, so tabs that download at the same time are told apart by the frame each
+    download starts in: every page and iframe target is attached to, and its frames are mapped to the tab (the
+    window handle) they belong to. With set_tab_download_folder, downloads are saved under their GUID in a shared
+    folder and moved, with their suggested name, to their tab's folder when they complete.
+    """
+
+    def __init__(self, connection: CdpConnection, skip_download=None, on_change=None):
+        self._connection = connection
+        # skip_download(file_name=..., url=...) -> True cancels the download as soon as it begins
+        self._skip_download = skip_download
+        # on_change(download) gets a copy of a download's record when it begins, once its size is known and when it ends
+        self._on_change = on_change
+        self._condition = threading.Condition()
+        self.download_folder = None
+        self.download_page_url = None
+        self.downloads = {}
+        self.intercepted_folders = set()
+        # set while downloads are saved by GUID and filed per tab: shared folder, {tab: (folder, page_url)}, last tab
+        self._shared_folder = None
+        self._tab_folders = {}
+        self._last_tab = None
+        self._session_tabs = {}
+        self._frame_tabs = {}
+        connection.on('Browser.downloadWillBegin', self._on_download_will_begin)
+        connection.on('Browser.downloadProgress', self._on_download_progress)
+        connection.on('Target.attachedToTarget', self._on_attached_to_target)
+        connection.on('Target.detachedFromTarget', self._on_detached_from_target)
+        connection.on('Page.frameAttached', self._on_frame_attached)
+        connection.on('Page.frameNavigated', self._on_frame_navigated)
+
+    @property
+    def closed(self) -> bool:
+        return self._connection.closed
+
+    def close(self):
+        self._connection.close()
+
+    def set_download_folder(self, path: str, page_url: str = None):
+        """
+        Points new downloads at path, noting page_url as the page they come from. Events are only delivered to the
+        connection that enabled them.
+        """
+        with self._condition:
+            self.download_folder = path
+            self.download_page_url = page_url
+            self._shared_folder = None
+        self._connection.send('Browser.setDownloadBehavior',
+                              {'behavior': 'allow', 'downloadPath': path, 'eventsEnabled': True})
+
+    def set_tab_download_folder(self, tab: str, path: str, shared_folder: str, page_url: str = None):
+        """
+        Files the downloads started from tab (a window handle) in path, noting page_url as the page they come from.
+        Chrome saves them under their GUID in shared_folder until they complete; other tabs' downloads in flight are
+        not affected.
+        """
+        tab = tab.replace('CDwindow-', '')
+        with self._condition:
+            self._tab_folders[tab] = (path, page_url)
+            self._last_tab = tab
+            if self._shared_folder == shared_folder:
+                return
+            self._shared_folder = shared_folder
+        self._connection.send('Browser.setDownloadBehavior',
+                              {'behavior': 'allowAndName', 'downloadPath': shared_folder, 'eventsEnabled': True})
+
+    def _on_attached_to_target(self, params, session_id=None):
+        target_info = params.get('targetInfo', {})
+        child_session = params.get('sessionId')
+        if target_info.get('type') not in ('page', 'iframe') or not child_session:
+            return
+        with self._condition:
+            # a page is a tab of its own; an out-of-process iframe belongs to the tab of the session it was found in
+            tab = target_info['targetId'] if target_info['type'] == 'page' else self._session_tabs.get(session_id)
+            if tab is None:
+                return
+            self._session_tabs[child_session] = tab
+            self._frame_tabs[target_info['targetId']] = tab
+        try:
+            self._connection.post('Page.enable', {}, session_id=child_session)
+            self._connection.post('Target.setAutoAttach', {'autoAttach': True, 'waitForDebuggerOnStart': False, 'flatten': True},
+                                  session_id=child_session)
+        except Exception:
+            pass
+
+    def _on_detached_from_target(self, params, session_id=None):
+        with self._condition:
+            self._session_tabs.pop(params.get('sessionId'), None)
+
+    def _on_frame_attached(self, params, session_id=None):
+        with self._condition:
+            tab = self._session_tabs.get(session_id)
+            if tab is not None and params.get('frameId'):
+                self._frame_tabs[params['frameId']] = tab
+
+    def _on_frame_navigated(self, params, session_id=None):
+        self._on_frame_attached({'frameId': params.get('frame', {}).get('id')}, session_id)
+
+    def _file_completed_download(self, download: dict):
+        """Moves a download saved under its GUID in the shared folder to its tab's folder, under its suggested name."""
+        file_name = download['suggested_filename'] or download['guid']
+        stem, extension = os.path.splitext(file_name)
+        target_path = os.path.join(download['folder'], file_name)
+        counter = 1
+        while os.path.exists(target_path):
+            target_path = os.path.join(download['folder'], f'{stem} ({counter}){extension}')
+            counter += 1
+        try:
+            os.makedirs(download['folder'], exist_ok=True)
+            os.replace(download['partial_path'], target_path)
+            download['partial_path'] = None
+        except OSError:
+            pass
+
+    def intercept_folder(self, folder: str, enabled: bool = True):
+        """Cancels downloads started in folder as soon as they begin, keeping their URL and suggested filename."""
+        with self._condition:
+            if enabled:
+                self.intercepted_folders.add(folder)
+            else:
+                self.intercepted_folders.discard(folder)
+
+    def _on_download_will_begin(self, params, session_id=None):
+        with self._condition:
+            folder, page_url, partial_path = self.download_folder, self.download_page_url, None
+            if self._shared_folder is not None:
+                # a tab's main frame has the tab's id; a frame that wasn't seen being attached is taken to be in the
+                # tab that was pointed somewhere last
+                frame_id = params.get('frameId')
+                tab = frame_id if frame_id in self._tab_folders else self._frame_tabs.get(frame_id)
+                folder, page_url = self._tab_folders.get(tab) or self._tab_folders.get(self._last_tab) or (self._shared_folder, None)
+                partial_path = os.path.join(self._shared_folder, params['guid'])
+            self.downloads[params['guid']] = {
+                'guid': params['guid'],
+                'url': params.get('url'),
+                'suggested_filename': params.get('suggestedFilename'),
+                'folder': folder,
+                'page_url': page_url,
+                'partial_path': partial_path,
+                'state': 'inProgress',
+                'received_bytes': 0,
+                'total_bytes': 0,
+                'started': time.time(),
+                'progressed': time.time(),
+                'finished': None,
+                'intercepted': folder in self.intercepted_folders,
+                'skipped': bool(self._skip_download and self._skip_download(file_name=params.get('suggestedFilename'), url=params.get('url'))),
+            }
+            if self.downloads[params['guid']]['intercepted'] or self.downloads[params['guid']]['skipped']:
+                # either the bytes are fetched elsewhere, or they aren't wanted at all
+                try:
+                    self._connection.post('Browser.cancelDownload', {'guid': params['guid']})
+                except Exception:
+                    pass
+            begun = dict(self.downloads[params['guid']])
+            self._condition.notify_all()
+        self._notify_change(begun)
+
+    def _on_download_progress(self, params, session_id=None):
+        with self._condition:
+            download = self.downloads.get(params['guid'])
+            if download is None:
+                return
+            size_learned = not download['total_bytes'] and params.get('totalBytes')
+            if params.get('receivedBytes', 0) > download['received_bytes']:
+                download['progressed'] = time.time()
+            download['received_bytes'] = params.get('receivedBytes', download['received_bytes'])
+            download['total_bytes'] = params.get('totalBytes', download['total_bytes'])
+            if params.get('state') == 'completed' and download['partial_path'] and download['state'] == 'inProgress':
+                # filed before the state changes, so whoever sees the folder idle also sees the file in it
+                self._file_completed_download(download)
+            download['state'] = params.get('state', download['state'])
+            ended = download['state'] != 'inProgress' and download['finished'] is None
+            if ended:
+                download['finished'] = time.time()
+            changed = dict(download) if size_learned or ended else None
+            self._condition.notify_all()
+        if changed is not None:
+            self._notify_change(changed)
+
+    def _notify_change(self, download: dict):
+        if self._on_change is not None:
+            try:
+                self._on_change(download)
+            except Exception:
+                pass
+
+    def downloads_for(self, folder: str, since: float = 0) -> list:
+        """Snapshot of the downloads started in folder at or after since."""
+        with self._condition:
+            return [dict(download) for download in self.downloads.values()
+                    if download['folder'] == folder and download['started'] >= since]
+
+    def active_downloads(self, folder: str) -> list:
+        return [download for download in self.downloads_for(folder) if download['state'] == 'inProgress']
+
+    def is_progressing(self, folder: str, stall_seconds: float) -> bool:
+        """True when a download in folder is still in progress and received bytes within the last stall_seconds."""
+        with self._condition:
+            return any(download['folder'] == folder and download['state'] == 'inProgress'
+                       and time.time() - download['progressed'] < stall_seconds for download in self.downloads.values())
+
+    def wait_for_download_start(self, folder: str, since: float, timeout: float) -> list:
+        """Blocks until at least one download starts in folder after since. Returns the started downloads."""
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                started = [download for download in self.downloads.values()
+                           if download['folder'] == folder and download['started'] >= since]
+                remaining = deadline - time.time()
+                if started or remaining <= 0 or self._connection.closed:
+                    return [dict(download) for download in started]
+                self._condition.wait(min(remaining, 1.0))
+
+    def is_idle(self, folder: str, settle: float = 2.0) -> bool:
+        """Non-blocking wait_until_idle: True once nothing in folder is in progress and settle seconds have passed."""
+        with self._condition:
+            folder_downloads = [download for download in self.downloads.values() if download['folder'] == folder]
+            if any(download['state'] == 'inProgress' for download in folder_downloads):
+                return False
+            last_event = max([download['finished'] or download['started'] for download in folder_downloads], default=0)
+            return time.time() - last_event >= settle
+
+    def wait_until_idle(self, folder: str, timeout: float, settle: float = 2.0) -> bool:
+        """
+        Blocks until every download in folder has finished and no new one has started for settle seconds.
+        Returns True when idle, False if the timeout was reached with downloads still in flight.
+        """
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                folder_downloads = [download for download in self.downloads.values() if download['folder'] == folder]
+                active = [download for download in folder_downloads if download['state'] == 'inProgress']
+                now = time.time()
+                if not active:
+                    last_event = max([download['finished'] or download['started'] for download in folder_downloads], default=0)
+                    if now - last_event >= settle:
+                        return True
+                    wait_seconds = settle - (now - last_event)
+                else:
+                    wait_seconds = 1.0
+                if now >= deadline or self._connection.closed:
+                    return not active
+                self._condition.wait(min(wait_seconds, deadline - now))
+
+
+class NetworkCapture:
+    """
+    Watches network requests of every page and iframe in the browser and puts URLs matching url_pattern on a queue
+    as soon as they are requested. Only Network.requestWillBeSent / Network.responseReceived are listened to, and
+    events whose raw text doesn't match prefilter_pattern are skipped without being decoded. Pages are watched from
+    connection.attach_to_targets() on.
+    """
+
+    def __init__(self, connection: CdpConnection, url_pattern, prefilter_pattern):
+        self._connection = connection
+        self._url_pattern = url_pattern
+        self._seen_urls = set()
+        self._seen_lock = threading.Lock()
+        self.media_urls = queue.Queue()
+        for method in ('Network.requestWillBeSent', 'Network.responseReceived'):
+            connection.on(method, self._on_network_event)
+            connection.set_raw_filter(method, prefilter_pattern)
+        connection.on('Target.attachedToTarget', self._on_attached_to_target)
+
+    def _on_attached_to_target(self, params, session_id=None):
+        child_session = params.get('sessionId')
+        if params.get('targetInfo', {}).get('type') not in ('page', 'iframe') or not child_session:
+            return
+        try:
+            self._connection.post('Network.enable', {}, session_id=child_session)
+            # out-of-process iframes (like the mpc-edu player) are separate targets of the page
+            self._connection.post('Target.setAutoAttach', {'autoAttach': True, 'waitForDebuggerOnStart': False, 'flatten': True},
+                                  session_id=child_session)
+        except Exception:
+            pass
+
+    def _on_network_event(self, params, session_id=None):
+        response_data = params.get('response') or {}
+        extracted_url = response_data.get('url', '') or params.get('request', {}).get('url', '')
+        if not extracted_url or not self._url_pattern.search(extracted_url):
+            return
+        with self._seen_lock:
+            if extracted_url in self._seen_urls:
+                return
+            self._seen_urls.add(extracted_url)
+        self.media_urls.put(extracted_url)
+
+    def drain(self) -> list:
+        """Returns every URL captured since the last call."""
+        drained = []
+        while True:
+            try:
+                drained.append(self.media_urls.get_nowait())
+            except queue.Empty:
+                return drained
+
+    def reset(self):
+        """Forgets captured URLs, e.g. before navigating to the next recording."""
+        self.drain()
+        with self._seen_lock:
+            self._seen_urls.clear()
+
+
+class RequestBlocker:
+    """
+    Blocks requests matching url_patterns (wildcards, as accepted by Network.setBlockedURLs) in every page and iframe
+    of the browser, including out-of-process iframes, by applying the list to each target as it is attached. Pages
+    are covered from connection.attach_to_targets() on.
+    """
+
+    def __init__(self, connection: CdpConnection, url_patterns: list):
+        self._connection = connection
+        self.url_patterns = list(url_patterns)
+        connection.on('Target.attachedToTarget', self._on_attached_to_target)
+
+    def _on_attached_to_target(self, params, session_id=None):
+        child_session = params.get('sessionId')
+        if params.get('targetInfo', {}).get('type') not in ('page', 'iframe') or not child_session:
+            return
+        try:
+            self._connection.post('Network.enable', {}, session_id=child_session)
+            self._connection.post('Network.setBlockedURLs', {'urls': self.url_patterns}, session_id=child_session)
+            self._connection.post('Target.setAutoAttach', {'autoAttach': True, 'waitForDebuggerOnStart': False, 'flatten': True},
+                                  session_id=child_session)
+        except Exception:
+            pass
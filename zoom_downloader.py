@@ -1,14 +1,25 @@
 # zoom_downloader.py
 import os
+import sys
+import json
 import time
-import shutil
+import queue
+import socket
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, unquote
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+import requests
 from webdriver_manager.chrome import ChromeDriverManager
 
 import zoom_utils as utils
+import zoom_metrics as metrics
+import zoom_verify
+from zoom_jobstore import JobStore, JobStoreQueue
+from zoom_scheduler import LinkScheduler, failure_class, job_key, typical_size, order_jobs_by_size
 
 # ==============================================================================
 # ======================== CONFIGURATION VARIABLES =============================
@@ -21,26 +32,139 @@ utils.HEADLESS = True
 # This should be increased should you either download large files and have slow internet.
 ACTIVE_DOWNLOAD_TIMEOUT_SECONDS = 1200
 
-# Extensions to remove after downloads complete
-# To disable deletion leave as an empty list: REMOVE_EXTENSIONS = []
+# Number of independent Chrome workers that process links in parallel. Each worker owns its own browser
+# and its own _tmp_Video_* staging folder. Keep at 1 to process links one at a time.
+WORKER_COUNT = 1
+
+# Pipeline mode: the browser only opens each recording and captures its media URLs and cookies, then moves straight on
+# to the next link while a separate transfer stage downloads the files. TRANSFER_CONCURRENCY recordings are transferred
+# at once, and the browser pauses once TRANSFER_QUEUE_SIZE resolved links are waiting.
+# A global speed cap can be set with utils.MAX_BANDWIDTH_BYTES_PER_SECOND.
+PIPELINE_MODE = False
+TRANSFER_CONCURRENCY = 4
+TRANSFER_QUEUE_SIZE = 8
+
+# Extensions to skip. Matching files are never downloaded: Chrome downloads are cancelled as soon as they start
+# and matching media URLs are not fetched.
+# To download everything leave as an empty list: REMOVE_EXTENSIONS = []
 REMOVE_EXTENSIONS = ['.m4a', '.vtt']   # e.g. ['.m4a', '.tmp']
 
+# The same recording linked more than once (same share id, even with different passcode or tracking parameters) is
+# only downloaded once. If it appears under several titles, the other titles get links to the downloaded files.
+# Files with identical content are also stored only once (see utils.DEDUPE_CONTENT).
+DEDUPE_LINKS = True
+
 INPUT_TXT = 'zoom_links.txt'
 BASE_OUTPUT_PATH = r'C:\Users\Azn\Downloads\Results'
 
+# Per-link phase timings and file speeds are appended to this JSONL file, and a Prometheus textfile snapshot is
+# rewritten after every link (point node_exporter's textfile collector at it). Set either to None to turn it off.
+metrics.JSONL_PATH = 'zoom_metrics.jsonl'
+metrics.PROMETHEUS_PATH = 'zoom_metrics.prom'
+
+# Folder for the temporary _tmp_Video_* download folders. None keeps them inside BASE_OUTPUT_PATH; pointing it at a
+# fast local disk while BASE_OUTPUT_PATH is a network share lets downloads run at full speed, with finished files
+# copied over in the background (see utils.BACKGROUND_MOVES).
+STAGING_PATH = None
+
+# Progress is kept in this SQLite database: finished links are skipped when the script is run again, and several
+# copies of the script (also on other computers sharing the folder) can work through the same list at once.
+# Delete the file to start over. None keeps the queue in memory only.
+JOB_STORE_PATH = 'zoom_jobs.sqlite'
+# A claimed link is given back to the queue if its process stops renewing the claim for this long (e.g. it crashed).
+JOB_LEASE_SECONDS = 600
+# Failed or skipped links are tried again on later runs until they have been attempted this many times.
+JOB_MAX_ATTEMPTS = 3
+# WAL mode is faster but only works when every process runs on the same computer. Set to False when the database is
+# on a network share used by several computers.
+JOB_STORE_WAL = True
+
+# Browser startup. The chromedriver found by webdriver_manager is remembered in DRIVER_PATH_CACHE, so later runs start
+# without its online version check (it is looked up again if the cached driver no longer starts Chrome).
+DRIVER_PATH_CACHE = 'chromedriver_path.json'
+# Keep Chrome's profile (HTTP cache, cookies, site data) in this folder between runs instead of a fresh temporary one.
+# Extra workers get their own copy next to it (<folder>_w2, <folder>_w3, ...).
+BROWSER_PROFILE_DIR = None
+# "python zoom_downloader.py --warm-browser" starts a Chrome that keeps running on WARM_BROWSER_PORT. With
+# ATTACH_TO_WARM_BROWSER the first worker attaches to it instead of launching a new browser, and leaves it running.
+WARM_BROWSER_PORT = 9222
+ATTACH_TO_WARM_BROWSER = False
+
+# Tabs each browser keeps in flight. With more than 1, the next link is opened and clicked in another tab while the
+# previous link's files are still downloading, instead of waiting for them. Needs DevTools download events
+# (utils.USE_CDP_DOWNLOAD_EVENTS); ignored in PIPELINE_MODE.
+TABS_PER_BROWSER = 1
+
+# Long runs: each worker restarts its browser after RECYCLE_BROWSER_AFTER_LINKS links, or once Chrome uses more than
+# RECYCLE_BROWSER_RSS_MB of memory (measured only when the optional psutil package is installed). 0 turns either off.
+# A browser that crashes is restarted and the link it was on is tried again, up to DEAD_BROWSER_RETRIES times.
+RECYCLE_BROWSER_AFTER_LINKS = 40
+RECYCLE_BROWSER_RSS_MB = 3000
+DEAD_BROWSER_RETRIES = 2
+
+# Failed and skipped links are tried again later in the run, after RETRY_BACKOFF_SECONDS, then twice that and so on
+# up to RETRY_MAX_BACKOFF_SECONDS (each wait shortened by up to half at random, and never shorter than a Retry-After
+# the server sent). Only the failure classes in RETRY_FAILURES are retried; 'client_error' (HTTP 403/404, e.g. an
+# expired or password-protected link) is left out because trying again won't help, and 'stalled' (a Chrome download
+# that stopped receiving data but never ended) because a retry would clear the folder Chrome is still writing to.
+# A stalled link is resumed from its partial file on the next run.
+RETRY_ATTEMPTS = 2
+RETRY_BACKOFF_SECONDS = 30
+RETRY_MAX_BACKOFF_SECONDS = 600
+RETRY_FAILURES = ('no_button', 'no_files', 'truncated', 'timeout', 'rate_limited', 'server_error', 'network', 'browser', 'error')
+
+# Politeness per Zoom host, across all workers and tabs: at most HOST_MAX_CONCURRENT_LINKS links in flight and
+# HOST_LINKS_PER_MINUTE new links started per minute (slowed down further while the host answers 429). 0 turns either
+# off. Plain HTTP requests are paced separately by utils.HOST_REQUESTS_PER_SECOND.
+HOST_MAX_CONCURRENT_LINKS = 8
+HOST_LINKS_PER_MINUTE = 60
+
+# Order in which links are worked on: 'listed' (order of the links file), 'largest_first' (long recordings start
+# early, so the run doesn't end waiting on one big download) or 'smallest_first' (many links finish quickly).
+# For the size orders every link's size is looked up over plain HTTP before the run, SIZE_PROBE_CONCURRENCY at a
+# time; sizes learned in earlier runs are kept in the job store. Links of unknown size count as the median size.
+SCHEDULING_POLICY = 'listed'
+SIZE_PROBE_CONCURRENCY = 8
+
 # ==============================================================================
 # ========================= END OF CONFIGURATION ===============================
 # ==============================================================================
 
-def initialize_webdriver():
-    """Initializes and configures the Selenium Chrome webdriver."""
+utils.SKIP_EXTENSIONS = REMOVE_EXTENSIONS
+
+CONTINUE_XPATHS = [
+    "//button[normalize-space()='Continue']",
+    "//a[normalize-space()='Continue']",
+    "//*[contains(translate(.,'CONTINUE','continue'),'continue')]"
+]
+
+DOWNLOAD_XPATHS = [
+    "//button[@aria-label='Download']",
+    "//button[contains(.,'Download')]",
+    "//a[contains(.,'Download')]"
+]
+
+# Seeing any of these means the page has no Continue interstitial (or it is already past it), so the Continue step
+# ends at once instead of waiting out its whole budget
+PLAYER_XPATHS = [
+    "//video",
+    "//iframe[contains(@src,'/rec/play') or contains(@src,'player')]"
+]
+
+def build_chrome_options(profile_dir: str = None, performance_log: bool = None) -> Options:
+    """
+    Chrome options shared by every browser this script launches. The performance log is on unless the live network
+    capture replaces it (performance_log=None) or performance_log says otherwise.
+    """
     chrome_options = Options()
-    chrome_options.add_argument(f'--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64)')
+    chrome_options.add_argument(f'--user-agent={utils.USER_AGENT}')
     chrome_options.add_argument('--window-size=1920,1080')
     if utils.HEADLESS:
         chrome_options.add_argument('--headless=new')
     if utils.MUTE_AUDIO:
         chrome_options.add_argument('--mute-audio')
+    if profile_dir:
+        chrome_options.add_argument(f'--user-data-dir={os.path.abspath(profile_dir)}')
 
     chrome_preferences = {
         "download.prompt_for_download": False,
@@ -48,15 +172,145 @@ def initialize_webdriver():
         "profile.default_content_setting_values.popups": 0,
         "profile.default_content_setting_values.automatic_downloads": 1
     }
+    if utils.BLOCK_PAGE_RESOURCES:
+        # nothing on a recording page needs images, notifications, location or the camera to reach the Download button
+        chrome_preferences.update({
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+            "profile.default_content_setting_values.geolocation": 2,
+            "profile.default_content_setting_values.media_stream": 2,
+        })
+        # keeps the player from buffering the video we are about to download anyway
+        chrome_options.add_argument('--autoplay-policy=user-gesture-required')
     chrome_options.add_experimental_option("prefs", chrome_preferences)
-    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    chrome_options.page_load_strategy = utils.PAGE_LOAD_STRATEGY
+    if performance_log is None:
+        performance_log = not utils.USE_CDP_NETWORK_CAPTURE
+    if performance_log:
+        # Only network events are needed from the performance log
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+    return chrome_options
+
+
+def resolve_chromedriver_path(refresh: bool = False) -> str:
+    """Path of the chromedriver binary, from DRIVER_PATH_CACHE when it still exists, else from webdriver_manager."""
+    if DRIVER_PATH_CACHE and not refresh:
+        try:
+            with open(DRIVER_PATH_CACHE, 'r', encoding='utf-8') as file_handle:
+                cached_path = json.load(file_handle).get('path')
+            if cached_path and os.path.isfile(cached_path):
+                return cached_path
+        except Exception:
+            pass
+    driver_path = ChromeDriverManager().install()
+    if DRIVER_PATH_CACHE:
+        try:
+            with open(DRIVER_PATH_CACHE, 'w', encoding='utf-8') as file_handle:
+                json.dump({'path': driver_path, 'resolved': time.time()}, file_handle)
+        except Exception:
+            pass
+    return driver_path
+
+
+def _warm_browser_running() -> bool:
+    try:
+        return requests.get(f'http://127.0.0.1:{WARM_BROWSER_PORT}/json/version', timeout=1).ok
+    except Exception:
+        return False
+
+
+def _launch_chrome(chrome_options: Options):
+    """Starts Chrome with the cached chromedriver, resolving the driver again once if the cached one fails."""
+    try:
+        return webdriver.Chrome(service=Service(resolve_chromedriver_path()), options=chrome_options)
+    except Exception as error:
+        if not DRIVER_PATH_CACHE:
+            raise
+        # e.g. Chrome updated itself and the cached driver no longer matches it
+        print(f'   [Startup] Cached chromedriver failed ({error.__class__.__name__}); looking it up again')
+        return webdriver.Chrome(service=Service(resolve_chromedriver_path(refresh=True)), options=chrome_options)
+
 
-    chrome_service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+def initialize_webdriver(worker_id: int = None):
+    """Initializes and configures the Selenium Chrome webdriver."""
+    startup_start_time = time.time()
+    if ATTACH_TO_WARM_BROWSER and (worker_id or 1) == 1 and _warm_browser_running():
+        chrome_options = Options()
+        chrome_options.debugger_address = f'127.0.0.1:{WARM_BROWSER_PORT}'
+        chrome_options.page_load_strategy = utils.PAGE_LOAD_STRATEGY
+        driver = _launch_chrome(chrome_options)
+        # the browser belongs to the --warm-browser process; shutdown_webdriver leaves it running
+        driver._zoom_attached = True
+        startup_mode = 'attached'
+    else:
+        profile_dir = BROWSER_PROFILE_DIR
+        if profile_dir and (worker_id or 1) > 1:
+            profile_dir = f'{profile_dir}_w{worker_id}'
+        driver = _launch_chrome(build_chrome_options(profile_dir))
+        startup_mode = 'warm profile' if profile_dir else 'launched'
     driver.set_page_load_timeout(60)
+    utils.start_cdp_listeners(driver)
+    if utils.USE_CDP_NETWORK_CAPTURE and startup_mode != 'attached' and utils.get_network_capture(driver) is None:
+        # the performance log was left off for the live capture, so the network fallback would find nothing without it
+        print('   [Startup] Live network capture did not start; restarting the browser with the performance log on')
+        shutdown_webdriver(driver)
+        driver = _launch_chrome(build_chrome_options(profile_dir, performance_log=True))
+        driver.set_page_load_timeout(60)
+        utils.start_cdp_listeners(driver)
+    startup_seconds = time.time() - startup_start_time
+    metrics.record_browser_startup(startup_seconds, startup_mode)
+    print(f'[Startup] Browser ready in {startup_seconds:.1f}s ({startup_mode})')
     return driver
 
 
+def shutdown_webdriver(driver):
+    """Closes the driver's DevTools listeners and the browser, except a warm browser that was only attached to."""
+    utils.stop_cdp_listeners(driver)
+    try:
+        if getattr(driver, '_zoom_attached', False):
+            driver.service.stop()
+        else:
+            driver.quit()
+    except Exception:
+        pass
+
+
+def verify_output_library():
+    """
+    Checks every recording in BASE_OUTPUT_PATH without reading it in full (see zoom_verify), sets damaged files
+    aside and, with a job store, queues the links they came from to be downloaded again on the next run.
+    """
+    verify_start_time = time.time()
+    checked_count, checked_bytes, problems = zoom_verify.verify_folder(BASE_OUTPUT_PATH)
+    for file_name, problem in sorted(problems.items()):
+        print(f'   [Verify] {file_name}: {problem}')
+        zoom_verify.set_aside(os.path.join(BASE_OUTPUT_PATH, file_name))
+    print(f'Verified {checked_count} file(s), {utils.format_bytes(checked_bytes)}, in {time.time() - verify_start_time:.1f}s: '
+          f'{len(problems)} damaged')
+    if problems and JOB_STORE_PATH and os.path.exists(JOB_STORE_PATH):
+        job_store = JobStore(JOB_STORE_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS, use_wal=JOB_STORE_WAL)
+        requeued_count = job_store.requeue_files(list(problems))
+        print(f'{requeued_count} link(s) will be downloaded again on the next run')
+    elif problems:
+        print(f'Damaged files were renamed to *{zoom_verify.BROKEN_SUFFIX}; run their links again to replace them')
+
+
+def start_warm_browser():
+    """Starts a Chrome that stays running after this process exits, for later runs to attach to."""
+    if _warm_browser_running():
+        print(f'A browser is already listening on port {WARM_BROWSER_PORT}')
+        return
+    chrome_options = build_chrome_options(BROWSER_PROFILE_DIR or 'warm_browser_profile')
+    chrome_options.add_argument(f'--remote-debugging-port={WARM_BROWSER_PORT}')
+    chrome_options.add_experimental_option('detach', True)
+    startup_start_time = time.time()
+    driver = _launch_chrome(chrome_options)
+    driver.service.stop()
+    print(f'Warm browser started in {time.time() - startup_start_time:.1f}s on port {WARM_BROWSER_PORT}. '
+          f'Set ATTACH_TO_WARM_BROWSER = True to use it.')
+
+
 def parse_zoom_links_file(file_path: str) -> dict:
     """Reads the zoom links text file and groups the URLs by their associated titles."""
     links_by_title = {}
@@ -70,88 +324,198 @@ def parse_zoom_links_file(file_path: str) -> dict:
     return links_by_title
 
 
-def download_zoom_recording(driver, title: str, link: str, file_index: int) -> dict:
+def click_continue_button(driver, link_host: str):
+    """
+    Clicks through the 'Continue' interstitial. Selectors that worked before on this host are tried first. Returns
+    None straight away when the page already shows the player or its download control.
+    """
+    skip_xpaths = PLAYER_XPATHS + DOWNLOAD_XPATHS
+    continue_click = utils.click_learned_strategy(driver, link_host, 'continue', present_xpaths=skip_xpaths)
+    if continue_click is None:
+        continue_click = utils.click_with_retries_detailed(driver, CONTINUE_XPATHS, timeout=max(utils.PAGE_LOAD_WAIT, 10),
+                                                           present_xpaths=skip_xpaths)
+        utils.record_strategy_result(link_host, 'continue', continue_click, True)
+    return continue_click
+
+
+def click_download_button(driver, link_host: str):
+    """Clicks the recording's download control. Returns the strategy that worked, or None."""
+    clicked_download = utils.click_learned_strategy(driver, link_host, 'download')
+    if clicked_download is None:
+        # Nothing learned yet (or the learned strategy went stale): hosts like mpc-edu need the exhaustive search
+        host_prefers_exhaustive = 'mpc-edu.zoom.us' in link_host
+        if host_prefers_exhaustive:
+            end_time = time.time() + 15
+            while time.time() < end_time:
+                clicked_download = utils.force_click_download_button_detailed(driver)
+                if clicked_download:
+                    break
+                time.sleep(1.0)
+        else:
+            clicked_download = utils.click_with_retries_detailed(driver, DOWNLOAD_XPATHS, timeout=max(utils.AFTER_CONTINUE_WAIT + 6, 15))
+            if not clicked_download:
+                clicked_download = utils.force_click_download_button_detailed(driver)
+        utils.record_strategy_result(link_host, 'download', clicked_download, True)
+    return clicked_download
+
+
+# Staging folders end in the host and process working on them, so copies of the script sharing a staging area (or
+# resuming after one crashed) never download into the same folder
+STAGING_OWNER = f'{socket.gethostname()}-{os.getpid()}'
+
+
+def staging_folder_name(job: dict, kind: str = '') -> str:
+    """
+    Names a link's staging folder after the link and this process: _tmp_Video_{kind}s{store_id}_{owner} for links
+    from the job store, _tmp_Video_{kind}n{number}_{owner} otherwise. kind tells apart the folders of a link's stages
+    ('r' while resolving, 't' for transfers). A folder an earlier process left for the same link is taken over, so
+    its partial downloads can be resumed: for job store links holding the lease means that process gave the link up,
+    for others only folders of processes no longer running on this host are taken.
+    """
+    link_key = f"s{job['store_id']}" if 'store_id' in job else f"n{job['number']}"
+    prefix = f'_tmp_Video_{kind}{link_key}_'
+    staging_name = prefix + STAGING_OWNER
+    staging_root = STAGING_PATH or BASE_OUTPUT_PATH
+    staging_dir = os.path.join(staging_root, staging_name)
+    if os.path.isdir(staging_dir) or not os.path.isdir(staging_root):
+        return staging_name
+    leftover_dirs = []
+    for entry_name in os.listdir(staging_root):
+        if not entry_name.startswith(prefix) or entry_name == staging_name:
+            continue
+        owner_host, _, owner_pid = entry_name[len(prefix):].rpartition('-')
+        if 'store_id' not in job and not (owner_host == socket.gethostname() and owner_pid.isdigit() and not utils.process_running(int(owner_pid))):
+            continue
+        leftover_dirs.append(os.path.join(staging_root, entry_name))
+    if leftover_dirs:
+        leftover_dir = max(leftover_dirs, key=os.path.getmtime)
+        try:
+            os.rename(leftover_dir, staging_dir)
+            print(f'   [Resume] Taking over staging folder {os.path.basename(leftover_dir)}')
+        except OSError:
+            pass
+    return staging_name
+
+
+def download_zoom_recording(driver, title: str, link: str, file_index: int, worker_id: int = None, staging_name: str = None) -> dict:
     """Navigates to the Zoom recording payload, detects the download button, and extracts files locally."""
     safe_title = utils.sanitize(title).replace(' ', '_')
     destination_directory = BASE_OUTPUT_PATH
     os.makedirs(destination_directory, exist_ok=True)
 
-    temporary_download_dir = os.path.join(destination_directory, f'_tmp_Video_{file_index}')
+    # Workers get their own staging folder so parallel browsers never download into the same directory
+    if staging_name is None:
+        staging_name = f'_tmp_Video_{file_index}_{STAGING_OWNER}' if worker_id is None else f'_tmp_Video_w{worker_id}_{file_index}_{STAGING_OWNER}'
+    temporary_download_dir = os.path.join(STAGING_PATH or destination_directory, staging_name)
     try:
-        if os.path.isdir(temporary_download_dir):
-            shutil.rmtree(temporary_download_dir)
-        os.makedirs(temporary_download_dir, exist_ok=True)
+        # Leftovers from an earlier run are cleared, except partial downloads that can still be resumed
+        resumable_files = utils.clear_staging_folder(temporary_download_dir)
     except Exception:
+        resumable_files = []
         os.makedirs(temporary_download_dir, exist_ok=True)
 
-    utils.prepare_download_folder(driver, temporary_download_dir)
     link_start_time = time.time()
+    # Chrome downloads that were given up on while still running; nothing may touch their folder afterwards
+    downloads_active = False
+
+    # Fast path: many share pages expose their media URLs directly, so try plain HTTP before loading the page in Chrome
+    if utils.HTTP_FAST_PATH and not resumable_files:
+        metrics.phase('http_fast_path')
+        fast_path_files = utils.download_share_over_http(link, temporary_download_dir)
+        if fast_path_files:
+            metrics.phase('move')
+            moved_files = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
+            try:
+                # damaged files stay behind for the retry to see; otherwise the folder is empty now
+                if not os.listdir(temporary_download_dir):
+                    os.rmdir(temporary_download_dir)
+            except Exception:
+                pass
+            return {'status': 'done', 'elapsed': time.time() - link_start_time, 'files': moved_files, 'temporary_download_dir': temporary_download_dir, 'destination_directory': destination_directory, 'safe_title': safe_title}
+
+    metrics.phase('page_load')
+    utils.prepare_download_folder(driver, temporary_download_dir, page_url=link)
+    utils.reset_network_capture(driver)
 
     driver.get(link)
-    utils.click_with_retries(driver, [
-        "//button[normalize-space()='Continue']",
-        "//a[normalize-space()='Continue']",
-        "//*[contains(translate(.,'CONTINUE','continue'),'continue')]"
-    ], timeout=max(utils.PAGE_LOAD_WAIT, 10))
-
-    host_prefers_exhaustive = 'mpc-edu.zoom.us' in link.lower()
-    clicked_download = False
-
-    if host_prefers_exhaustive:
-        end_time = time.time() + 15
-        while time.time() < end_time:
-            clicked_download = utils.force_click_download_button(driver, temporary_download_dir)
-            if clicked_download:
-                break
-            time.sleep(1.0)
-    else:
-        clicked_download = utils.click_with_retries(driver, [
-            "//button[@aria-label='Download']",
-            "//button[contains(.,'Download')]",
-            "//a[contains(.,'Download')]"
-        ], timeout=max(utils.AFTER_CONTINUE_WAIT + 6, 15))
-        if not clicked_download:
-            clicked_download = utils.force_click_download_button(driver, temporary_download_dir)
+    link_host = (urlparse(link).hostname or '').lower()
+    metrics.phase('continue_click')
+    click_continue_button(driver, link_host)
 
+    # The page is open with its cookies set, so partial files from an interrupted run can be continued over HTTP
+    early_network_urls = set()
+    if resumable_files:
+        metrics.phase('resume')
+        early_network_urls.update(utils.extract_media_urls_from_network_logs(driver))
+        resumed_files = utils.resume_partial_downloads(driver, temporary_download_dir, link, fresh_media_urls=early_network_urls)
+        if resumed_files:
+            resumed_moved = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
+            if resumed_moved:
+                return {'status': 'done', 'elapsed': time.time() - link_start_time, 'files': resumed_moved, 'temporary_download_dir': temporary_download_dir, 'destination_directory': destination_directory, 'safe_title': safe_title}
+
+    metrics.phase('download_click')
+    clicked_download = click_download_button(driver, link_host)
     if not clicked_download:
         return {'status': 'skipped', 'elapsed': time.time() - link_start_time, 'files': [], 'temporary_download_dir': temporary_download_dir, 'destination_directory': destination_directory, 'safe_title': safe_title}
 
-    time.sleep(1.5)
+    download_tracker = utils.get_download_tracker(driver)
+    if download_tracker is not None:
+        # Event-driven: wait for Chrome to report the downloads this click started, then for all of them to finish
+        metrics.phase('first_byte')
+        started_downloads = download_tracker.wait_for_download_start(temporary_download_dir, since=link_start_time, timeout=utils.DOWNLOAD_WAIT)
+        if started_downloads:
+            metrics.phase('transfer', at=min(download['started'] for download in started_downloads))
+            learn_chrome_download_sizes(download_tracker, temporary_download_dir, link_start_time)
+            downloads_active = not wait_for_chrome_downloads(download_tracker, temporary_download_dir, link_start_time)
+            last_finished = record_chrome_downloads(download_tracker, temporary_download_dir, link_start_time)
+            if last_finished:
+                # wait_until_idle also waits out the settle period after the last download, which is drain time
+                metrics.phase('drain', at=last_finished)
+        metrics.phase('move')
+        moved_files = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
+        additional_files_moved = []
+    else:
+        metrics.phase('first_byte')
+        time.sleep(1.5)
 
-    completed_wait = utils.wait_for_initial_download(temporary_download_dir, timeout_seconds=utils.INACTIVITY_COUNTDOWN)
-    if not completed_wait:
-        completed_wait = utils.wait_for_initial_download(temporary_download_dir, timeout_seconds=utils.DOWNLOAD_WAIT)
+        completed_wait = utils.wait_for_initial_download(temporary_download_dir, timeout_seconds=utils.INACTIVITY_COUNTDOWN)
+        if not completed_wait:
+            completed_wait = utils.wait_for_initial_download(temporary_download_dir, timeout_seconds=utils.DOWNLOAD_WAIT)
 
-    moved_files = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
+        metrics.phase('transfer')
+        moved_files = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
 
-    observation_start_time = time.time()
-    previously_seen_files = set(utils.get_completed_downloads(temporary_download_dir))
-    silence_start_time = None
-    additional_files_moved = []
-    while True:
-        currently_seen_files = set(utils.get_completed_downloads(temporary_download_dir))
-        newly_completed_files = sorted(list(currently_seen_files - previously_seen_files))
-        if newly_completed_files:
-            moved_in_current_tick = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
-            for file_name in moved_in_current_tick:
-                if file_name not in additional_files_moved:
-                    additional_files_moved.append(file_name)
-            previously_seen_files = set(utils.get_completed_downloads(temporary_download_dir))
-            silence_start_time = None
-        else:
-            if silence_start_time is None:
-                silence_start_time = time.time()
-            elif time.time() - silence_start_time >= utils.INACTIVITY_COUNTDOWN:
+        observation_start_time = time.time()
+        previously_seen_files = set(utils.get_completed_downloads(temporary_download_dir))
+        silence_start_time = None
+        additional_files_moved = []
+        while True:
+            currently_seen_files = set(utils.get_completed_downloads(temporary_download_dir))
+            newly_completed_files = sorted(list(currently_seen_files - previously_seen_files))
+            if newly_completed_files:
+                moved_in_current_tick = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
+                for file_name in moved_in_current_tick:
+                    if file_name not in additional_files_moved:
+                        additional_files_moved.append(file_name)
+                previously_seen_files = set(utils.get_completed_downloads(temporary_download_dir))
+                silence_start_time = None
+            else:
+                if silence_start_time is None:
+                    silence_start_time = time.time()
+                elif time.time() - silence_start_time >= utils.INACTIVITY_COUNTDOWN:
+                    metrics.phase('drain', at=silence_start_time)
+                    break
+            if time.time() - observation_start_time >= utils.MAX_DRAIN_SECONDS:
                 break
-        if time.time() - observation_start_time >= utils.MAX_DRAIN_SECONDS:
-            break
-        time.sleep(0.5)
+            time.sleep(0.5)
 
     all_moved_files = (moved_files or []) + (additional_files_moved or [])
 
     # Fallback Mechanism: If no files were downloaded above, attempt to intercept raw media URLs dynamically from browser performance logs
-    if not all_moved_files:
-        collected_network_urls = set()
+    collected_network_urls = set(early_network_urls)
+    fallback_errors = []
+    if not all_moved_files and not downloads_active:
+        metrics.phase('network_fallback')
         network_fallback_start = time.time()
         last_new_url_discovered = time.time()
         while time.time() - network_fallback_start < utils.NETWORK_FALLBACK_SECONDS:
@@ -169,18 +533,17 @@ def download_zoom_recording(driver, title: str, link: str, file_index: int) -> d
                 try:
                     raw_filename = unquote(urlparse(media_url).path.split('/')[-1]) or f'download_{int(time.time())}'
                     temporary_dest_path = os.path.join(temporary_download_dir, raw_filename)
-                    utils.download_with_browser_cookies(driver, media_url, temporary_dest_path)
-                except Exception:
-                    pass
+                    utils.download_with_browser_cookies(driver, media_url, temporary_dest_path, page_url=link)
+                except Exception as error:
+                    fallback_errors.append(error)
             moved_files = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
             all_moved_files = (moved_files or [])
 
-    # conditional cleanup: only run if user configured extensions to remove
-    file_extensions_removed = []
-    if REMOVE_EXTENSIONS:
-        file_extensions_removed = utils.remove_files_by_extensions(destination_directory, REMOVE_EXTENSIONS)
-        for file_removed in file_extensions_removed:
-            print('   [REMOVE_EXTENSIONS] Removed from title folder:', file_removed)
+    # Without download events nothing has written resume sidecars for Chrome files still in progress yet
+    metrics.phase('cleanup')
+    if any(file_name.endswith('.crdownload') for file_name in os.listdir(temporary_download_dir)):
+        collected_network_urls.update(utils.extract_media_urls_from_network_logs(driver))
+        utils.note_chrome_partials(temporary_download_dir, collected_network_urls, link)
 
     try:
         # attempt to clean up the temporary directory if it's now empty
@@ -189,92 +552,811 @@ def download_zoom_recording(driver, title: str, link: str, file_index: int) -> d
     except Exception:
         pass
 
-    return {'status': 'done', 'elapsed': time.time() - link_start_time, 'files': all_moved_files, 'removed': file_extensions_removed, 'temporary_download_dir': temporary_download_dir, 'destination_directory': destination_directory, 'safe_title': safe_title}
+    result = {'status': 'done', 'elapsed': time.time() - link_start_time, 'files': all_moved_files, 'temporary_download_dir': temporary_download_dir, 'destination_directory': destination_directory, 'safe_title': safe_title}
+    if downloads_active:
+        print(f'   [Warning] Download(s) in {staging_name} stopped receiving data; leaving them to finish or be resumed')
+        result.update(status='failed', failure='stalled', error='Chrome download stalled')
+    elif not all_moved_files and fallback_errors:
+        # why the direct downloads failed decides whether (and how soon) the link is retried
+        result.update(utils.describe_failure(fallback_errors[-1]))
+    return result
 
 
-def main():
-    links_by_title = parse_zoom_links_file(INPUT_TXT)
-    total_links_count = sum(len(links) for links in links_by_title.values())
-    print(f'Total links to process: {total_links_count}')
+def wait_for_chrome_downloads(download_tracker, folder: str, since: float) -> bool:
+    """
+    Waits for the Chrome downloads in folder to finish: up to MAX_DRAIN_SECONDS, then for as long as one of them keeps
+    receiving data (utils.DOWNLOAD_STALL_SECONDS), but no longer than ACTIVE_DOWNLOAD_TIMEOUT_SECONDS after since.
+    Returns True once idle, False when downloads are still active.
+    """
+    timeout = utils.MAX_DRAIN_SECONDS
+    while not download_tracker.wait_until_idle(folder, timeout=timeout, settle=utils.DOWNLOAD_SETTLE_SECONDS):
+        remaining = since + ACTIVE_DOWNLOAD_TIMEOUT_SECONDS - time.time()
+        if remaining <= 0 or download_tracker.closed or not download_tracker.is_progressing(folder, utils.DOWNLOAD_STALL_SECONDS):
+            return False
+        timeout = min(utils.DOWNLOAD_STALL_SECONDS, remaining)
+    return True
 
-    driver = initialize_webdriver()
-    elapsed_times = []
-    overall_progress = {'total': 0, 'success': 0, 'failed': 0, 'skipped': 0}
-    unsuccessful_links = []
 
-    links_processed_count = 0
-    last_temporary_dir = None
-    last_destination_dir = None
-    last_title_prefix = None
+def learn_chrome_download_sizes(download_tracker, folder: str, since: float, timer=None):
+    """Notes the sizes Chrome has reported so far for the downloads in folder on the link's timer (default: current)."""
+    for download in download_tracker.downloads_for(folder, since=since):
+        if download['total_bytes']:
+            if timer is not None:
+                timer.expected_files[download['suggested_filename']] = download['total_bytes']
+            else:
+                metrics.expect_file(download['suggested_filename'], download['total_bytes'])
+
+
+def record_chrome_downloads(download_tracker, folder: str, since: float):
+    """
+    Adds the size and speed of the Chrome downloads that completed in folder to the link's metrics.
+    Returns when the last of them finished, or None.
+    """
+    last_finished = None
+    for download in download_tracker.downloads_for(folder, since=since):
+        if download['state'] == 'completed' and download['finished']:
+            metrics.record_file(download['suggested_filename'], download['total_bytes'] or download['received_bytes'],
+                                download['finished'] - download['started'], 'chrome')
+            last_finished = max(last_finished or 0, download['finished'])
+    return last_finished
+
+
+def build_link_jobs(links_by_title: dict) -> list:
+    """
+    Flattens the parsed links into an ordered list of jobs, keeping each link's index within its title.
+    With DEDUPE_LINKS, a repeated recording becomes an alias of its first job instead of a job of its own.
+    """
+    jobs = []
+    jobs_by_share_id = {}
+    duplicate_count = 0
     for title, links in links_by_title.items():
         for index, link in enumerate(links, start=1):
-            links_processed_count += 1
-            overall_progress['total'] += 1
-            print(f'\n[{links_processed_count}/{total_links_count}] {title} -> {link}')
-            download_result = download_zoom_recording(driver, title, link, index)
-            elapsed_times.append(download_result.get('elapsed', 0))
-            last_temporary_dir = download_result.get('temporary_download_dir') or last_temporary_dir
-            last_destination_dir = download_result.get('destination_directory') or last_destination_dir
-            last_title_prefix = download_result.get('safe_title') or last_title_prefix
-
-            if download_result['status'] == 'done' and download_result.get('files'):
-                overall_progress['success'] += 1
-                print('   [Success] Downloaded:', download_result.get('files'))
-            elif download_result['status'] == 'skipped':
-                overall_progress['skipped'] += 1
-                print('   [Skipped] Skipped (no download control)')
-                unsuccessful_links.append({'title': title, 'link': link, 'reason': 'No download button'})
-            else:
-                overall_progress['failed'] += 1
-                print('   [Failed] Failed to capture files')
-                unsuccessful_links.append({'title': title, 'link': link, 'reason': 'Missing files after attempts'})
+            share_id = utils.normalize_share_id(link) if DEDUPE_LINKS else None
+            first_job = jobs_by_share_id.get(share_id)
+            if first_job is not None:
+                duplicate_count += 1
+                if title != first_job['title'] and title not in [alias['title'] for alias in first_job['aliases']]:
+                    first_job['aliases'].append({'title': title, 'index': index})
+                continue
+            job = {'title': title, 'link': link, 'index': index, 'number': len(jobs) + 1, 'aliases': []}
+            if share_id is not None:
+                jobs_by_share_id[share_id] = job
+            jobs.append(job)
+    if duplicate_count:
+        print(f'[Dedupe] Skipping {duplicate_count} duplicate link(s) of recordings already in the list')
+    return jobs
+
+
+def link_alias_titles(job: dict, download_result: dict):
+    """Makes a finished recording's files available under the other titles that link to the same recording."""
+    if not job.get('aliases') or download_result.get('status') != 'done' or not download_result.get('files'):
+        return
+    safe_title = utils.sanitize(job['title']).replace(' ', '_')
+    for alias in job['aliases']:
+        alias_title = utils.sanitize(alias['title']).replace(' ', '_')
+        linked_files = utils.link_title_copies(BASE_OUTPUT_PATH, download_result['files'], safe_title, alias_title)
+        if linked_files:
+            print(f"   [Dedupe] Also filed under '{alias['title']}':", linked_files)
+
 
-            average_time_per_link = sum(elapsed_times) / len(elapsed_times) if elapsed_times else 0
-            remaining_links_count = max(0, total_links_count - links_processed_count)
-            estimated_remaining_seconds = int(average_time_per_link * remaining_links_count)
-            print(f'   [Time] Avg {average_time_per_link:.1f}s/link — est remaining {estimated_remaining_seconds//60}m {estimated_remaining_seconds%60}s')
+def file_unlinked_aliases(job_store):
+    """Files finished recordings under the titles that joined their links after they were claimed."""
+    for job in job_store.take_unlinked_aliases():
+        link_alias_titles(job, {'status': 'done', 'files': job['files']})
 
-    # Before quitting browser, ensure last link's active downloads completed and move remaining files
+
+def finish_remaining_downloads(temporary_dir, destination_dir, title_prefix, tracker=None):
+    """Waits for a worker's last link to finish downloading, then moves and cleans up its staging folder."""
     try:
-        if ACTIVE_DOWNLOAD_TIMEOUT_SECONDS > 0 and last_temporary_dir and os.path.isdir(last_temporary_dir):
-            utils.wait_for_active_downloads(last_temporary_dir, timeout=ACTIVE_DOWNLOAD_TIMEOUT_SECONDS)
+        if ACTIVE_DOWNLOAD_TIMEOUT_SECONDS > 0 and temporary_dir and os.path.isdir(temporary_dir):
+            utils.wait_for_active_downloads(temporary_dir, timeout=ACTIVE_DOWNLOAD_TIMEOUT_SECONDS, tracker=tracker)
 
         # Move any files that finished after the wait into the destination folder
-        if last_temporary_dir and last_destination_dir and os.path.isdir(last_temporary_dir):
-            moved_after_wait = utils.move_downloads_to_destination(last_temporary_dir, last_destination_dir, title_prefix=last_title_prefix)
+        if temporary_dir and destination_dir and os.path.isdir(temporary_dir):
+            moved_after_wait = utils.move_downloads_to_destination(temporary_dir, destination_dir, title_prefix=title_prefix)
             if moved_after_wait:
                 print('   [Moved] Moved files to title folder after final wait:', moved_after_wait)
 
-            # conditional final cleanup: only run if user configured extensions to remove
-            if REMOVE_EXTENSIONS:
-                removed_after_wait = utils.remove_files_by_extensions(last_destination_dir, REMOVE_EXTENSIONS)
-                for removed_file in removed_after_wait:
-                    print('   [Removed] Removed from title folder after final wait:', removed_file)
-
             # try to remove tmp folder if empty
             try:
-                if not os.listdir(last_temporary_dir):
-                    os.rmdir(last_temporary_dir)
+                if not os.listdir(temporary_dir):
+                    os.rmdir(temporary_dir)
             except Exception:
                 pass
 
     except Exception:
         pass
 
-    driver.quit()
 
+def flag_broken_downloads(download_result: dict):
+    """
+    Turns a result into a 'truncated' failure if any of the link's files failed verification and were set aside.
+    The retry downloads the whole link again; its intact files were already filed, and their new copies are matched
+    to them by the content index instead of being stored twice.
+    """
+    temporary_dir = download_result.get('temporary_download_dir')
+    broken_files = zoom_verify.list_broken(temporary_dir) if temporary_dir else []
+    if broken_files:
+        download_result.update(status='failed', failure='truncated', error='Damaged: ' + ', '.join(broken_files))
+
+
+def record_link_result(run_state: dict, job: dict, download_result: dict):
+    """
+    Merges a single link's result into the shared progress summary and prints the running estimate. A failed or
+    skipped link that the scheduler takes back for a retry is only reported as such.
+    """
+    flag_broken_downloads(download_result)
+    failure = failure_class(download_result)
+    scheduler = run_state.get('scheduler')
+    retry_delay = scheduler.complete(job, download_result) if scheduler is not None else None
+    if retry_delay is not None:
+        print(f"\n[Retry] {job['title']} -> {job['link']}: {failure}, try {job['retries'] + 1} in {retry_delay:.0f}s")
+        metrics.finish_link(job.get('timer'), 'retry')
+        return
+
+    timer = job.get('timer')
+    size_bytes = sum(file_record['bytes'] or 0 for file_record in timer.files) if timer is not None else 0
+    expected_bytes = timer.expected_bytes if timer is not None else 0
+    with run_state['lock']:
+        overall_progress = run_state['overall_progress']
+        run_state['elapsed_times'].append(download_result.get('elapsed', 0))
+        run_state['links_processed_count'] += 1
+        overall_progress['total'] += 1
+        run_state['finished_links'].add(job_key(job))
+        run_state['bytes_done'] += size_bytes
+        if size_bytes or expected_bytes:
+            run_state['link_sizes'][job_key(job)] = size_bytes or expected_bytes
+        title, link = job['title'], job['link']
+
+        print(f"\n[{run_state['links_processed_count']}/{run_state['total_links_count']}] {title} -> {link}")
+        if failure is None:
+            overall_progress['success'] += 1
+            print('   [Success] Downloaded:', download_result.get('files'))
+        elif download_result['status'] == 'skipped':
+            overall_progress['skipped'] += 1
+            print('   [Skipped] Skipped (no download control)')
+            run_state['unsuccessful_links'].append({'title': title, 'link': link, 'reason': 'No download button', 'tries': job.get('retries', 0) + 1})
+        else:
+            overall_progress['failed'] += 1
+            print(f'   [Failed] Failed to capture files ({failure})')
+            run_state['unsuccessful_links'].append({'title': title, 'link': link, 'reason': 'Missing files after attempts', 'failure': failure,
+                                                    'tries': job.get('retries', 0) + 1})
+
+        print_time_estimate(run_state)
+    metrics.finish_link(timer, download_result['status'])
+    if run_state.get('job_store') is not None and 'store_id' in job:
+        if failure is None:
+            store_status = 'done'
+        else:
+            store_status = 'skipped' if download_result['status'] == 'skipped' else 'failed'
+        # with background moves the files may still be on their way; the link only counts as done once they arrived
+        utils.run_after_pending_moves(lambda: finish_in_job_store(
+            run_state['job_store'], job, store_status, download_result.get('files') or [], size_bytes,
+            download_result.get('error') or failure, expected_bytes or None))
+
+
+def finish_in_job_store(job_store, job: dict, store_status: str, files: list, size_bytes: int, error, expected_bytes):
+    """
+    Records a link's outcome in the job store after its files were moved. A 'done' link whose files didn't all reach
+    BASE_OUTPUT_PATH is recorded as failed instead, so it is downloaded again rather than marked finished without them.
+    """
+    if store_status == 'done':
+        missing_files = [file_name for file_name in files if not os.path.exists(os.path.join(BASE_OUTPUT_PATH, file_name))]
+        if missing_files:
+            store_status, error = 'failed', 'Not filed: ' + ', '.join(missing_files)
+    if not job_store.finish(job, store_status, files, size_bytes, error, expected_bytes=expected_bytes):
+        print(f"   [Job store] Lease on {job['link']} was taken over by another run; its result there is kept")
+
+
+def print_time_estimate(run_state: dict):
+    """
+    Prints the estimated time left (with run_state['lock'] held). Once sizes are known this is the bytes still to
+    download over the run's download speed so far, since recordings differ in size by orders of magnitude; until
+    then it is the average time per link.
+    """
+    link_sizes = dict(run_state['link_sizes'])
+    # links in flight may have learned their size from Content-Length or Chrome's download totals by now
+    for active_job in run_state['scheduler'].active_jobs() if run_state.get('scheduler') is not None else []:
+        active_timer = active_job.get('timer')
+        if active_timer is not None and active_timer.expected_bytes:
+            link_sizes[job_key(active_job)] = active_timer.expected_bytes
+    unknown_bytes = typical_size(link_sizes.values())
+    bytes_done = run_state['bytes_done']
+    run_seconds = time.time() - run_state['started']
+    if bytes_done and unknown_bytes and run_seconds > 0:
+        bytes_left = sum(size or unknown_bytes for key, size in link_sizes.items() if key not in run_state['finished_links'])
+        bytes_per_second = bytes_done / run_seconds
+        estimated_remaining_seconds = int(bytes_left / bytes_per_second)
+        print(f'   [Time] {utils.format_bytes(bytes_done)} of ~{utils.format_bytes(bytes_done + bytes_left)} at {bytes_per_second / 1e6:.1f} MB/s '
+              f'— est remaining {estimated_remaining_seconds//60}m {estimated_remaining_seconds%60}s')
+        return
+
+    # Links finish concurrently, so the estimate divides the remaining work across all workers
+    elapsed_times = run_state['elapsed_times']
+    average_time_per_link = sum(elapsed_times) / len(elapsed_times) if elapsed_times else 0
+    remaining_links_count = max(0, run_state['total_links_count'] - run_state['links_processed_count'])
+    estimated_remaining_seconds = int(average_time_per_link * remaining_links_count / max(1, run_state['worker_count']))
+    print(f'   [Time] Avg {average_time_per_link:.1f}s/link — est remaining {estimated_remaining_seconds//60}m {estimated_remaining_seconds%60}s')
+
+
+def probe_link_sizes(jobs: list) -> list:
+    """
+    Looks up each job's recording size over plain HTTP, SIZE_PROBE_CONCURRENCY at a time, and stores it in
+    job['expected_bytes']. Returns the jobs whose size was found.
+    """
+    if not jobs:
+        return []
+    print(f'[Sizes] Looking up the size of {len(jobs)} link(s)')
+    with ThreadPoolExecutor(max_workers=max(1, SIZE_PROBE_CONCURRENCY)) as executor:
+        sizes = list(executor.map(lambda job: utils.probe_recording_size(job['link']), jobs))
+    sized_jobs = []
+    for job, size_bytes in zip(jobs, sizes):
+        if size_bytes:
+            job['expected_bytes'] = size_bytes
+            sized_jobs.append(job)
+    print(f"[Sizes] Found {len(sized_jobs)} of {len(jobs)}, {utils.format_bytes(sum(job['expected_bytes'] for job in sized_jobs))} in total")
+    return sized_jobs
+
+
+def resolve_zoom_recording(driver, title: str, link: str, file_index: int, worker_id: int = None, staging_name: str = None) -> dict:
+    """
+    Browser stage of the pipeline: opens the recording and clicks Download only to learn what would be downloaded.
+    Chrome's downloads are cancelled as soon as they begin; their URLs and file names, plus the page's cookies, are
+    returned for the transfer stage. Status is 'resolved', 'skipped' (no download control) or 'unresolved'.
+    """
+    link_start_time = time.time()
+    if utils.HTTP_FAST_PATH:
+        metrics.phase('http_fast_path')
+        media_urls = utils.resolve_share_page_over_http(link)
+        media_urls = [media_url for media_url in media_urls if not utils.is_unwanted_media(url=media_url)]
+        if media_urls:
+            media = [{'url': media_url, 'file_name': unquote(urlparse(media_url).path.split('/')[-1])} for media_url in media_urls]
+            return {'status': 'resolved', 'media': media, 'cookies': [], 'elapsed': time.time() - link_start_time}
+
+    download_tracker = utils.get_download_tracker(driver)
+    if download_tracker is None:
+        return {'status': 'unresolved', 'elapsed': time.time() - link_start_time}
+
+    if staging_name is None:
+        staging_name = f'_tmp_Video_r{file_index}_{STAGING_OWNER}' if worker_id is None else f'_tmp_Video_rw{worker_id}_{file_index}_{STAGING_OWNER}'
+    intercept_dir = os.path.join(STAGING_PATH or BASE_OUTPUT_PATH, staging_name)
+    utils.prepare_download_folder(driver, intercept_dir)
+    utils.reset_network_capture(driver)
+    download_tracker.intercept_folder(intercept_dir)
+    try:
+        metrics.phase('page_load')
+        driver.get(link)
+        link_host = (urlparse(link).hostname or '').lower()
+        metrics.phase('continue_click')
+        click_continue_button(driver, link_host)
+        metrics.phase('download_click')
+        if not click_download_button(driver, link_host):
+            return {'status': 'skipped', 'elapsed': time.time() - link_start_time}
+
+        metrics.phase('capture_urls')
+        started_downloads = download_tracker.wait_for_download_start(intercept_dir, since=link_start_time, timeout=utils.DOWNLOAD_WAIT)
+        if started_downloads:
+            # one click can start several files (video, audio, transcript), so give the rest a moment to begin
+            download_tracker.wait_until_idle(intercept_dir, timeout=utils.DOWNLOAD_WAIT, settle=utils.DOWNLOAD_SETTLE_SECONDS)
+        media = [{'url': download['url'], 'file_name': download['suggested_filename'] or unquote(urlparse(download['url']).path.split('/')[-1])}
+                 for download in download_tracker.downloads_for(intercept_dir, since=link_start_time) if download['url']]
+        media = [item for item in media if not utils.is_unwanted_media(file_name=item['file_name'], url=item['url'])]
+        if not media:
+            media = [{'url': media_url, 'file_name': unquote(urlparse(media_url).path.split('/')[-1])}
+                     for media_url in utils.extract_media_urls_from_network_logs(driver)]
+        if not media:
+            return {'status': 'unresolved', 'elapsed': time.time() - link_start_time}
+        return {'status': 'resolved', 'media': media, 'cookies': driver.get_cookies(), 'elapsed': time.time() - link_start_time}
+    finally:
+        download_tracker.intercept_folder(intercept_dir, enabled=False)
+        try:
+            if os.path.isdir(intercept_dir) and not os.listdir(intercept_dir):
+                os.rmdir(intercept_dir)
+        except Exception:
+            pass
+
+
+def transfer_resolved_recording(job: dict) -> dict:
+    """Transfer stage of the pipeline: downloads a resolved recording's files over HTTP and files them under its title."""
+    transfer_start_time = time.time()
+    # runs on a worker thread of its own, so the job's timer has to be picked up here
+    metrics.use_timer(job.get('timer'))
+    safe_title = utils.sanitize(job['title']).replace(' ', '_')
+    destination_directory = BASE_OUTPUT_PATH
+    # named by link, so transfers never share a folder with each other or with a browser
+    temporary_download_dir = os.path.join(STAGING_PATH or destination_directory, staging_folder_name(job, 't'))
+    utils.clear_staging_folder(temporary_download_dir)
+
+    # each transfer slot keeps its own warm session; only the cookies that differ from its previous job are swapped in
+    session = utils.get_http_session(f"transfer-{job['transfer_slot']}")
+    utils.sync_session_cookies(session, job['cookies'])
+    referer_headers = {'Referer': job['link']}
+    transfer_errors = []
+    metrics.phase('transfer')
+    for media in job['media']:
+        try:
+            utils.download_url(session, media['url'], os.path.join(temporary_download_dir, media['file_name']), page_url=job['link'], headers=referer_headers)
+        except Exception as error:
+            print(f"   [Warning] Transfer of {media['file_name']} failed: {error}")
+            transfer_errors.append(error)
+
+    metrics.phase('move')
+    moved_files = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
+    try:
+        if not os.listdir(temporary_download_dir):
+            os.rmdir(temporary_download_dir)
+    except Exception:
+        pass
+
+    status = 'done' if moved_files and not transfer_errors else 'failed'
+    result = {'status': status, 'elapsed': job['resolve_elapsed'] + time.time() - transfer_start_time, 'files': moved_files,
+              'temporary_download_dir': temporary_download_dir}
+    if transfer_errors:
+        result.update(utils.describe_failure(transfer_errors[-1]))
+    return result
+
+
+async def _transfer_worker(transfer_slot: int, transfer_queue: asyncio.Queue, run_state: dict):
+    while True:
+        job = await transfer_queue.get()
+        if job is None:
+            return
+        job['transfer_slot'] = transfer_slot
+        try:
+            transfer_result = await asyncio.to_thread(transfer_resolved_recording, job)
+        except Exception as error:
+            print(f"   [Transfer] Error while transferring {job['link']}: {error}")
+            transfer_result = dict({'status': 'failed', 'elapsed': job['resolve_elapsed'], 'files': []}, **utils.describe_failure(error))
+        # both can block for a while (alias links wait for pending moves, job store writes for the database lock),
+        # which would stall every other transfer and the browsers queueing new ones
+        await asyncio.to_thread(link_alias_titles, job, transfer_result)
+        await asyncio.to_thread(record_link_result, run_state, job, transfer_result)
+
+
+def make_pipeline_handler(transfer_queue: asyncio.Queue, event_loop):
+    """Returns a run_worker job handler that resolves links in the browser and hands them to the transfer stage."""
+    def handle_job(driver, job, worker_label):
+        resolved = resolve_zoom_recording(driver, job['title'], job['link'], job['index'], worker_id=worker_label,
+                                          staging_name=staging_folder_name(job, 'r'))
+        if resolved['status'] == 'resolved':
+            transfer_job = dict(job, media=resolved['media'], cookies=resolved['cookies'], resolve_elapsed=resolved['elapsed'])
+            metrics.phase('transfer_queue')
+            # blocks while the transfer queue is full, which keeps the browser from racing ahead of the downloads
+            asyncio.run_coroutine_threadsafe(transfer_queue.put(transfer_job), event_loop).result()
+            return None
+        if resolved['status'] == 'skipped':
+            return resolved
+        # the URLs couldn't be captured, so let the browser download this one itself
+        return download_zoom_recording(driver, job['title'], job['link'], job['index'], worker_id=worker_label,
+                                       staging_name=staging_folder_name(job))
+    return handle_job
+
+
+async def _run_pipeline(job_queue, run_state: dict):
+    # browser workers and transfers each hold a thread for their whole run, so size the pool for all of them
+    event_loop = asyncio.get_running_loop()
+    event_loop.set_default_executor(ThreadPoolExecutor(max_workers=run_state['worker_count'] + max(1, TRANSFER_CONCURRENCY)))
+    transfer_queue = asyncio.Queue(maxsize=max(1, TRANSFER_QUEUE_SIZE))
+    transfer_tasks = [asyncio.create_task(_transfer_worker(transfer_slot, transfer_queue, run_state)) for transfer_slot in range(max(1, TRANSFER_CONCURRENCY))]
+    handle_job = make_pipeline_handler(transfer_queue, event_loop)
+    await asyncio.gather(*[asyncio.to_thread(run_worker, worker_id, job_queue, run_state, handle_job)
+                           for worker_id in range(1, run_state['worker_count'] + 1)])
+    for _ in transfer_tasks:
+        await transfer_queue.put(None)
+    await asyncio.gather(*transfer_tasks)
+
+
+def _restart_browser(driver, worker_id, reason: str):
+    """Replaces a worker's browser. Returns the new driver, or None if no browser could be started."""
+    print(f'   [Worker {worker_id}] Restarting browser ({reason})')
+    shutdown_webdriver(driver)
+    for attempt in range(2):
+        try:
+            return initialize_webdriver(worker_id)
+        except Exception as error:
+            print(f'   [Worker {worker_id}] Could not start browser: {error}')
+            time.sleep(5)
+    return None
+
+
+def _recycle_reason(driver, links_on_browser: int):
+    """Why the browser should be recycled before the next link, or None."""
+    if RECYCLE_BROWSER_AFTER_LINKS and links_on_browser >= RECYCLE_BROWSER_AFTER_LINKS:
+        return f'{links_on_browser} links processed'
+    if RECYCLE_BROWSER_RSS_MB and not getattr(driver, '_zoom_attached', False):
+        memory_mb = utils.browser_memory_mb(driver)
+        if memory_mb is not None and memory_mb > RECYCLE_BROWSER_RSS_MB:
+            return f'using {memory_mb:.0f} MB'
+    return None
+
+
+def run_worker(worker_id, job_queue, run_state, handle_job=None):
+    """
+    Pulls jobs off the shared queue with its own browser until the queue is empty. handle_job(driver, job, worker_label)
+    replaces the default download_zoom_recording call; a None result means the job's outcome is recorded elsewhere.
+    The browser is recycled when it has handled too many links or grown too large, and restarted if it dies.
+    """
+    try:
+        driver = initialize_webdriver(worker_id)
+    except Exception as error:
+        print(f'   [Worker {worker_id}] Could not start browser: {error}')
+        return
+
+    worker_label = worker_id if run_state['worker_count'] > 1 else None
+    last_temporary_dir = None
+    last_destination_dir = None
+    last_title_prefix = None
+    links_on_browser = 0
+    try:
+        while True:
+            try:
+                # waits while other links are backing off or still running, since they may come back for a retry
+                job = job_queue.get()
+            except queue.Empty:
+                break
+
+            recycle_reason = _recycle_reason(driver, links_on_browser)
+            if recycle_reason:
+                # Chrome's downloads would die with it, so the previous link has to be finished first
+                finish_remaining_downloads(last_temporary_dir, last_destination_dir, last_title_prefix, tracker=utils.get_download_tracker(driver))
+                last_temporary_dir = None
+                driver = _restart_browser(driver, worker_id, recycle_reason)
+                links_on_browser = 0
+                if driver is None:
+                    record_link_result(run_state, job, {'status': 'failed', 'elapsed': 0, 'files': [], 'failure': 'browser'})
+                    return
+
+            metrics.start_link(job)
+            restarts_for_link = 0
+            while True:
+                try:
+                    if handle_job is not None:
+                        download_result = handle_job(driver, job, worker_label)
+                    else:
+                        download_result = download_zoom_recording(driver, job['title'], job['link'], job['index'], worker_id=worker_label,
+                                                                  staging_name=staging_folder_name(job))
+                except Exception as error:
+                    if restarts_for_link < DEAD_BROWSER_RETRIES and (utils.is_dead_session_error(error) or not utils.driver_alive(driver)):
+                        restarts_for_link += 1
+                        driver = _restart_browser(driver, worker_id, f'browser died: {error.__class__.__name__}')
+                        links_on_browser = 0
+                        # the previous link's unfinished downloads died with the browser; their resume sidecars let a
+                        # later run continue them, so the new browser doesn't wait for them
+                        last_temporary_dir = None
+                        if driver is not None:
+                            metrics.phase('browser_restart')
+                            continue
+                    print(f"   [Worker {worker_id}] Error while processing {job['link']}: {error}")
+                    download_result = dict({'status': 'failed', 'elapsed': 0, 'files': []}, **utils.describe_failure(error))
+                break
+            links_on_browser += 1
+
+            if download_result is not None:
+                last_temporary_dir = download_result.get('temporary_download_dir') or last_temporary_dir
+                last_destination_dir = download_result.get('destination_directory') or last_destination_dir
+                last_title_prefix = download_result.get('safe_title') or last_title_prefix
+                link_alias_titles(job, download_result)
+                record_link_result(run_state, job, download_result)
+            if driver is None:
+                # the browser could not be brought back; leave the rest of the queue to the other workers
+                return
+
+            # the recording page keeps its player (and buffered video) in memory until the tab navigates away
+            try:
+                driver.get('about:blank')
+            except Exception:
+                pass
+
+        # Before quitting browser, ensure last link's active downloads completed and move remaining files
+        finish_remaining_downloads(last_temporary_dir, last_destination_dir, last_title_prefix, tracker=utils.get_download_tracker(driver))
+    finally:
+        if driver is not None:
+            shutdown_webdriver(driver)
+
+
+def _start_link_in_tab(driver, job: dict, tab_state: dict):
+    """
+    Opens a link in the current tab and clicks through until its downloads have started. Returns a slot for
+    _finish_tab_slot to collect once those downloads are done, or a result dict when the link is already finished
+    (HTTP fast path, partial files resumed, no download control, or no download started, which the scheduler retries).
+    Chrome's download folder is never switched away from the worker's shared folder, so the other tabs keep theirs.
+    """
+    metrics.use_timer(job['timer'])
+    link = job['link']
+    safe_title = utils.sanitize(job['title']).replace(' ', '_')
+    destination_directory = BASE_OUTPUT_PATH
+    os.makedirs(destination_directory, exist_ok=True)
+    staging_name = staging_folder_name(job)
+    temporary_download_dir = os.path.join(STAGING_PATH or destination_directory, staging_name)
+    link_start_time = time.time()
+    result_base = {'temporary_download_dir': temporary_download_dir, 'destination_directory': destination_directory, 'safe_title': safe_title}
+    resumable_files = utils.clear_staging_folder(temporary_download_dir)
+
+    if utils.HTTP_FAST_PATH and not resumable_files:
+        metrics.phase('http_fast_path')
+        if utils.download_share_over_http(link, temporary_download_dir):
+            metrics.phase('move')
+            moved_files = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
+            try:
+                if not os.listdir(temporary_download_dir):
+                    os.rmdir(temporary_download_dir)
+            except Exception:
+                pass
+            return dict(result_base, status='done', elapsed=time.time() - link_start_time, files=moved_files)
+
+    metrics.phase('page_load')
+    driver.get(link)
+    link_host = (urlparse(link).hostname or '').lower()
+    metrics.phase('continue_click')
+    click_continue_button(driver, link_host)
+
+    if resumable_files:
+        # partial files from an earlier attempt are continued over HTTP with this tab's cookies
+        metrics.phase('resume')
+        resumed_files = utils.resume_partial_downloads(driver, temporary_download_dir, link,
+                                                       fresh_media_urls=utils.extract_media_urls_from_network_logs(driver))
+        if resumed_files:
+            metrics.phase('move')
+            resumed_moved = utils.move_downloads_to_destination(temporary_download_dir, destination_directory, title_prefix=safe_title)
+            if resumed_moved:
+                return dict(result_base, status='done', elapsed=time.time() - link_start_time, files=resumed_moved)
+
+    # downloads are tied to this tab by the frame they start in, so other tabs can keep starting theirs meanwhile
+    metrics.phase('download_click')
+    utils.prepare_tab_download_folder(driver, driver.current_window_handle, temporary_download_dir, tab_state['shared_folder'], page_url=link)
+    if not click_download_button(driver, link_host):
+        return dict(result_base, status='skipped', elapsed=time.time() - link_start_time, files=[])
+
+    metrics.phase('first_byte')
+    download_tracker = utils.get_download_tracker(driver)
+    started_downloads = download_tracker.wait_for_download_start(temporary_download_dir, since=link_start_time, timeout=utils.DOWNLOAD_WAIT)
+    if not started_downloads:
+        # nothing reached Chrome's downloads; the scheduler gives the link another try later
+        return dict(result_base, status='failed', elapsed=time.time() - link_start_time, files=[], failure='no_files',
+                    error=f'No download started within {utils.DOWNLOAD_WAIT}s')
+    metrics.phase('transfer', at=min(download['started'] for download in started_downloads))
+    return dict(result_base, job=job, link_start_time=link_start_time, deadline=time.time() + utils.MAX_DRAIN_SECONDS)
+
+
+def _finish_tab_slot(download_tracker, slot: dict):
+    """Collects a tab's link once its downloads are idle (or timed out). Returns its result, or None if not yet."""
+    folder = slot['temporary_download_dir']
+    learn_chrome_download_sizes(download_tracker, folder, slot['link_start_time'], timer=slot['job']['timer'])
+    idle = download_tracker.is_idle(folder, settle=utils.DOWNLOAD_SETTLE_SECONDS)
+    if not idle and time.time() < slot['deadline']:
+        return None
+    if (not idle and download_tracker.is_progressing(folder, utils.DOWNLOAD_STALL_SECONDS)
+            and time.time() < slot['link_start_time'] + ACTIVE_DOWNLOAD_TIMEOUT_SECONDS):
+        # past MAX_DRAIN_SECONDS, but still receiving data
+        return None
+    metrics.use_timer(slot['job']['timer'])
+    last_finished = record_chrome_downloads(download_tracker, folder, slot['link_start_time'])
+    if idle and last_finished:
+        metrics.phase('drain', at=last_finished)
+    metrics.phase('move')
+    moved_files = utils.move_downloads_to_destination(folder, slot['destination_directory'], title_prefix=slot['safe_title'])
+    try:
+        if not os.listdir(folder):
+            os.rmdir(folder)
+    except Exception:
+        pass
+    result = {'status': 'done', 'elapsed': time.time() - slot['link_start_time'], 'files': moved_files,
+              'temporary_download_dir': folder, 'destination_directory': slot['destination_directory'], 'safe_title': slot['safe_title']}
+    if not idle:
+        result.update(status='failed', failure='stalled', error='Chrome download stalled')
+    return result
+
+
+def run_tabbed_worker(worker_id, job_queue, run_state):
+    """
+    Like run_worker, but keeps up to TABS_PER_BROWSER links in flight in one browser: while earlier tabs' files are
+    downloading, the next link is opened in a free tab. Each link gets its own folder; Chrome saves every download
+    under its GUID in the worker's shared download folder, and the download tracker moves it to the folder of the
+    tab whose frame started it.
+    """
+    try:
+        driver = initialize_webdriver(worker_id)
+    except Exception as error:
+        print(f'   [Worker {worker_id}] Could not start browser: {error}')
+        return
+    if utils.get_download_tracker(driver) is None:
+        print(f'   [Worker {worker_id}] Download events unavailable; processing one tab at a time')
+        shutdown_webdriver(driver)
+        return run_worker(worker_id, job_queue, run_state)
+
+    tab_handles = [driver.current_window_handle]
+    slots = {}
+    tab_state = {'shared_folder': os.path.join(STAGING_PATH or BASE_OUTPUT_PATH, f'_tmp_Downloads_w{worker_id}_{STAGING_OWNER}')}
+    links_on_browser = 0
+    lingering_slots = []
+    try:
+        while True:
+            download_tracker = utils.get_download_tracker(driver)
+            for tab_handle, slot in list(slots.items()):
+                download_result = _finish_tab_slot(download_tracker, slot)
+                if download_result is not None:
+                    del slots[tab_handle]
+                    if download_result.get('failure') == 'stalled':
+                        lingering_slots.append(slot)
+                    link_alias_titles(slot['job'], download_result)
+                    record_link_result(run_state, slot['job'], download_result)
+
+            recycle_reason = _recycle_reason(driver, links_on_browser)
+            if recycle_reason and not slots:
+                for slot in lingering_slots:
+                    finish_remaining_downloads(slot['temporary_download_dir'], slot['destination_directory'], slot['safe_title'], tracker=download_tracker)
+                lingering_slots = []
+                driver = _restart_browser(driver, worker_id, recycle_reason)
+                if driver is None:
+                    return
+                tab_handles = [driver.current_window_handle]
+                links_on_browser = 0
+                continue
+
+            free_handle = next((tab_handle for tab_handle in tab_handles if tab_handle not in slots), None)
+            if free_handle is None and len(tab_handles) < TABS_PER_BROWSER:
+                driver.switch_to.new_window('tab')
+                free_handle = driver.current_window_handle
+                tab_handles.append(free_handle)
+            job = None
+            if free_handle is not None and not recycle_reason:
+                try:
+                    # only an idle browser waits for links that are backing off; a busy one goes back to its tabs
+                    job = job_queue.get(block=not slots)
+                except queue.Empty:
+                    job = None
+            if job is None:
+                if not slots:
+                    break
+                time.sleep(0.5)
+                continue
+
+            metrics.start_link(job)
+            try:
+                driver.switch_to.window(free_handle)
+                outcome = _start_link_in_tab(driver, job, tab_state)
+            except Exception as error:
+                if utils.is_dead_session_error(error) or not utils.driver_alive(driver):
+                    # every link in flight lost its downloads with the browser, so they go back on the queue
+                    for lost_job in [slot['job'] for slot in slots.values()] + [job]:
+                        lost_job['browser_restarts'] = lost_job.get('browser_restarts', 0) + 1
+                        if lost_job['browser_restarts'] <= DEAD_BROWSER_RETRIES:
+                            job_queue.put(lost_job)
+                        else:
+                            record_link_result(run_state, lost_job, {'status': 'failed', 'elapsed': 0, 'files': [], 'failure': 'browser'})
+                    slots = {}
+                    # stalled downloads of finished links died too; they are left to be resumed, not waited for
+                    lingering_slots = []
+                    driver = _restart_browser(driver, worker_id, f'browser died: {error.__class__.__name__}')
+                    if driver is None:
+                        return
+                    tab_handles = [driver.current_window_handle]
+                    links_on_browser = 0
+                    continue
+                print(f"   [Worker {worker_id}] Error while processing {job['link']}: {error}")
+                outcome = dict({'status': 'failed', 'elapsed': 0, 'files': []}, **utils.describe_failure(error))
+            links_on_browser += 1
+            if 'job' in outcome:
+                slots[free_handle] = outcome
+            else:
+                link_alias_titles(job, outcome)
+                record_link_result(run_state, job, outcome)
+
+        for slot in lingering_slots:
+            finish_remaining_downloads(slot['temporary_download_dir'], slot['destination_directory'], slot['safe_title'], tracker=utils.get_download_tracker(driver))
+        try:
+            # partials still in it are kept for their links' next attempt
+            if os.path.isdir(tab_state['shared_folder']) and not os.listdir(tab_state['shared_folder']):
+                os.rmdir(tab_state['shared_folder'])
+        except Exception:
+            pass
+    finally:
+        if driver is not None:
+            shutdown_webdriver(driver)
+
+
+def main():
+    links_by_title = parse_zoom_links_file(INPUT_TXT)
+    link_jobs = build_link_jobs(links_by_title)
+    job_store = None
+    if JOB_STORE_PATH:
+        job_store = JobStore(JOB_STORE_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS, use_wal=JOB_STORE_WAL)
+        added_count = job_store.ingest(link_jobs, utils.normalize_share_id if DEDUPE_LINKS else str)
+        store_counts = job_store.counts()
+        print(f"Job store {JOB_STORE_PATH}: {added_count} new link(s), {store_counts.get('done', 0)} already done, "
+              f"{store_counts.get('leased', 0)} claimed by other runs")
+        file_unlinked_aliases(job_store)
+        pending_jobs = job_store.pending_jobs()
+    else:
+        pending_jobs = link_jobs
+    total_links_count = len(pending_jobs)
+    print(f'Total links to process: {total_links_count}')
+
+    if SCHEDULING_POLICY in ('largest_first', 'smallest_first'):
+        sized_jobs = probe_link_sizes([job for job in pending_jobs if not job.get('expected_bytes')])
+        if job_store is not None and sized_jobs:
+            job_store.record_expected_bytes({job['store_id']: job['expected_bytes'] for job in sized_jobs})
+        print(f'Scheduling {SCHEDULING_POLICY.replace("_", " ")}')
+
+    worker_count = max(1, min(WORKER_COUNT, total_links_count or 1))
+    run_state = {
+        'lock': threading.Lock(),
+        'elapsed_times': [],
+        'overall_progress': {'total': 0, 'success': 0, 'failed': 0, 'skipped': 0},
+        'unsuccessful_links': [],
+        'links_processed_count': 0,
+        'total_links_count': total_links_count,
+        'worker_count': worker_count,
+        'job_store': job_store,
+        'started': time.time(),
+        # best known size of every link in the run (None while unknown), for the byte-based estimate
+        'link_sizes': {job_key(job): job.get('expected_bytes') for job in pending_jobs},
+        'finished_links': set(),
+        'bytes_done': 0,
+    }
+
+    if job_store is not None:
+        link_queue = JobStoreQueue(job_store, SCHEDULING_POLICY, typical_size(job.get('expected_bytes') for job in pending_jobs))
+        job_store.start_lease_renewal()
+    else:
+        link_queue = queue.Queue()
+        for job in order_jobs_by_size(link_jobs, SCHEDULING_POLICY):
+            link_queue.put(job)
+    job_queue = LinkScheduler(link_queue, max_retries=RETRY_ATTEMPTS, backoff_seconds=RETRY_BACKOFF_SECONDS,
+                              max_backoff_seconds=RETRY_MAX_BACKOFF_SECONDS, retry_failures=RETRY_FAILURES,
+                              host_concurrency=HOST_MAX_CONCURRENT_LINKS, host_links_per_minute=HOST_LINKS_PER_MINUTE)
+    run_state['scheduler'] = job_queue
+
+    if PIPELINE_MODE:
+        print(f'Pipeline mode: {worker_count} browser(s) resolving, up to {TRANSFER_CONCURRENCY} transfers at once')
+        asyncio.run(_run_pipeline(job_queue, run_state))
+    else:
+        worker_function = run_worker
+        if TABS_PER_BROWSER > 1:
+            print(f'Keeping up to {TABS_PER_BROWSER} tabs in flight per browser')
+            worker_function = run_tabbed_worker
+        if worker_count == 1:
+            worker_function(1, job_queue, run_state)
+        else:
+            print(f'Starting {worker_count} browser workers')
+            worker_threads = [threading.Thread(target=worker_function, args=(worker_id, job_queue, run_state), daemon=True)
+                              for worker_id in range(1, worker_count + 1)]
+            for worker_thread in worker_threads:
+                worker_thread.start()
+            for worker_thread in worker_threads:
+                worker_thread.join()
+
+    # links still backing off when every worker stopped (e.g. no browser could be started) keep their last result
+    for job in job_queue.close():
+        record_link_result(run_state, job, job['last_result'])
+
+    # the last files may still be on their way to the output folder
+    utils.wait_for_pending_moves()
+    if job_store is not None:
+        job_store.stop_lease_renewal()
+        file_unlinked_aliases(job_store)
+
+    overall_progress = run_state['overall_progress']
+    unsuccessful_links = run_state['unsuccessful_links']
     print('\nSummary:')
     print(f"  Total: {overall_progress['total']}")
     print(f"  Success: {overall_progress['success']}")
     print(f"  Skipped: {overall_progress['skipped']}")
     print(f"  Failed: {overall_progress['failed']}")
+    run_seconds = time.time() - run_state['started']
+    if run_state['bytes_done'] and run_seconds > 0:
+        print(f"  Downloaded: {utils.format_bytes(run_state['bytes_done'])} at {run_state['bytes_done'] / run_seconds / 1e6:.1f} MB/s")
     if unsuccessful_links:
         print('\nFailed links:')
         for failed_link_record in unsuccessful_links:
             print(' -', failed_link_record)
+    metrics.print_summary()
 
 
 if __name__ == '__main__':
-    main()
-
-
+    if '--warm-browser' in sys.argv[1:]:
+        start_warm_browser()
+    elif '--verify' in sys.argv[1:]:
+        verify_output_library()
+    else:
+        main()
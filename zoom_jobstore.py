@@ -0,0 +1,255 @@
+# zoom_jobstore.py
+import os
+import json
+import time
+import queue
+import socket
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    share_key TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    link TEXT NOT NULL,
+    title_index INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    aliases TEXT NOT NULL DEFAULT '[]',
+    unlinked_aliases TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    files TEXT NOT NULL DEFAULT '[]',
+    bytes INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    expected_bytes INTEGER,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_expires, number);
+"""
+
+
+class JobStore:
+    """
+    Persistent queue of links in an SQLite database. Each link is one row with its status ('pending', 'leased',
+    'done', 'failed' or 'skipped'), attempts, files and bytes. Workers claim rows with a lease that this process keeps
+    renewing while the link is being worked on; a lease that runs out (its process crashed or its host went away) makes
+    the link claimable again. Several processes, on one machine or on several sharing the database file, can drain
+    the same store. expected_bytes keeps the recording's size once it is known, so later runs can order by it.
+    unlinked_aliases holds the titles that joined a link after it was claimed, until take_unlinked_aliases() hands
+    them out to be filed.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 600, max_attempts: int = 3, use_wal: bool = True):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.use_wal = use_wal
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self._local = threading.local()
+        self._renewal_stop = threading.Event()
+        self._renewal_thread = None
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        # stores created before these columns existed get them added
+        columns = [row['name'] for row in connection.execute('PRAGMA table_info(jobs)')]
+        if 'expected_bytes' not in columns:
+            connection.execute('ALTER TABLE jobs ADD COLUMN expected_bytes INTEGER')
+        if 'unlinked_aliases' not in columns:
+            connection.execute("ALTER TABLE jobs ADD COLUMN unlinked_aliases TEXT NOT NULL DEFAULT '[]'")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections can't be shared between threads."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            # WAL lets readers and the single writer work at once, but needs shared memory, so it doesn't work
+            # across hosts on a network filesystem; there the rollback journal is used instead
+            connection.execute(f"PRAGMA journal_mode={'WAL' if self.use_wal else 'DELETE'}")
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA busy_timeout=30000')
+            self._local.connection = connection
+        return connection
+
+    def _write(self, statements):
+        """Runs statements(connection) in one IMMEDIATE transaction, so concurrent claimers serialise on it."""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = statements(connection)
+            connection.execute('COMMIT')
+            return result
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def ingest(self, jobs: list, share_key) -> int:
+        """
+        Adds jobs that aren't in the store yet (keyed by share_key(link)) and makes failed or skipped links with
+        attempts left claimable again. A job whose link is already stored under other titles has its title and aliases
+        merged into that link's aliases; when the link is already claimed or done, they are also kept for
+        take_unlinked_aliases(). Returns how many new links were added.
+        """
+        now = time.time()
+
+        def statements(connection):
+            added = 0
+            for job in jobs:
+                key = share_key(job['link'])
+                row = connection.execute('SELECT id, title, status, aliases, unlinked_aliases FROM jobs WHERE share_key = ?', (key,)).fetchone()
+                if row is None:
+                    connection.execute(
+                        'INSERT INTO jobs (share_key, title, link, title_index, number, aliases, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (key, job['title'], job['link'], job['index'], job['number'], json.dumps(job.get('aliases', [])), now))
+                    added += 1
+                    continue
+                aliases = json.loads(row['aliases'])
+                known_titles = {row['title']} | {alias['title'] for alias in aliases}
+                new_aliases = []
+                for alias in [{'title': job['title'], 'index': job['index']}] + job.get('aliases', []):
+                    if alias['title'] not in known_titles:
+                        known_titles.add(alias['title'])
+                        new_aliases.append(alias)
+                if not new_aliases:
+                    continue
+                # a claimed link's worker already has its aliases, and a done link won't be claimed again
+                unlinked_aliases = json.loads(row['unlinked_aliases'])
+                if row['status'] in ('leased', 'done'):
+                    unlinked_aliases += new_aliases
+                connection.execute('UPDATE jobs SET aliases = ?, unlinked_aliases = ?, updated = ? WHERE id = ?',
+                                   (json.dumps(aliases + new_aliases), json.dumps(unlinked_aliases), now, row['id']))
+            connection.execute("UPDATE jobs SET status = 'pending', updated = ? WHERE status IN ('failed', 'skipped') AND attempts < ?",
+                               (now, self.max_attempts))
+            return added
+        return self._write(statements)
+
+    @staticmethod
+    def _row_job(row) -> dict:
+        return {'title': row['title'], 'link': row['link'], 'index': row['title_index'], 'number': row['number'],
+                'aliases': json.loads(row['aliases']), 'store_id': row['id'], 'expected_bytes': row['expected_bytes']}
+
+    def pending_jobs(self) -> list:
+        """The job dicts of every link that is waiting to be claimed, in list order, without claiming them."""
+        rows = self._connection().execute("SELECT * FROM jobs WHERE status = 'pending' ORDER BY number").fetchall()
+        return [self._row_job(row) for row in rows]
+
+    def record_expected_bytes(self, sizes: dict):
+        """Stores the recording sizes learned for links, given as {store_id: bytes}."""
+        self._write(lambda connection: connection.executemany(
+            'UPDATE jobs SET expected_bytes = ? WHERE id = ?', [(size_bytes, store_id) for store_id, size_bytes in sizes.items()]))
+
+    def claim(self, size_order: str = None, unknown_bytes: int = 0):
+        """
+        Leases the next claimable link to this process. Returns its job dict, or None when nothing is left.
+        Links are claimed in list order, or by expected_bytes with size_order 'largest_first' or 'smallest_first'
+        (links of unknown size count as unknown_bytes).
+        """
+        now = time.time()
+        order_by = {'largest_first': 'COALESCE(expected_bytes, :unknown) DESC, number',
+                    'smallest_first': 'COALESCE(expected_bytes, :unknown), number'}.get(size_order, 'number')
+
+        def statements(connection):
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' OR (status = 'leased' AND lease_expires < :now) "
+                f"ORDER BY {order_by} LIMIT 1", {'now': now, 'unknown': unknown_bytes}).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "unlinked_aliases = '[]', updated = ? WHERE id = ?", (self.owner, now + self.lease_seconds, now, row['id']))
+            return row
+        row = self._write(statements)
+        if row is None:
+            return None
+        return dict(self._row_job(row), attempts=row['attempts'] + 1)
+
+    def release(self, job: dict):
+        """Gives a leased link back without counting the attempt, e.g. when its browser died."""
+        self._write(lambda connection: connection.execute(
+            "UPDATE jobs SET status = 'pending', lease_owner = NULL, lease_expires = NULL, attempts = MAX(attempts - 1, 0), updated = ? "
+            "WHERE id = ? AND lease_owner = ?", (time.time(), job['store_id'], self.owner)))
+
+    def finish(self, job: dict, status: str, files: list = None, size_bytes: int = 0, error: str = None, expected_bytes: int = None) -> bool:
+        """
+        Records a link's outcome and ends its lease. expected_bytes, if given, replaces the stored size. Returns False
+        when this process no longer holds the link's lease (it ran out and another process took the link over), in
+        which case nothing is recorded.
+        """
+        cursor = self._write(lambda connection: connection.execute(
+            'UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, files = ?, bytes = ?, last_error = ?, '
+            'expected_bytes = COALESCE(?, expected_bytes), updated = ? WHERE id = ? AND lease_owner = ?',
+            (status, json.dumps(files or []), size_bytes, error, expected_bytes, time.time(), job['store_id'], self.owner)))
+        return cursor.rowcount > 0
+
+    def take_unlinked_aliases(self) -> list:
+        """
+        Hands out, once, the titles that joined finished links after they were claimed: returns the job dicts of those
+        links with 'aliases' set to just the new titles and 'files' to the link's stored files.
+        """
+        def statements(connection):
+            rows = connection.execute("SELECT * FROM jobs WHERE status = 'done' AND unlinked_aliases != '[]'").fetchall()
+            connection.executemany("UPDATE jobs SET unlinked_aliases = '[]' WHERE id = ?", [(row['id'],) for row in rows])
+            return rows
+        return [dict(self._row_job(row), aliases=json.loads(row['unlinked_aliases']), files=json.loads(row['files']))
+                for row in self._write(statements)]
+
+    def requeue_files(self, file_names) -> int:
+        """
+        Makes the finished links that produced any of file_names claimable again. Returns how many there were. The
+        whole link is downloaded again, not only the named files.
+        """
+        wanted = set(file_names)
+        now = time.time()
+
+        def statements(connection):
+            rows = connection.execute("SELECT id, files FROM jobs WHERE status = 'done'").fetchall()
+            store_ids = [row['id'] for row in rows if wanted & set(json.loads(row['files']))]
+            connection.executemany("UPDATE jobs SET status = 'pending', attempts = 0, updated = ? WHERE id = ?",
+                                   [(now, store_id) for store_id in store_ids])
+            return len(store_ids)
+        return self._write(statements)
+
+    def counts(self) -> dict:
+        rows = self._connection().execute('SELECT status, COUNT(*) AS count FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['count'] for row in rows}
+
+    def start_lease_renewal(self):
+        """Keeps extending this process's leases until stop_lease_renewal(), so long downloads don't lose their link."""
+        def renew_loop():
+            while not self._renewal_stop.wait(self.lease_seconds / 3):
+                try:
+                    self._write(lambda connection: connection.execute(
+                        "UPDATE jobs SET lease_expires = ? WHERE status = 'leased' AND lease_owner = ?",
+                        (time.time() + self.lease_seconds, self.owner)))
+                except sqlite3.Error as error:
+                    print(f'   [Job store] Could not renew leases: {error}')
+        self._renewal_thread = threading.Thread(target=renew_loop, daemon=True)
+        self._renewal_thread.start()
+
+    def stop_lease_renewal(self):
+        self._renewal_stop.set()
+
+
+class JobStoreQueue:
+    """
+    The get_nowait() / put() part of queue.Queue on top of a JobStore, so the workers can drain the store without
+    knowing about it. put() hands a link back to the store for any process to pick up. size_order and unknown_bytes
+    are passed on to JobStore.claim().
+    """
+
+    def __init__(self, store: JobStore, size_order: str = None, unknown_bytes: int = 0):
+        self.store = store
+        self.size_order = size_order
+        self.unknown_bytes = unknown_bytes
+
+    def get_nowait(self):
+        job = self.store.claim(self.size_order, self.unknown_bytes)
+        if job is None:
+            raise queue.Empty
+        return job
+
+    def put(self, job: dict):
+        self.store.release(job)
@@ -0,0 +1,216 @@
+# zoom_metrics.py
+import os
+import json
+import time
+import threading
+
+# ==============================================================================
+# ======================== CONFIGURATION VARIABLES =============================
+# ==============================================================================
+
+# One JSON line per processed link: its phases in seconds and the size and speed of every file. None disables.
+JSONL_PATH = 'zoom_metrics.jsonl'
+# Prometheus textfile-collector snapshot, rewritten after every link. None disables.
+PROMETHEUS_PATH = 'zoom_metrics.prom'
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+
+# ==============================================================================
+# ========================= END OF CONFIGURATION ===============================
+# ==============================================================================
+
+_current = threading.local()
+_lock = threading.Lock()
+_phase_samples = {}
+_throughput_samples = []
+_bytes_by_source = {}
+_links_by_status = {}
+_browser_startups = []
+
+
+class LinkTimer:
+    """
+    Times the consecutive phases of one link. begin(name) closes the running phase and opens the next, so phases can
+    be marked without restructuring the code they measure. A phase entered more than once is summed.
+    """
+
+    def __init__(self, job: dict):
+        self.number = job.get('number')
+        self.title = job.get('title')
+        self.link = job.get('link')
+        self.started = time.time()
+        self.phases = {}
+        self.files = []
+        # sizes of the link's files as soon as they are known (Content-Length, Chrome's download totals)
+        self.expected_files = {}
+        self._phase_name = None
+        self._phase_start = None
+
+    def begin(self, name: str, at: float = None):
+        """Starts phase name at time at (default now), ending the current phase there."""
+        now = time.time() if at is None else max(at, self._phase_start or self.started)
+        if self._phase_name is not None:
+            self.phases[self._phase_name] = self.phases.get(self._phase_name, 0) + now - self._phase_start
+        self._phase_name = name
+        self._phase_start = now
+
+    def end(self):
+        self.begin(None)
+
+    @property
+    def expected_bytes(self) -> int:
+        return sum(self.expected_files.values())
+
+    def add_file(self, file_name: str, size_bytes: int, seconds: float, source: str):
+        self.files.append({
+            'name': file_name,
+            'bytes': size_bytes,
+            'seconds': round(seconds, 3) if seconds is not None else None,
+            'bytes_per_second': round(size_bytes / seconds) if size_bytes and seconds else None,
+            'source': source,
+        })
+
+
+def start_link(job: dict) -> LinkTimer:
+    """Creates the timer for a job, stores it on the job and makes it current for this thread."""
+    timer = LinkTimer(job)
+    job['timer'] = timer
+    use_timer(timer)
+    return timer
+
+
+def use_timer(timer):
+    """Makes timer current for this thread, e.g. when a job moves on to a transfer thread."""
+    _current.timer = timer
+
+
+def phase(name: str, at: float = None):
+    """Starts phase name on this thread's current link, if any."""
+    timer = getattr(_current, 'timer', None)
+    if timer is not None:
+        timer.begin(name, at=at)
+
+
+def record_file(file_name: str, size_bytes: int, seconds: float, source: str):
+    """Records a downloaded file's size and transfer time on this thread's current link, if any."""
+    timer = getattr(_current, 'timer', None)
+    if timer is not None:
+        timer.add_file(file_name, size_bytes, seconds, source)
+
+
+def expect_file(file_name: str, size_bytes: int):
+    """Notes the size of a file this thread's current link is about to download, if there is a current link."""
+    timer = getattr(_current, 'timer', None)
+    if timer is not None and size_bytes:
+        timer.expected_files[file_name] = size_bytes
+
+
+def record_browser_startup(seconds: float, mode: str):
+    """Records how long a browser took to become usable ('launched', 'warm profile' or 'attached')."""
+    with _lock:
+        _browser_startups.append((seconds, mode))
+
+
+def finish_link(timer, status: str):
+    """Closes the link's timer, appends its JSONL record and refreshes the Prometheus snapshot."""
+    if timer is None:
+        return
+    timer.end()
+    if getattr(_current, 'timer', None) is timer:
+        _current.timer = None
+    record = {
+        'number': timer.number,
+        'title': timer.title,
+        'link': timer.link,
+        'status': status,
+        'started': round(timer.started, 3),
+        'elapsed': round(time.time() - timer.started, 3),
+        'phases': {name: round(seconds, 3) for name, seconds in timer.phases.items()},
+        'expected_bytes': timer.expected_bytes or None,
+        'files': timer.files,
+    }
+    with _lock:
+        _links_by_status[status] = _links_by_status.get(status, 0) + 1
+        for name, seconds in timer.phases.items():
+            _phase_samples.setdefault(name, []).append(seconds)
+        for file_record in timer.files:
+            _bytes_by_source[file_record['source']] = _bytes_by_source.get(file_record['source'], 0) + (file_record['bytes'] or 0)
+            if file_record['bytes_per_second']:
+                _throughput_samples.append(file_record['bytes_per_second'])
+        if JSONL_PATH:
+            try:
+                with open(JSONL_PATH, 'a', encoding='utf-8') as file_handle:
+                    file_handle.write(json.dumps(record) + '\n')
+            except Exception:
+                pass
+        if PROMETHEUS_PATH:
+            _write_prometheus_snapshot()
+
+
+def percentile(values: list, quantile: float) -> float:
+    """Linearly interpolated percentile of values (quantile between 0 and 1)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * quantile
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _write_prometheus_snapshot():
+    lines = [
+        '# HELP zoom_links_total Links processed, by outcome.',
+        '# TYPE zoom_links_total counter',
+    ]
+    lines += [f'zoom_links_total{{status="{status}"}} {count}' for status, count in sorted(_links_by_status.items())]
+    lines += [
+        '# HELP zoom_link_phase_seconds Time spent in each phase of a link.',
+        '# TYPE zoom_link_phase_seconds summary',
+    ]
+    for name, samples in sorted(_phase_samples.items()):
+        lines += [f'zoom_link_phase_seconds{{phase="{name}",quantile="{quantile}"}} {percentile(samples, quantile):.3f}' for quantile in SUMMARY_QUANTILES]
+        lines.append(f'zoom_link_phase_seconds_sum{{phase="{name}"}} {sum(samples):.3f}')
+        lines.append(f'zoom_link_phase_seconds_count{{phase="{name}"}} {len(samples)}')
+    lines += [
+        '# HELP zoom_downloaded_bytes_total Bytes downloaded, by how they were fetched.',
+        '# TYPE zoom_downloaded_bytes_total counter',
+    ]
+    lines += [f'zoom_downloaded_bytes_total{{source="{source}"}} {total}' for source, total in sorted(_bytes_by_source.items())]
+    lines += [
+        '# HELP zoom_file_throughput_bytes_per_second Transfer speed of individual files.',
+        '# TYPE zoom_file_throughput_bytes_per_second summary',
+    ]
+    lines += [f'zoom_file_throughput_bytes_per_second{{quantile="{quantile}"}} {percentile(_throughput_samples, quantile):.0f}' for quantile in SUMMARY_QUANTILES]
+    lines.append(f'zoom_file_throughput_bytes_per_second_sum {sum(_throughput_samples)}')
+    lines.append(f'zoom_file_throughput_bytes_per_second_count {len(_throughput_samples)}')
+    lines += [
+        '# HELP zoom_browser_startup_seconds Time until a browser was ready, by how it was started.',
+        '# TYPE zoom_browser_startup_seconds gauge',
+    ]
+    lines += [f'zoom_browser_startup_seconds{{mode="{mode}",browser="{position}"}} {seconds:.3f}'
+              for position, (seconds, mode) in enumerate(_browser_startups, start=1)]
+    try:
+        # written under a temporary name and renamed, so a collector never reads half a file
+        with open(PROMETHEUS_PATH + '.tmp', 'w', encoding='utf-8') as file_handle:
+            file_handle.write('\n'.join(lines) + '\n')
+        os.replace(PROMETHEUS_PATH + '.tmp', PROMETHEUS_PATH)
+    except Exception:
+        pass
+
+
+def print_summary():
+    """Prints per-phase percentiles and file throughput for the run."""
+    with _lock:
+        if _browser_startups:
+            startup_seconds = [seconds for seconds, _ in _browser_startups]
+            print(f'\nBrowser startup: {len(startup_seconds)} browser(s), avg {sum(startup_seconds) / len(startup_seconds):.1f}s, '
+                  f'max {max(startup_seconds):.1f}s')
+        if not _phase_samples:
+            return
+        print('\nTiming (seconds): ' + ' / '.join(f'p{round(quantile * 100)}' for quantile in SUMMARY_QUANTILES) + ' / max')
+        for name, samples in sorted(_phase_samples.items(), key=lambda item: -sum(item[1])):
+            quantiles = ' / '.join(f'{percentile(samples, quantile):.1f}' for quantile in SUMMARY_QUANTILES)
+            print(f'  {name:<20} {quantiles} / {max(samples):.1f}  ({len(samples)} links, {sum(samples):.0f}s total)')
+        if _throughput_samples:
+            speeds = ' / '.join(f'{percentile(_throughput_samples, quantile) / 1e6:.1f}' for quantile in SUMMARY_QUANTILES)
+            print(f'  File throughput (MB/s): {speeds} over {len(_throughput_samples)} files')
@@ -0,0 +1,222 @@
+# zoom_scheduler.py
+import time
+import heapq
+import queue
+import random
+import itertools
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+import zoom_utils as utils
+
+
+def link_host(job: dict) -> str:
+    return (urlparse(job['link']).hostname or '').lower()
+
+
+def job_key(job: dict):
+    """Identifies a link across the copies made of its job dict: its job store row, or its place in the link list."""
+    return job.get('store_id', job['number'])
+
+
+def typical_size(sizes) -> int:
+    """The median of the known sizes, which stands in for links whose size is unknown (0 if none is known)."""
+    known = sorted(size for size in sizes if size)
+    return known[len(known) // 2] if known else 0
+
+
+def order_jobs_by_size(jobs: list, policy: str) -> list:
+    """
+    Orders jobs by job['expected_bytes'] for 'largest_first' or 'smallest_first', keeping list order among equal
+    sizes; links of unknown size are placed as if they had the median size. Any other policy keeps the list order.
+    """
+    if policy not in ('largest_first', 'smallest_first'):
+        return list(jobs)
+    unknown_bytes = typical_size(job.get('expected_bytes') for job in jobs)
+    direction = -1 if policy == 'largest_first' else 1
+    return sorted(jobs, key=lambda job: direction * (job.get('expected_bytes') or unknown_bytes))
+
+
+def failure_class(result: dict):
+    """Why a link's result is not a success ('no_button', 'no_files' or a describe_failure class), or None if it is."""
+    if result['status'] == 'done' and result.get('files'):
+        return None
+    if result['status'] == 'skipped':
+        return 'no_button'
+    if result['status'] == 'done':
+        return result.get('failure') or 'no_files'
+    return result.get('failure') or 'error'
+
+
+class LinkScheduler:
+    """
+    Hands out the links of job_queue (a queue.Queue or JobStoreQueue) to the workers and takes failed or skipped links
+    back for another try after an exponential backoff with jitter. At most host_concurrency links per host are in
+    flight at once and new links on a host start no faster than host_links_per_minute; a link whose host is busy
+    waits while links for other hosts go ahead. Once job_queue comes up empty it is asked again only after
+    empty_poll_seconds, since for a JobStoreQueue every ask is a write transaction on the store.
+    """
+
+    def __init__(self, job_queue, max_retries: int = 2, backoff_seconds: float = 30, max_backoff_seconds: float = 600,
+                 retry_failures=(), host_concurrency: int = 0, host_links_per_minute: float = 0,
+                 empty_poll_seconds: float = 1.0):
+        self.job_queue = job_queue
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.retry_failures = set(retry_failures)
+        self.host_concurrency = host_concurrency
+        self.empty_poll_seconds = empty_poll_seconds
+        self.start_limiter = None
+        if host_links_per_minute:
+            rate = host_links_per_minute / 60
+            self.start_limiter = utils.HostRateLimiter(rate, max(1, host_concurrency), rate / 16)
+        self._condition = threading.Condition()
+        # (not_before, sequence, job) for links waiting out their backoff
+        self._retries = []
+        self._sequence = itertools.count()
+        # links already taken from job_queue (or handed back) whose host was busy when they came up
+        self._waiting = deque()
+        self._in_flight = {}
+        self._active = {}
+        self._closed = False
+        # one worker at a time takes a link from job_queue, and none before this time after it came up empty
+        self._claiming = False
+        self._queue_empty_until = 0
+
+    def _admit(self, job: dict):
+        """Starts job if its host has room. Returns 0 if it did, otherwise seconds to wait (None: until a link ends)."""
+        host = link_host(job)
+        if self.host_concurrency and self._in_flight.get(host, 0) >= self.host_concurrency:
+            return None
+        if self.start_limiter is not None:
+            wait_seconds = self.start_limiter.try_acquire(host)
+            if wait_seconds > 0:
+                return wait_seconds
+        self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        self._active[job_key(job)] = job
+        return 0
+
+    def _next_job(self):
+        """
+        Returns (job, None) for a held-back link that can start now, (None, 0) when job_queue should be asked for
+        another link, else (None, seconds to wait) or (None, None) when done.
+        """
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now:
+            self._waiting.appendleft(heapq.heappop(self._retries)[2])
+        waits = []
+        for job in list(self._waiting):
+            wait_seconds = self._admit(job)
+            if wait_seconds == 0:
+                self._waiting.remove(job)
+                return job, None
+            waits.append(wait_seconds)
+        # only a few links are held back per busy host, so a job store's other links stay claimable by other processes
+        if len(self._waiting) < max(4, self.host_concurrency) and not self._claiming:
+            if now >= self._queue_empty_until:
+                return None, 0
+            waits.append(self._queue_empty_until - now)
+        if self._retries:
+            waits.append(self._retries[0][0] - now)
+        if not self._waiting and not self._retries and not self._claiming and not any(self._in_flight.values()):
+            return None, None
+        # a link still in flight may yet come back for a retry, so the queue isn't finished until it ends
+        return None, min([wait for wait in waits if wait is not None] + [1.0])
+
+    def get(self, block: bool = True):
+        """
+        The next link to work on. With block, waits for backoffs, busy hosts and links still in flight elsewhere, and
+        raises queue.Empty only once every link is finished; without, raises queue.Empty when none can start now.
+        """
+        while True:
+            with self._condition:
+                job, wait_seconds = self._next_job()
+                if job is not None:
+                    return job
+                if wait_seconds != 0:
+                    if wait_seconds is None or not block:
+                        raise queue.Empty
+                    self._condition.wait(max(0.05, wait_seconds))
+                    continue
+                self._claiming = True
+            # a job store claim is a write transaction, so it runs without holding up the other workers
+            job = None
+            try:
+                job = self.job_queue.get_nowait()
+            except queue.Empty:
+                pass
+            finally:
+                with self._condition:
+                    self._claiming = False
+                    self._condition.notify_all()
+                    if job is None:
+                        self._queue_empty_until = time.monotonic() + self.empty_poll_seconds
+                    elif self._admit(job) == 0:
+                        return job
+                    else:
+                        self._waiting.append(job)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def _release(self, job: dict):
+        host = link_host(job)
+        self._in_flight[host] = max(0, self._in_flight.get(host, 0) - 1)
+        self._active.pop(job_key(job), None)
+
+    def active_jobs(self) -> list:
+        """The links handed out and not yet completed."""
+        with self._condition:
+            return list(self._active.values())
+
+    def put(self, job: dict):
+        """Hands back a link that was not worked on (e.g. its browser died); it goes out again first."""
+        with self._condition:
+            self._release(job)
+            self._waiting.appendleft(job)
+            self._condition.notify_all()
+
+    def complete(self, job: dict, result: dict):
+        """
+        Ends a link's turn. A failure class listed in retry_failures with retries left is scheduled for another try;
+        returns its delay in seconds, or None when result is the link's final outcome.
+        """
+        failure = failure_class(result)
+        with self._condition:
+            self._release(job)
+            if self.start_limiter is not None:
+                if failure == 'rate_limited':
+                    self.start_limiter.penalize(link_host(job), result.get('retry_after'))
+                elif failure is None:
+                    self.start_limiter.reward(link_host(job))
+            retry_delay = None
+            if not self._closed and failure in self.retry_failures and job.get('retries', 0) < self.max_retries:
+                # full exponential backoff with up to half of it taken off at random, so retries of links that
+                # failed together don't arrive together
+                backoff = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** job.get('retries', 0))
+                retry_delay = max(backoff * random.uniform(0.5, 1.0), result.get('retry_after') or 0)
+                job['retries'] = job.get('retries', 0) + 1
+                job['last_result'] = result
+                heapq.heappush(self._retries, (time.monotonic() + retry_delay, next(self._sequence), job))
+            self._condition.notify_all()
+            return retry_delay
+
+    def close(self) -> list:
+        """
+        Stops scheduling retries and returns the links still waiting for one, each with its last result in
+        job['last_result']. Links taken from job_queue but never started are handed back to it.
+        """
+        with self._condition:
+            self._closed = True
+            abandoned = [job for _, _, job in sorted(self._retries)]
+            self._retries = []
+            for job in self._waiting:
+                if 'last_result' in job:
+                    abandoned.append(job)
+                else:
+                    self.job_queue.put(job)
+            self._waiting.clear()
+            self._condition.notify_all()
+            return abandoned
@@ -3,13 +3,34 @@ import os
 import time
 import json
 import re
+import queue
+import hashlib
+import itertools
+import shutil
+import threading
+import email.utils
 import requests
-from urllib.parse import urlparse, unquote
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, unquote, parse_qsl
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks, hardlinks are used instead
+    fcntl = None
+
+try:
+    import psutil
+except ImportError:  # optional: without it browsers are only recycled by link count
+    psutil = None
+
+import zoom_cdp
+import zoom_metrics
+import zoom_verify
+
 # ==============================================================================
 # ======================== CONFIGURATION VARIABLES =============================
 # ==============================================================================
@@ -18,10 +39,17 @@ from selenium.webdriver.common.action_chains import ActionChains
 HEADLESS = True
 MUTE_AUDIO = True
 
+# Media that should never be downloaded, e.g. ['.m4a', '.vtt']. Matching Chrome downloads are cancelled as soon as they
+# start and matching URLs are never fetched. zoom_downloader sets this from its REMOVE_EXTENSIONS.
+SKIP_EXTENSIONS = []
+
+# Each click step (Continue, Download) checks all of its selectors together every CLICK_RETRY_PAUSE seconds until one
+# overall deadline: max(PAGE_LOAD_WAIT, 10) seconds for Continue and max(AFTER_CONTINUE_WAIT + 6, 15) for Download.
+# A control that is found but won't take the click is tried up to CLICK_RETRY_ATTEMPTS times.
 PAGE_LOAD_WAIT = 5
 AFTER_CONTINUE_WAIT = 2
 CLICK_RETRY_ATTEMPTS = 6
-CLICK_RETRY_PAUSE = 0.8
+CLICK_RETRY_PAUSE = 0.25
 
 INACTIVITY_COUNTDOWN = 10
 DOWNLOAD_WAIT = 60
@@ -29,12 +57,117 @@ MAX_DRAIN_SECONDS = 120
 NETWORK_FALLBACK_SECONDS = 60
 PERF_POLL_INTERVAL = 0.5
 
+# Follow Chrome downloads through DevTools events instead of polling the temporary folder. A link finishes as soon as
+# its downloads complete and no new one has started for DOWNLOAD_SETTLE_SECONDS, the same quiet period the folder
+# polling used (INACTIVITY_COUNTDOWN), since Zoom may start a recording's audio or transcript seconds after its video.
+# A download still receiving bytes is waited for beyond MAX_DRAIN_SECONDS; one that gets nothing for
+# DOWNLOAD_STALL_SECONDS is given up on (and left to finish or be resumed, never fetched a second time).
+USE_CDP_DOWNLOAD_EVENTS = True
+DOWNLOAD_SETTLE_SECONDS = 10
+DOWNLOAD_STALL_SECONDS = 120
+
+# Capture media URLs from live DevTools network events instead of re-reading Chrome's performance log. When enabled,
+# the performance log is switched off for the session; if the live capture can't be started, the browser is
+# restarted with the performance log on.
+USE_CDP_NETWORK_CAPTURE = True
+
+# Lean page loads: requests matching BLOCKED_URL_PATTERNS are blocked in every page and iframe, images are disabled
+# and the player is kept from autoplaying, so recording pages only load what is needed to reach Continue / Download.
+# Media files are never blocked, since Chrome's downloads and the network fallback depend on them.
+# If a site's Download control stops being found, try removing the font patterns (some icons are drawn with fonts).
+BLOCK_PAGE_RESOURCES = True
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.ico', '*.svg',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*facebook.net*',
+    '*hotjar.com*', '*newrelic.com*', '*nr-data.net*', '*optimizely.com*', '*sentry.io*', '*zoomgov-analytics*',
+    '*/log/report*', '*/ga/collect*',
+]
+# 'eager' hands control back once the HTML is parsed instead of waiting for every subresource; 'normal' waits for all.
+PAGE_LOAD_STRATEGY = 'eager'
+
+# Segmented downloads: files served with 'Accept-Ranges: bytes' are fetched over several connections at once.
+# Set SEGMENT_CONNECTIONS = 1 to always use a single stream.
+SEGMENT_CONNECTIONS = 4
+SEGMENT_SIZE_BYTES = 16 * 1024 * 1024
+STREAM_CHUNK_BYTES = 1024 * 64
+
+# Identical files (same size and SHA-256) are stored once: a second copy becomes a reflink or hardlink to the first.
+# The index of known files is kept in CONTENT_INDEX_NAME inside the output folder, so it carries across runs.
+DEDUPE_CONTENT = True
+CONTENT_INDEX_NAME = '.zoom_content_index.jsonl'
+
+# Check every MP4/M4A/VTT file before filing it: the box headers (or the last subtitle cue) must add up to the file's
+# length. Damaged files stay in the temporary folder with a .broken suffix and their link is retried.
+VERIFY_DOWNLOADS = True
+
+# Finished files are handed to a background thread that moves them to the output folder, so a slow destination
+# (e.g. a network share while staging is on a local SSD) doesn't hold up the next link. Moves across filesystems are
+# streamed in COPY_CHUNK_BYTES pieces with copy_file_range / sendfile rather than read into memory.
+# FSYNC_POLICY: 'none', 'file' (flush each copied file to disk) or 'always' (also the destination folder after renames)
+BACKGROUND_MOVES = True
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+FSYNC_POLICY = 'none'
+MOVER_PENDING_FOLDER = '_tmp_mover'
+
+# Pooled HTTP sessions are kept per browser (and per pipeline transfer slot) and reused across files and links.
+# HTTP_POOL_SIZE is the number of connections kept per host, HTTP_POOL_HOSTS the number of hosts kept warm.
+HTTP_POOL_SIZE = 8
+HTTP_POOL_HOSTS = 8
+HTTP_RETRIES = 3
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
+
+# Global cap on download speed across every HTTP transfer, in bytes per second. 0 means unlimited.
+MAX_BANDWIDTH_BYTES_PER_SECOND = 0
+
+# Requests to any one host are paced by a token bucket: HOST_REQUESTS_PER_SECOND on average, in bursts of up to
+# HOST_REQUEST_BURST. A 429 or 503 reply halves that host's rate (not below HOST_MIN_REQUESTS_PER_SECOND) and honours
+# its Retry-After; successful replies win the rate back a little at a time, so every host settles near the fastest
+# pace it accepts. 0 disables the pacing.
+HOST_REQUESTS_PER_SECOND = 10
+HOST_REQUEST_BURST = 20
+HOST_MIN_REQUESTS_PER_SECOND = 0.2
+
+# Keep interrupted downloads (.part files and Chrome .crdownload files) in the temporary folder together with a
+# small .resume.json sidecar, so a rerun continues them with HTTP Range requests instead of starting over.
+RESUME_PARTIAL_DOWNLOADS = True
+
+# Remember, per Zoom host, which selector / frame / click method worked for the Continue and Download steps, and try
+# that first next time. Set SELECTOR_CACHE_PATH = None to disable.
+SELECTOR_CACHE_PATH = 'selector_cache.json'
+LEARNED_SELECTOR_TIMEOUT = 4
+SELECTOR_CACHE_TRY_LIMIT = 2
+SELECTOR_CACHE_MAX_MISSES = 3
+
+# Try to resolve share pages over plain HTTP first and download their media directly, skipping Chrome entirely.
+# Only media hosted on HTTP_FAST_PATH_MEDIA_HOSTS (or their subdomains) is trusted. The browser is used when this fails.
+HTTP_FAST_PATH = True
+HTTP_FAST_PATH_MEDIA_HOSTS = ['zoom.us']
+HTTP_FAST_PATH_TIMEOUT = 20
+
 
 # ==============================================================================
 # ========================= END OF CONFIGURATION ===============================
 # ==============================================================================
 
 _net_re = re.compile(r'\.(mp4|vtt)(\?|$)', re.IGNORECASE)
+# Same test against raw JSON text, where a URL ends at a closing quote rather than the end of the string
+_net_prefilter_re = re.compile(r'\.(mp4|vtt)(\?|\\?")', re.IGNORECASE)
+
+_embedded_media_url_re = re.compile(r'https?://[^\s"\'<>\\]+?\.(?:mp4|m4a|vtt)(?:\?[^\s"\'<>\\]*)?', re.IGNORECASE)
+_embedded_file_id_re = re.compile(r'["\']?(?:fileId|recordingFileId)["\']?\s*[:=]\s*["\']([\w.\-=]+)["\']')
+
+# Content types for the extensions Zoom serves, so a URL without a telling file name can still be filtered
+_CONTENT_TYPE_EXTENSIONS = {
+    'video/mp4': '.mp4',
+    'audio/mp4': '.m4a',
+    'audio/x-m4a': '.m4a',
+    'audio/m4a': '.m4a',
+    'text/vtt': '.vtt',
+}
+
+PARTIAL_SUFFIX = '.part'
+RESUME_SIDECAR_SUFFIX = '.resume.json'
 
 def sanitize(name):
     # Replace spaces with underscores
@@ -43,41 +176,394 @@ def sanitize(name):
     return re.sub(r'[<>:"/\\|?*]', '', name).strip()
 
 
-def prepare_download_folder(driver, path):
+def start_cdp_listeners(driver):
+    """
+    Opens one DevTools connection for the driver and attaches the download tracker, live network capture and request
+    blocker to it.
+    Whatever can't be started is left as None, and the polling / performance-log paths are used instead.
+    """
+    if not (USE_CDP_DOWNLOAD_EVENTS or USE_CDP_NETWORK_CAPTURE or BLOCK_PAGE_RESOURCES):
+        return None
+    try:
+        connection = zoom_cdp.CdpConnection.for_driver(driver)
+    except Exception as error:
+        print(f'   [Warning] DevTools events unavailable ({error}); falling back to polling.')
+        return None
+    driver._zoom_cdp_connection = connection
+    if USE_CDP_DOWNLOAD_EVENTS:
+        driver._zoom_download_tracker = zoom_cdp.DownloadTracker(connection, skip_download=is_unwanted_media,
+                                                                 on_change=track_chrome_partial)
+    if USE_CDP_NETWORK_CAPTURE:
+        try:
+            driver._zoom_network_capture = zoom_cdp.NetworkCapture(connection, _net_re, _net_prefilter_re)
+        except Exception as error:
+            print(f'   [Warning] Live network capture unavailable ({error}).')
+    if BLOCK_PAGE_RESOURCES and BLOCKED_URL_PATTERNS:
+        try:
+            driver._zoom_request_blocker = zoom_cdp.RequestBlocker(connection, BLOCKED_URL_PATTERNS)
+        except Exception as error:
+            print(f'   [Warning] Request blocking unavailable ({error}).')
+    # every component's attach listener is registered by now: targets that already exist are reported only once
+    try:
+        connection.attach_to_targets()
+    except Exception as error:
+        print(f'   [Warning] Page targets unavailable ({error}); live capture, request blocking and tab download '
+              f'attribution are off.')
+        driver._zoom_network_capture = None
+        driver._zoom_request_blocker = None
+    return connection
+
+
+def browser_memory_mb(driver):
+    """
+    Resident memory of the browser behind driver (chromedriver, Chrome and all its renderer / GPU processes) in MB.
+    Returns None when it can't be measured, e.g. psutil isn't installed or the browser was attached to.
+    """
+    if psutil is None:
+        return None
+    try:
+        driver_process = psutil.Process(driver.service.process.pid)
+        processes = [driver_process] + driver_process.children(recursive=True)
+    except Exception:
+        return None
+    resident_bytes = 0
+    for process in processes:
+        try:
+            resident_bytes += process.memory_info().rss
+        except Exception:
+            pass
+    return resident_bytes / (1024 * 1024)
+
+
+def process_running(pid: int) -> bool:
+    """True unless the process pid is known to have exited. Without psutil, Windows processes are assumed running."""
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == 'posix':
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+    return True
+
+
+_DEAD_SESSION_MARKERS = ('invalid session id', 'session deleted', 'disconnected', 'no such window', 'target window already closed',
+                         'chrome not reachable', 'connection refused', 'max retries exceeded', 'tab crashed')
+
+
+def is_dead_session_error(error) -> bool:
+    """True when a Selenium error means the browser or its session is gone, rather than a problem with the page."""
+    error_text = f'{error.__class__.__name__} {error}'.lower()
+    return 'invalidsessionid' in error_text or any(marker in error_text for marker in _DEAD_SESSION_MARKERS)
+
+
+def retry_after_seconds(response):
+    """The response's Retry-After header in seconds (given as seconds or as an HTTP date), or None."""
+    header = response.headers.get('Retry-After') if response is not None else None
+    if not header:
+        return None
+    try:
+        return max(0.0, float(header))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(header).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def describe_failure(error) -> dict:
+    """
+    Sorts an exception from a link into a failure class for the retry scheduler: 'rate_limited' (HTTP 429),
+    'server_error' (5xx), 'client_error' (any other 4xx), 'timeout', 'network', 'browser' (the session died) or
+    'error'. Returns {'failure': class, 'retry_after': seconds or None, 'error': message}.
+    """
+    response = getattr(error, 'response', None)
+    status_code = getattr(response, 'status_code', None)
+    if status_code == 429:
+        failure = 'rate_limited'
+    elif status_code is not None and status_code >= 500:
+        failure = 'server_error'
+    elif status_code is not None and status_code >= 400:
+        failure = 'client_error'
+    elif isinstance(error, (requests.Timeout, TimeoutError, TimeoutException)):
+        failure = 'timeout'
+    elif isinstance(error, requests.ConnectionError):
+        failure = 'network'
+    elif is_dead_session_error(error):
+        failure = 'browser'
+    else:
+        failure = 'error'
+    return {'failure': failure, 'retry_after': retry_after_seconds(response), 'error': f'{error.__class__.__name__}: {error}'[:300]}
+
+
+def driver_alive(driver) -> bool:
+    try:
+        driver.current_window_handle
+        return True
+    except Exception:
+        return False
+
+
+def get_download_tracker(driver):
+    tracker = getattr(driver, '_zoom_download_tracker', None)
+    if tracker is not None and tracker.closed:
+        return None
+    return tracker
+
+
+def get_network_capture(driver):
+    connection = getattr(driver, '_zoom_cdp_connection', None)
+    if connection is None or connection.closed:
+        return None
+    return getattr(driver, '_zoom_network_capture', None)
+
+
+def stop_cdp_listeners(driver):
+    connection = getattr(driver, '_zoom_cdp_connection', None)
+    if connection is not None:
+        connection.close()
+    driver._zoom_cdp_connection = None
+    driver._zoom_download_tracker = None
+    driver._zoom_network_capture = None
+
+
+def prepare_download_folder(driver, path, page_url: str = None):
     os.makedirs(path, exist_ok=True)
+    tracker = get_download_tracker(driver)
+    if tracker is not None:
+        try:
+            tracker.set_download_folder(path, page_url=page_url)
+            return
+        except Exception:
+            pass
     driver.execute_cdp_cmd("Browser.setDownloadBehavior",
                            {"behavior": "allow", "downloadPath": path, "eventsEnabled": True})
 
 
-def click_with_retries(driver, xpaths, timeout=5, attempts=None, pause=None):
+def prepare_tab_download_folder(driver, tab_handle: str, path: str, shared_folder: str, page_url: str = None):
+    """
+    Files the downloads of one tab in path while other tabs keep downloading into their own folders: Chrome saves
+    them by GUID in shared_folder and the download tracker moves each one to its tab's folder when it completes.
+    """
+    os.makedirs(path, exist_ok=True)
+    os.makedirs(shared_folder, exist_ok=True)
+    get_download_tracker(driver).set_tab_download_folder(tab_handle, path, shared_folder, page_url=page_url)
+
+
+# Evaluates every selector of a click step in one call: the first visible, enabled element of the click xpaths (in
+# their order of preference) is returned; only when none is visible does a visible element of present_xpaths end the
+# step early.
+_FIRST_CLICKABLE_JS = """
+const clickXpaths = arguments[0], presentXpaths = arguments[1];
+function usable(node) {
+    if (node.nodeType !== 1 || node.disabled) return false;
+    const rect = node.getBoundingClientRect(), style = getComputedStyle(node);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden';
+}
+function firstUsable(xpath) {
+    let snapshot;
+    try {
+        snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    } catch (error) {
+        return null;
+    }
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        if (usable(snapshot.snapshotItem(i))) return snapshot.snapshotItem(i);
+    }
+    return null;
+}
+for (let i = 0; i < clickXpaths.length; i++) {
+    const element = firstUsable(clickXpaths[i]);
+    if (element) return {index: i, element: element};
+}
+for (const xpath of presentXpaths) {
+    if (firstUsable(xpath)) return {present: xpath};
+}
+return null;
+"""
+
+
+def click_with_retries_detailed(driver, xpaths, timeout=5, attempts=None, pause=None, prefer_method=None, present_xpaths=None):
+    """
+    Clicks the first visible element of xpaths (in their order of preference), retrying until timeout. Returns
+    {'strategy': 'xpath', 'xpath': ..., 'method': 'native' | 'script'} describing what worked, or None. prefer_method tries that click method first. Returns None at once when an
+    element of present_xpaths shows up while no click target is visible, e.g. the player on a page that has no Continue
+    interstitial.
+    """
     attempts = attempts or CLICK_RETRY_ATTEMPTS
     pause = pause or CLICK_RETRY_PAUSE
-    for _ in range(attempts):
-        for xp in xpaths:
+    click_methods = ['native', 'script']
+    if prefer_method == 'script':
+        click_methods.reverse()
+    # one budget for the whole step, however many selectors it has
+    deadline = time.time() + timeout
+    failed_clicks = 0
+    while True:
+        try:
+            found = driver.execute_script(_FIRST_CLICKABLE_JS, list(xpaths), list(present_xpaths or []))
+        except Exception:
+            found = None
+        if found and found.get('present'):
+            return None
+        if found and found.get('element') is not None:
+            elem = found['element']
             try:
-                wait = WebDriverWait(driver, timeout)
-                elem = wait.until(EC.element_to_be_clickable((By.XPATH, xp)))
                 driver.execute_script("arguments[0].scrollIntoView({block:'center', inline:'center'});", elem)
                 time.sleep(0.05)
+            except Exception:
+                pass
+            for click_method in click_methods:
                 try:
-                    elem.click()
-                    return True
-                except Exception:
-                    try:
+                    if click_method == 'native':
+                        elem.click()
+                    else:
                         driver.execute_script("arguments[0].click();", elem)
-                        return True
-                    except Exception:
-                        pass
+                    return {'strategy': 'xpath', 'xpath': xpaths[found['index']], 'method': click_method}
+                except Exception:
+                    pass
+            failed_clicks += 1
+            if failed_clicks >= attempts:
+                return None
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
+        time.sleep(min(pause, remaining))
+
+
+def page_shows_any(driver, xpaths) -> bool:
+    """True when a visible element matches one of xpaths."""
+    try:
+        found = driver.execute_script(_FIRST_CLICKABLE_JS, [], list(xpaths))
+    except Exception:
+        return False
+    return bool(found and found.get('present'))
+
+
+# ------------------------------------------------------------------------------
+# Per-host selector cache: remembers which selector, frame and click method worked for each step on each Zoom host
+# ------------------------------------------------------------------------------
+
+_selector_cache = None
+_selector_cache_lock = threading.Lock()
+
+
+def _strategy_key(entry: dict) -> tuple:
+    return (entry.get('strategy'), entry.get('xpath'), entry.get('frame'))
+
+
+def _load_selector_cache() -> dict:
+    global _selector_cache
+    if _selector_cache is None:
+        _selector_cache = {}
+        if SELECTOR_CACHE_PATH and os.path.exists(SELECTOR_CACHE_PATH):
+            try:
+                with open(SELECTOR_CACHE_PATH, 'r', encoding='utf-8') as file_handle:
+                    _selector_cache = json.load(file_handle)
             except Exception:
-                pass
-        time.sleep(pause)
+                _selector_cache = {}
+    return _selector_cache
+
+
+def _save_selector_cache():
+    if not SELECTOR_CACHE_PATH:
+        return
+    try:
+        with open(SELECTOR_CACHE_PATH + '.tmp', 'w', encoding='utf-8') as file_handle:
+            json.dump(_selector_cache, file_handle, indent=2)
+        os.replace(SELECTOR_CACHE_PATH + '.tmp', SELECTOR_CACHE_PATH)
+    except Exception:
+        pass
+
+
+def learned_strategies(host: str, step: str) -> list:
+    """Strategies that worked before for this host and step, best first (most wins, fewest recent misses)."""
+    with _selector_cache_lock:
+        entries = _load_selector_cache().get(host, {}).get(step, [])
+        ranked = sorted(entries, key=lambda entry: (entry.get('wins', 0) - 2 * entry.get('misses', 0), entry.get('last_success', 0)), reverse=True)
+        return [dict(entry) for entry in ranked]
+
+
+def record_strategy_result(host: str, step: str, strategy: dict, success: bool):
+    """
+    Counts a win or a miss for strategy. Wins reset the miss count; entries that keep missing are demoted and
+    eventually dropped, so a tenant that changes its page stops paying for the old selector.
+    """
+    if not host or not strategy:
+        return
+    with _selector_cache_lock:
+        step_entries = _load_selector_cache().setdefault(host, {}).setdefault(step, [])
+        entry = next((existing for existing in step_entries if _strategy_key(existing) == _strategy_key(strategy)), None)
+        if entry is None:
+            if not success:
+                return
+            entry = {key: strategy.get(key) for key in ('strategy', 'xpath', 'frame')}
+            entry.update({'wins': 0, 'misses': 0})
+            step_entries.append(entry)
+        if success:
+            entry['wins'] = entry.get('wins', 0) + 1
+            entry['misses'] = 0
+            entry['method'] = strategy.get('method') or entry.get('method')
+            entry['last_success'] = time.time()
+        else:
+            entry['misses'] = entry.get('misses', 0) + 1
+            if entry['misses'] > SELECTOR_CACHE_MAX_MISSES:
+                step_entries.remove(entry)
+        _save_selector_cache()
+
+
+def click_learned_strategy(driver, host: str, step: str, present_xpaths=None):
+    """
+    Tries the strategies learned for host and step, best first, each with a short timeout.
+    Returns the strategy that clicked, or None so the caller can fall back to its full search. With present_xpaths,
+    stops as soon as one of them is visible (the step isn't needed on this page) without counting it as a miss.
+    """
+    for strategy in learned_strategies(host, step)[:SELECTOR_CACHE_TRY_LIMIT]:
+        if strategy['strategy'] == 'force':
+            # the player frame can take a moment to appear, so give the learned frame the same short budget
+            deadline = time.time() + LEARNED_SELECTOR_TIMEOUT
+            clicked = force_click_download_button_detailed(driver, preferred_frame=strategy.get('frame'), prefer_method=strategy.get('method'))
+            while clicked is None and time.time() < deadline:
+                time.sleep(1.0)
+                clicked = force_click_download_button_detailed(driver, preferred_frame=strategy.get('frame'), prefer_method=strategy.get('method'))
+        else:
+            clicked = click_with_retries_detailed(driver, [strategy['xpath']], timeout=LEARNED_SELECTOR_TIMEOUT,
+                                                  attempts=1, prefer_method=strategy.get('method'),
+                                                  present_xpaths=present_xpaths)
+            if clicked is None and present_xpaths and page_shows_any(driver, present_xpaths):
+                return None
+        matched = clicked is not None and _strategy_key(clicked) == _strategy_key(strategy)
+        record_strategy_result(host, step, clicked if clicked is not None else strategy, clicked is not None)
+        if clicked is not None:
+            if not matched:
+                # the force search found the button somewhere else this time, so don't hold the old frame against it
+                record_strategy_result(host, step, strategy, False)
+            return clicked
+    return None
+
+
+def is_unwanted_media(file_name: str = None, url: str = None, content_type: str = None) -> bool:
+    """True when a file name, URL path or Content-Type matches one of SKIP_EXTENSIONS."""
+    if not SKIP_EXTENSIONS:
+        return False
+    skip_extensions = tuple(extension.lower() for extension in SKIP_EXTENSIONS)
+    if file_name and file_name.lower().endswith(skip_extensions):
+        return True
+    if url and unquote(urlparse(url).path).lower().endswith(skip_extensions):
+        return True
+    if content_type:
+        extension = _CONTENT_TYPE_EXTENSIONS.get(content_type.split(';')[0].strip().lower())
+        if extension and extension in skip_extensions:
+            return True
     return False
 
 
 def get_completed_downloads(folder: str) -> list:
-    """Returns a list of completed downloads in the specified folder, ignoring partial downloads (.crdownload)."""
+    """Returns a list of completed downloads in the specified folder, ignoring partial downloads (.crdownload, .part)."""
     try:
-        return [file_name for file_name in os.listdir(folder) if not file_name.endswith('.crdownload')]
+        return [file_name for file_name in os.listdir(folder) if not is_partial_download(file_name)]
     except Exception:
         return []
 
@@ -93,15 +579,440 @@ def wait_for_initial_download(temp_folder: str, timeout_seconds: int) -> list:
     return []
 
 
+_FICLONE = 0x40049409
+_streamed_hashes = {}
+_streamed_hashes_lock = threading.Lock()
+
+
+def remember_streamed_hash(path: str, sha256_hex: str):
+    """Keeps the SHA-256 computed while a file was downloaded, so the mover doesn't have to read it again."""
+    with _streamed_hashes_lock:
+        _streamed_hashes[os.path.abspath(path)] = sha256_hex
+
+
+def _pop_streamed_hash(path: str):
+    with _streamed_hashes_lock:
+        return _streamed_hashes.pop(os.path.abspath(path), None)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file_handle:
+        for block in iter(lambda: file_handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def clone_or_link(existing_path: str, new_path: str) -> bool:
+    """Creates new_path sharing existing_path's data: a reflink where the filesystem supports it, else a hardlink."""
+    if fcntl is not None:
+        try:
+            with open(existing_path, 'rb') as source_handle, open(new_path, 'xb') as clone_handle:
+                fcntl.ioctl(clone_handle.fileno(), _FICLONE, source_handle.fileno())
+            return True
+        except Exception:
+            try:
+                os.remove(new_path)
+            except Exception:
+                pass
+    try:
+        os.link(existing_path, new_path)
+        return True
+    except Exception:
+        return False
+
+
+class ContentIndex:
+    """
+    Persistent size / SHA-256 index of the files in one output folder. Files are only hashed when another file of
+    exactly the same size shows up, so most recordings are never read back. Changes are appended to the index file
+    one line each; it is rewritten in full only when loaded. Files still queued for the background mover are known
+    as pending, so an identical file arriving meanwhile is linked to them instead of being stored again.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.index_path = os.path.join(folder, CONTENT_INDEX_NAME)
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.pending = {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file_handle:
+                for line in file_handle:
+                    try:
+                        record = json.loads(line)
+                        self.entries[record['name']] = {key: record.get(key) for key in ('size', 'mtime', 'sha256')}
+                    except Exception:
+                        # a line cut off by a crash mid-append
+                        continue
+        except OSError:
+            pass
+        # pick up files from before the index existed (size only) and forget ones that were deleted
+        try:
+            present = {entry.name: entry.stat() for entry in os.scandir(folder)
+                       if entry.is_file() and not entry.name.startswith(CONTENT_INDEX_NAME)}
+        except Exception:
+            present = {}
+        self.entries = {name: entry for name, entry in self.entries.items() if name in present}
+        for name, stat_result in present.items():
+            if name not in self.entries and not is_partial_download(name):
+                self.entries[name] = {'size': stat_result.st_size, 'mtime': stat_result.st_mtime, 'sha256': None}
+        self.save()
+
+    def save(self):
+        """Rewrites the index file with one line per known file."""
+        try:
+            with open(self.index_path + '.tmp', 'w', encoding='utf-8') as file_handle:
+                for name, entry in self.entries.items():
+                    file_handle.write(json.dumps({'name': name, **entry}) + '\n')
+            os.replace(self.index_path + '.tmp', self.index_path)
+        except Exception:
+            pass
+
+    def _append(self, name: str):
+        try:
+            with open(self.index_path, 'a', encoding='utf-8') as file_handle:
+                file_handle.write(json.dumps({'name': name, **self.entries[name]}) + '\n')
+        except Exception:
+            pass
+
+    def _entry_sha256(self, name: str, entry: dict, size: int):
+        """SHA-256 of an indexed or pending file, read again if the stored one is missing or stale; None if it's gone."""
+        if 'path' in entry:
+            if entry.get('sha256') is not None:
+                return entry['sha256']
+            # the mover may finish with the file while it is read, so it is looked for in the output folder next
+            for candidate_path in (entry['path'], os.path.join(self.folder, name)):
+                try:
+                    sha256_hex = file_sha256(candidate_path)
+                except OSError:
+                    continue
+                with self.lock:
+                    if name in self.pending:
+                        self.pending[name]['sha256'] = sha256_hex
+                return sha256_hex
+            return None
+        existing_path = os.path.join(self.folder, name)
+        try:
+            stat_result = os.stat(existing_path)
+        except OSError:
+            with self.lock:
+                self.entries.pop(name, None)
+            return None
+        if stat_result.st_size != size:
+            return None
+        if entry.get('sha256') is not None and entry.get('mtime') == stat_result.st_mtime:
+            return entry['sha256']
+        sha256_hex = file_sha256(existing_path)
+        with self.lock:
+            if name in self.entries:
+                self.entries[name] = {'size': size, 'mtime': stat_result.st_mtime, 'sha256': sha256_hex}
+                self._append(name)
+        return sha256_hex
+
+    def find_identical(self, path: str, known_sha256: str = None):
+        """Returns (name of an identical indexed or pending file or None, sha256 of path or None if it wasn't needed)."""
+        size = os.path.getsize(path)
+        with self.lock:
+            same_size = [(name, dict(entry)) for name, entry in list(self.entries.items()) + list(self.pending.items())
+                         if entry['size'] == size]
+        if not same_size:
+            return None, known_sha256
+        # files are read outside the lock, so other workers can file their downloads meanwhile
+        sha256_hex = known_sha256 or file_sha256(path)
+        for name, entry in same_size:
+            if self._entry_sha256(name, entry, size) == sha256_hex:
+                return name, sha256_hex
+        return None, sha256_hex
+
+    def add_pending(self, name: str, path: str, sha256_hex: str = None):
+        """Records a file queued to arrive as name, while it waits at path."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self.lock:
+            self.pending[name] = {'size': size, 'sha256': sha256_hex, 'path': path}
+
+    def is_pending(self, name: str) -> bool:
+        with self.lock:
+            return name in self.pending
+
+    def discard_pending(self, name: str):
+        with self.lock:
+            self.pending.pop(name, None)
+
+    def add(self, name: str, sha256_hex: str = None):
+        try:
+            stat_result = os.stat(os.path.join(self.folder, name))
+        except OSError:
+            return
+        with self.lock:
+            pending_entry = self.pending.pop(name, {})
+            self.entries[name] = {'size': stat_result.st_size, 'mtime': stat_result.st_mtime,
+                                  'sha256': sha256_hex or pending_entry.get('sha256')}
+            self._append(name)
+
+
+_content_indexes = {}
+_content_indexes_lock = threading.Lock()
+
+
+def get_content_index(folder: str):
+    """The ContentIndex for an output folder, or None when DEDUPE_CONTENT is off."""
+    if not DEDUPE_CONTENT:
+        return None
+    with _content_indexes_lock:
+        key = os.path.abspath(folder)
+        if key not in _content_indexes:
+            _content_indexes[key] = ContentIndex(folder)
+        return _content_indexes[key]
+
+
+_pending_destinations = set()
+_pending_destinations_lock = threading.Lock()
+
+
+def _destination_taken(path: str) -> bool:
+    return os.path.exists(path) or os.path.abspath(path) in _pending_destinations
+
+
+def _free_destination_name(destination_folder: str, base_filename: str) -> str:
+    """base_filename, or base_filename with __dup{counter} appended if that name is already taken or being moved to."""
+    if not _destination_taken(os.path.join(destination_folder, base_filename)):
+        return base_filename
+    base_name, extension = os.path.splitext(base_filename)
+    collision_counter = 1
+    candidate_name = f"{base_name}__dup{collision_counter}{extension}"
+    while _destination_taken(os.path.join(destination_folder, candidate_name)):
+        collision_counter += 1
+        candidate_name = f"{base_name}__dup{collision_counter}{extension}"
+    return candidate_name
+
+
+def _fsync_directory(path: str):
+    try:
+        directory_fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows, where folders can't be opened
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+
+def stream_copy_file(source_path: str, destination_path: str):
+    """
+    Copies a file without holding it in memory: os.copy_file_range where available (in-kernel, and server-side on
+    some network filesystems), then os.sendfile, then a plain chunked read/write for whatever is left.
+    """
+    total_size = os.path.getsize(source_path)
+    with open(source_path, 'rb') as read_file, open(destination_path, 'wb') as write_file:
+        offset = 0
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while offset < total_size:
+                    copied = os.copy_file_range(read_file.fileno(), write_file.fileno(), min(COPY_CHUNK_BYTES, total_size - offset), offset, offset)
+                    if not copied:
+                        break
+                    offset += copied
+            except OSError:
+                pass
+        if offset < total_size and hasattr(os, 'sendfile'):
+            try:
+                os.lseek(write_file.fileno(), offset, os.SEEK_SET)
+                while offset < total_size:
+                    copied = os.sendfile(write_file.fileno(), read_file.fileno(), offset, min(COPY_CHUNK_BYTES, total_size - offset))
+                    if not copied:
+                        break
+                    offset += copied
+            except OSError:
+                pass
+        if offset < total_size:
+            read_file.seek(offset)
+            write_file.seek(offset)
+            shutil.copyfileobj(read_file, write_file, COPY_CHUNK_BYTES)
+        if FSYNC_POLICY != 'none':
+            write_file.flush()
+            os.fsync(write_file.fileno())
+    try:
+        shutil.copystat(source_path, destination_path)
+    except OSError:
+        pass
+
+
+def move_file(source_path: str, destination_path: str):
+    """
+    Renames source_path to destination_path, or across filesystems streams it to a temporary name that is renamed
+    into place once complete, so the destination never holds a half-copied recording.
+    """
+    try:
+        os.replace(source_path, destination_path)
+    except OSError:
+        temporary_path = destination_path + '.moving'
+        try:
+            stream_copy_file(source_path, temporary_path)
+            os.replace(temporary_path, destination_path)
+        except Exception:
+            try:
+                os.remove(temporary_path)
+            except Exception:
+                pass
+            raise
+        os.remove(source_path)
+    if FSYNC_POLICY == 'always':
+        _fsync_directory(os.path.dirname(destination_path))
+
+
+class BackgroundMover:
+    """
+    One thread that moves finished files to the output folder in the order they were handed over. Files are first
+    renamed out of their staging folder into MOVER_PENDING_FOLDER next to it (same disk, instant), so the staging
+    folder can be cleared and reused right away. Callbacks handed to after_pending() run in the same order, so they
+    see every file submitted before them in its output folder.
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_counter = itertools.count(1)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, source_path: str, destination_path: str, content_index=None, sha256_hex: str = None):
+        pending_folder = os.path.join(os.path.dirname(os.path.abspath(os.path.dirname(source_path))), MOVER_PENDING_FOLDER)
+        # the pending folder is shared by every process staging in the same place, so names carry the process id
+        pending_name = f'{os.getpid()}-{next(self._pending_counter)}_{os.path.basename(source_path)}'
+        pending_path = os.path.join(pending_folder, pending_name)
+        with self._lock:
+            os.makedirs(pending_folder, exist_ok=True)
+            os.replace(source_path, pending_path)
+            if content_index is not None:
+                content_index.add_pending(os.path.basename(destination_path), pending_path, sha256_hex)
+            self._jobs.put((pending_path, destination_path, content_index, sha256_hex))
+
+    def after_pending(self, callback):
+        """Runs callback on the mover's thread once every file submitted so far has been moved (or failed to)."""
+        self._jobs.put(callback)
+
+    def wait_until_idle(self):
+        self._jobs.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if callable(job):
+                try:
+                    job()
+                except Exception as error:
+                    print(f'   [Mover] Follow-up after moves failed: {error}')
+                finally:
+                    self._jobs.task_done()
+                continue
+            pending_path, destination_path, content_index, sha256_hex = job
+            try:
+                move_file(pending_path, destination_path)
+                if content_index is not None:
+                    content_index.add(os.path.basename(destination_path), sha256_hex)
+            except Exception as error:
+                print(f'   [Mover] Could not move {os.path.basename(destination_path)} ({error}); it was left at {pending_path}')
+            finally:
+                if content_index is not None:
+                    content_index.discard_pending(os.path.basename(destination_path))
+                with _pending_destinations_lock:
+                    _pending_destinations.discard(os.path.abspath(destination_path))
+                with self._lock:
+                    if self._jobs.qsize() == 0:
+                        try:
+                            os.rmdir(os.path.dirname(pending_path))
+                        except OSError:
+                            pass
+                self._jobs.task_done()
+
+
+_background_mover = None
+_background_mover_lock = threading.Lock()
+
+
+def get_background_mover():
+    global _background_mover
+    with _background_mover_lock:
+        if _background_mover is None:
+            _background_mover = BackgroundMover()
+        return _background_mover
+
+
+def wait_for_pending_moves():
+    """Blocks until every file handed to the background mover is in its output folder."""
+    if _background_mover is not None:
+        _background_mover.wait_until_idle()
+
+
+def run_after_pending_moves(callback):
+    """
+    Runs callback once every file handed to the background mover so far has reached its output folder (on the
+    mover's thread), or right away when nothing was handed over.
+    """
+    if _background_mover is None:
+        callback()
+    else:
+        _background_mover.after_pending(callback)
+
+
+def _store_identical_copy(content_index, existing_name: str, base_filename: str, sha256_hex: str):
+    """
+    Makes base_filename refer to the already stored existing_name without copying data. Returns the name the file is
+    now available under (existing_name itself if it already has this file's name), or None if no link could be made.
+    """
+    destination_folder = content_index.folder
+    title_base, extension = os.path.splitext(base_filename)
+    if re.fullmatch(re.escape(title_base) + r'(?:__dup\d+)?' + re.escape(extension), existing_name):
+        return existing_name
+    candidate_name = _free_destination_name(destination_folder, base_filename)
+    if not clone_or_link(os.path.join(destination_folder, existing_name), os.path.join(destination_folder, candidate_name)):
+        return None
+    content_index.add(candidate_name, sha256_hex)
+    return candidate_name
+
+
 def move_downloads_to_destination(source_folder: str, destination_folder: str, title_prefix: str = None) -> list:
-    """Moves completed downloads from the source folder to the destination folder, optionally renaming them."""
+    """
+    Moves completed downloads from the source folder to the destination folder, optionally renaming them.
+    With VERIFY_DOWNLOADS, damaged media files are set aside in source_folder instead (see zoom_verify).
+    A file identical to one already in the destination is linked to it instead of being stored a second time.
+    With BACKGROUND_MOVES the files leave source_folder at once but may still be arriving in destination_folder
+    when this returns; the returned names are final either way.
+    """
     moved_files = []
+    content_index = get_content_index(destination_folder)
     for file_name in list(os.listdir(source_folder)):
-        if file_name.endswith('.crdownload'):
+        if is_partial_download(file_name):
+            continue
+        if is_unwanted_media(file_name=file_name):
+            # Slipped through the up-front filter (e.g. no download events); drop it here instead of in the title folder
+            try:
+                os.remove(os.path.join(source_folder, file_name))
+                print('   [REMOVE_EXTENSIONS] Discarded from temporary folder:', file_name)
+            except Exception:
+                pass
             continue
             
         source_path = os.path.join(source_folder, file_name)
         base_filename = file_name
+
+        if VERIFY_DOWNLOADS:
+            problem = zoom_verify.verify_file(source_path)
+            if problem:
+                print(f'   [Verify] {file_name} is damaged ({problem}); not filing it')
+                try:
+                    zoom_verify.set_aside(source_path)
+                except OSError:
+                    pass
+                remove_resume_state(source_path)
+                _pop_streamed_hash(source_path)
+                continue
         
         if title_prefix:
             # Try to replace the standard Zoom prefix 'GMT<timestamp>..._Recording' with our title_prefix
@@ -111,62 +1022,120 @@ def move_downloads_to_destination(source_folder: str, destination_folder: str, t
                 base_filename = f"{title_prefix}_{base_filename}"
             else:
                 base_filename = new_filename
-                
-        destination_path = os.path.join(destination_folder, base_filename)
-        
+
+        sha256_hex = _pop_streamed_hash(source_path)
+        if content_index is not None:
+            try:
+                identical_name, sha256_hex = content_index.find_identical(source_path, sha256_hex)
+            except Exception:
+                identical_name = None
+            if identical_name:
+                if content_index.is_pending(identical_name):
+                    # the identical file is still on its way to the output folder
+                    wait_for_pending_moves()
+                stored_name = _store_identical_copy(content_index, identical_name, base_filename, sha256_hex)
+                if stored_name:
+                    print(f'   [Dedupe] {file_name} is identical to {identical_name}; stored as a link')
+                    os.remove(source_path)
+                    remove_resume_state(source_path)
+                    moved_files.append(stored_name)
+                    continue
+
         # Handle filename collisions by appending __dup{counter}
-        if os.path.exists(destination_path):
-            base_name, extension = os.path.splitext(base_filename)
-            collision_counter = 1
-            candidate_name = f"{base_name}__dup{collision_counter}{extension}"
-            candidate_path = os.path.join(destination_folder, candidate_name)
-            while os.path.exists(candidate_path):
-                collision_counter += 1
-                candidate_name = f"{base_name}__dup{collision_counter}{extension}"
-                candidate_path = os.path.join(destination_folder, candidate_name)
-            destination_path = candidate_path
-            base_filename = candidate_name
-            
+        with _pending_destinations_lock:
+            base_filename = _free_destination_name(destination_folder, base_filename)
+            destination_path = os.path.join(destination_folder, base_filename)
+            if BACKGROUND_MOVES:
+                _pending_destinations.add(os.path.abspath(destination_path))
+
+        if BACKGROUND_MOVES:
+            try:
+                get_background_mover().submit(source_path, destination_path, content_index, sha256_hex)
+                moved_files.append(base_filename)
+                remove_resume_state(source_path)
+                continue
+            except Exception:
+                with _pending_destinations_lock:
+                    _pending_destinations.discard(os.path.abspath(destination_path))
+
         try:
-            os.replace(source_path, destination_path)
+            move_file(source_path, destination_path)
             moved_files.append(base_filename)
         except Exception:
+            continue
+        if content_index is not None:
+            content_index.add(base_filename, sha256_hex)
+        # The file arrived complete, so any leftover resume state for it is no longer needed
+        remove_resume_state(source_path)
+    return moved_files
+
+
+def link_title_copies(destination_folder: str, file_names, from_prefix: str, to_prefix: str) -> list:
+    """
+    Makes the files of one title available under another title's prefix (for a recording linked from several
+    documents) by reflinking or hardlinking them, falling back to a copy. Returns the new file names.
+    """
+    wait_for_pending_moves()
+    content_index = get_content_index(destination_folder)
+    linked = []
+    for file_name in file_names:
+        if not file_name.startswith(from_prefix):
+            continue
+        existing_path = os.path.join(destination_folder, file_name)
+        new_name = _free_destination_name(destination_folder, to_prefix + file_name[len(from_prefix):])
+        new_path = os.path.join(destination_folder, new_name)
+        if not clone_or_link(existing_path, new_path):
             try:
-                # Fallback to manual copy-delete if os.replace fails
-                with open(source_path, 'rb') as read_file, open(destination_path, 'wb') as write_file:
-                    write_file.write(read_file.read())
-                os.remove(source_path)
-                moved_files.append(base_filename)
+                shutil.copyfile(existing_path, new_path)
             except Exception:
-                pass
-    return moved_files
+                continue
+        if content_index is not None:
+            entry = content_index.entries.get(file_name, {})
+            content_index.add(new_name, entry.get('sha256'))
+        linked.append(new_name)
+    return linked
 
 
-def remove_files_by_extensions(folder, exts):
+def normalize_share_id(link: str) -> str:
     """
-    Remove files in folder whose names end with any extension in exts.
-    exts: list of strings like ['.m4a', '.tmp'] (case-insensitive).
-    Returns list of removed filenames.
+    Key identifying the recording behind a link: the id in /rec/share/<id> or /rec/play/<id> when present (so
+    different tenants, passcodes or tracking parameters don't matter), otherwise the lowercased host, path and query.
+    A share id can cover several recordings of a meeting told apart by startTime, so that stays part of the key, in
+    milliseconds whether the link gives it in seconds or milliseconds.
     """
-    removed = []
-    if not os.path.isdir(folder):
-        return removed
-    normalized = [e.lower() for e in exts]
-    for f in list(os.listdir(folder)):
-        fname_lower = f.lower()
-        for ext in normalized:
-            if fname_lower.endswith(ext):
-                try:
-                    os.remove(os.path.join(folder, f))
-                    removed.append(f)
-                except Exception:
-                    pass
-                break
-    return removed
+    parsed = urlparse(link.strip())
+    share_match = re.search(r'/rec/(?:share|play)/([^/?#]+)', parsed.path)
+    if share_match:
+        start_times = [value for key, value in parse_qsl(parsed.query) if key.lower() == 'starttime']
+        start_digits = re.sub(r'\D', '', start_times[0]) if start_times else ''
+        if not start_digits:
+            return share_match.group(1)
+        start_ms = int(start_digits) * 1000 if len(start_digits) <= 10 else int(start_digits)
+        return f'{share_match.group(1)}?startTime={start_ms}'
+    return f"{(parsed.hostname or '').lower()}{parsed.path.rstrip('/')}?{parsed.query}"
+
+
+def reset_network_capture(driver):
+    """Discards media URLs captured so far, so the next page only reports its own."""
+    network_capture = get_network_capture(driver)
+    if network_capture is not None:
+        network_capture.reset()
+        return
+    try:
+        driver.get_log('performance')
+    except Exception:
+        pass
 
 
 def extract_media_urls_from_network_logs(driver) -> list:
-    """Parses Chrome's performance logs to identify any embedded media URLs (like .mp4 or .vtt)."""
+    """
+    Returns embedded media URLs (like .mp4 or .vtt) requested since the last call.
+    Uses the live network capture when available, otherwise parses Chrome's performance logs.
+    """
+    network_capture = get_network_capture(driver)
+    if network_capture is not None:
+        return [media_url for media_url in network_capture.drain() if not is_unwanted_media(url=media_url)]
+
     media_urls = set()
     try:
         network_logs = driver.get_log('performance')
@@ -175,143 +1144,899 @@ def extract_media_urls_from_network_logs(driver) -> list:
         
     for log_entry in network_logs:
         try:
+            # Most entries are unrelated traffic, so skip them before paying for a full JSON decode
+            if not _net_prefilter_re.search(log_entry['message']):
+                continue
             log_message = json.loads(log_entry['message'])['message']
             request_method = log_message.get('method')
             if request_method in ('Network.responseReceived', 'Network.requestWillBeSent'):
                 request_params = log_message.get('params', {})
                 response_data = request_params.get('response') or {}
                 extracted_url = response_data.get('url', '') or request_params.get('request', {}).get('url', '')
-                if extracted_url and _net_re.search(extracted_url):
+                if extracted_url and _net_re.search(extracted_url) and not is_unwanted_media(url=extracted_url):
                     media_urls.add(extracted_url)
         except Exception:
             continue
     return list(media_urls)
 
 
-def download_with_browser_cookies(driver, url, dest_path, timeout=120):
+def create_pooled_session() -> requests.Session:
+    """
+    A keep-alive session with room for HTTP_POOL_SIZE connections per host (at least SEGMENT_CONNECTIONS) and
+    automatic retries of connection errors and 429/5xx replies. Requests are paced per host (HOST_REQUESTS_PER_SECOND).
+    Meant to be kept and reused across files and links.
+    """
     s = requests.Session()
-    for c in driver.get_cookies():
-        domain = c.get('domain')
+    s.headers['User-Agent'] = USER_AGENT
+    # 429/5xx replies are retried by _HostPacedAdapter, so that every retry waits for its host's turn as well
+    retry_policy = Retry(total=HTTP_RETRIES, connect=HTTP_RETRIES, read=HTTP_RETRIES, status=0, backoff_factor=0.5,
+                         allowed_methods=frozenset(['GET', 'HEAD']), raise_on_status=False)
+    adapter = _HostPacedAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=max(HTTP_POOL_SIZE, SEGMENT_CONNECTIONS),
+                                max_retries=retry_policy)
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
+    return s
+
+
+def _cookie_key(c) -> tuple:
+    return (c.get('domain') or '', c.get('path') or '/', c['name'])
+
+
+def sync_session_cookies(s: requests.Session, cookies) -> bool:
+    """
+    Makes the session's cookie jar match the browser cookies given. Nothing is touched when the cookies are the same as
+    at the last sync, and otherwise only added, changed or removed cookies are applied. Returns True if anything changed.
+    """
+    current = {_cookie_key(c): c.get('value') for c in cookies}
+    previous = getattr(s, '_zoom_synced_cookies', {})
+    if current == previous:
+        return False
+    for (domain, path, name) in previous.keys() - current.keys():
         try:
-            s.cookies.set(c['name'], c['value'], domain=domain, path=c.get('path', '/'))
+            s.cookies.clear(domain, path, name)
+        except KeyError:
+            pass
+    for c in cookies:
+        if previous.get(_cookie_key(c)) == c.get('value') and _cookie_key(c) in previous:
+            continue
+        try:
+            s.cookies.set(c['name'], c['value'], domain=c.get('domain'), path=c.get('path', '/'))
         except Exception:
             s.cookies.set(c['name'], c['value'])
-    r = s.get(url, stream=True, timeout=timeout)
-    r.raise_for_status()
-    with open(dest_path, 'wb') as fh:
-        for chunk in r.iter_content(1024 * 64):
-            if chunk:
+    s._zoom_synced_cookies = current
+    return True
+
+
+def get_browser_session(driver) -> requests.Session:
+    """
+    The long-lived pooled session that belongs to driver, with its cookies brought up to date. Reusing it keeps
+    connections to the Zoom CDN warm across every file and link the browser handles.
+    """
+    s = getattr(driver, '_zoom_http_session', None)
+    if s is None:
+        s = create_pooled_session()
+        driver._zoom_http_session = s
+    sync_session_cookies(s, driver.get_cookies())
+    return s
+
+
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+
+def get_http_session(key: str = 'default') -> requests.Session:
+    """A shared pooled session by name, e.g. for the browser-free fast path or one transfer slot of the pipeline."""
+    with _http_sessions_lock:
+        if key not in _http_sessions:
+            _http_sessions[key] = create_pooled_session()
+        return _http_sessions[key]
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every transfer thread, refilled at rate bytes per second."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._available = rate
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, byte_count: int):
+        """Blocks until byte_count bytes may be transferred."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._available = min(self.rate, self._available + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                # a chunk larger than one second of budget is let through once the bucket is full
+                if self._available >= min(byte_count, self.rate):
+                    self._available -= byte_count
+                    return
+                wait_seconds = (min(byte_count, self.rate) - self._available) / self.rate
+            time.sleep(wait_seconds)
+
+
+_bandwidth_limiter = None
+
+
+def _throttle(byte_count: int):
+    """Applies MAX_BANDWIDTH_BYTES_PER_SECOND to a chunk that was just received."""
+    global _bandwidth_limiter
+    if not MAX_BANDWIDTH_BYTES_PER_SECOND:
+        return
+    if _bandwidth_limiter is None or _bandwidth_limiter.rate != MAX_BANDWIDTH_BYTES_PER_SECOND:
+        _bandwidth_limiter = BandwidthLimiter(MAX_BANDWIDTH_BYTES_PER_SECOND)
+    _bandwidth_limiter.consume(byte_count)
+
+
+class HostRateLimiter:
+    """
+    Token bucket per host, refilled at rate requests per second up to burst. penalize() halves a host's rate (not below
+    min_rate) and can pause the host for a Retry-After period; reward() wins the rate back a little at a time.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min(min_rate, rate)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str, now: float) -> dict:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = {'rate': self.rate, 'tokens': self.burst, 'refilled': now, 'paused_until': 0.0}
+        bucket['tokens'] = min(self.burst, bucket['tokens'] + (now - bucket['refilled']) * bucket['rate'])
+        bucket['refilled'] = now
+        return bucket
+
+    def try_acquire(self, host: str) -> float:
+        """Takes a token for host if one is there and returns 0, otherwise returns how many seconds until there is one."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            if bucket['paused_until'] > now:
+                return bucket['paused_until'] - now
+            if bucket['tokens'] >= 1:
+                bucket['tokens'] -= 1
+                return 0.0
+            return (1 - bucket['tokens']) / bucket['rate']
+
+    def acquire(self, host: str):
+        """Blocks until host may be sent another request."""
+        while True:
+            wait_seconds = self.try_acquire(host)
+            if wait_seconds <= 0:
+                return
+            time.sleep(wait_seconds)
+
+    def penalize(self, host: str, retry_after: float = None):
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            previous_rate = bucket['rate']
+            bucket['rate'] = max(self.min_rate, bucket['rate'] / 2)
+            bucket['tokens'] = min(bucket['tokens'], 0.0)
+            if retry_after:
+                bucket['paused_until'] = max(bucket['paused_until'], now + retry_after)
+        if bucket['rate'] < previous_rate:
+            print(f"   [Rate limit] {host} pushed back; pacing it at {bucket['rate']:.2f} requests/s")
+
+    def reward(self, host: str):
+        with self._lock:
+            bucket = self._bucket(host, time.monotonic())
+            bucket['rate'] = min(self.rate, bucket['rate'] + self.rate / 50)
+
+
+_host_limiter = None
+_host_limiter_lock = threading.Lock()
+
+
+def get_host_limiter():
+    """The HostRateLimiter shared by every pooled session, or None when HOST_REQUESTS_PER_SECOND is 0."""
+    global _host_limiter
+    if not HOST_REQUESTS_PER_SECOND:
+        return None
+    with _host_limiter_lock:
+        if _host_limiter is None or _host_limiter.rate != HOST_REQUESTS_PER_SECOND:
+            _host_limiter = HostRateLimiter(HOST_REQUESTS_PER_SECOND, HOST_REQUEST_BURST, HOST_MIN_REQUESTS_PER_SECOND)
+        return _host_limiter
+
+
+class _HostPacedAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter that waits for its host's turn before each request and tells the pacing how the host replied.
+    GET and HEAD requests answered with 429 or 5xx are retried here, up to HTTP_RETRIES times with exponential
+    backoff, each retry taking its turn like any other request.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def send(self, request, **kwargs):
+        limiter = get_host_limiter()
+        host = (urlparse(request.url).hostname or '').lower()
+        retries_left = HTTP_RETRIES if request.method in ('GET', 'HEAD') else 0
+        retry_number = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire(host)
+            response = super().send(request, **kwargs)
+            retry_after = retry_after_seconds(response)
+            if limiter is not None:
+                if response.status_code in (429, 503):
+                    limiter.penalize(host, retry_after)
+                elif response.status_code < 400:
+                    limiter.reward(host)
+            if response.status_code not in self.RETRY_STATUSES or retry_number >= retries_left:
+                return response
+            response.close()
+            retry_number += 1
+            # the limiter already holds the host back for its Retry-After; without it, the wait is honoured here
+            backoff_seconds = 0.5 * 2 ** (retry_number - 1)
+            time.sleep(backoff_seconds if limiter is not None else max(backoff_seconds, retry_after or 0))
+
+
+def is_partial_download(file_name: str) -> bool:
+    """
+    True for unfinished downloads, their resume sidecars, half-moved files and files set aside as damaged
+    (.crdownload, .part, .resume.json, .moving, .broken).
+    """
+    return file_name.endswith(('.crdownload', PARTIAL_SUFFIX, RESUME_SIDECAR_SUFFIX, '.moving', zoom_verify.BROKEN_SUFFIX))
+
+
+def read_resume_sidecar(dest_path: str):
+    """Returns the saved resume state for dest_path, or None when there is none."""
+    try:
+        with open(dest_path + RESUME_SIDECAR_SUFFIX, 'r', encoding='utf-8') as file_handle:
+            return json.load(file_handle)
+    except Exception:
+        return None
+
+
+def write_resume_sidecar(dest_path: str, state: dict):
+    """Atomically saves the resume state for dest_path next to its partial file."""
+    sidecar_path = dest_path + RESUME_SIDECAR_SUFFIX
+    try:
+        with open(sidecar_path + '.tmp', 'w', encoding='utf-8') as file_handle:
+            json.dump(state, file_handle)
+        os.replace(sidecar_path + '.tmp', sidecar_path)
+    except Exception:
+        pass
+
+
+def remove_resume_state(dest_path: str):
+    """Deletes the partial file and sidecar kept for dest_path, if any."""
+    for leftover in (dest_path + PARTIAL_SUFFIX, dest_path + RESUME_SIDECAR_SUFFIX):
+        try:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        except Exception:
+            pass
+
+
+def probe_remote_file(session, url, timeout=120, headers=None) -> dict:
+    """
+    Asks the server for the first byte of url to learn whether byte ranges are honoured.
+    Returns a dict with supports_ranges, total_size (None when unknown), etag, last_modified and content_type.
+    """
+    remote = {'supports_ranges': False, 'total_size': None, 'etag': None, 'last_modified': None, 'content_type': None}
+    try:
+        r = session.get(url, headers=dict(headers or {}, Range='bytes=0-0'), stream=True, timeout=timeout)
+    except Exception:
+        return remote
+    try:
+        remote['content_type'] = r.headers.get('Content-Type')
+        remote['etag'] = r.headers.get('ETag')
+        remote['last_modified'] = r.headers.get('Last-Modified')
+        if r.status_code == 206:
+            # Content-Range: bytes 0-0/123456
+            content_range = r.headers.get('Content-Range', '')
+            total = content_range.rsplit('/', 1)[-1].strip()
+            if total.isdigit():
+                remote['supports_ranges'] = True
+                remote['total_size'] = int(total)
+        elif r.ok:
+            # A plain 200 means the range header was ignored, even if Accept-Ranges was advertised
+            length = r.headers.get('Content-Length', '')
+            remote['total_size'] = int(length) if length.isdigit() else None
+        return remote
+    finally:
+        r.close()
+
+
+def _resume_state_matches(state: dict, remote: dict) -> bool:
+    """A saved partial is only reused when the server still describes the same file."""
+    if state.get('expected_size') and remote['total_size'] and state['expected_size'] != remote['total_size']:
+        return False
+    if state.get('etag') and remote['etag']:
+        return state['etag'] == remote['etag']
+    if state.get('last_modified') and remote['last_modified']:
+        return state['last_modified'] == remote['last_modified']
+    return True
+
+
+def _download_single_stream(session, url, dest_path, state, remote, timeout, extra_headers=None):
+    """Streams url into dest_path's .part file, appending to an existing contiguous partial when possible."""
+    partial_path = dest_path + PARTIAL_SUFFIX
+    offset = 0
+    if state.get('segment_size') is None and os.path.exists(partial_path):
+        offset = os.path.getsize(partial_path)
+
+    headers = dict(extra_headers or {})
+    if offset and remote['supports_ranges'] and (not remote['total_size'] or offset < remote['total_size']):
+        headers['Range'] = f'bytes={offset}-'
+        validator = state.get('etag') or state.get('last_modified')
+        if validator:
+            headers['If-Range'] = validator
+
+    r = session.get(url, headers=headers, stream=True, timeout=timeout)
+    try:
+        r.raise_for_status()
+        if 'Range' in headers and r.status_code == 206 and r.headers.get('Content-Range', '').startswith(f'bytes {offset}-'):
+            print(f'   [Resume] Continuing {os.path.basename(dest_path)} from byte {offset}')
+            mode = 'ab'
+        else:
+            offset = 0
+            mode = 'wb'
+        state['segment_size'] = None
+        state['completed_segments'] = []
+        if RESUME_PARTIAL_DOWNLOADS:
+            write_resume_sidecar(dest_path, state)
+        # hash while streaming, so the mover can look for duplicates without reading the file again
+        streamed_digest = hashlib.sha256() if mode == 'wb' and DEDUPE_CONTENT else None
+        with open(partial_path, mode) as fh:
+            for chunk in r.iter_content(STREAM_CHUNK_BYTES):
+                if chunk:
+                    _throttle(len(chunk))
+                    fh.write(chunk)
+                    if streamed_digest is not None:
+                        streamed_digest.update(chunk)
+    finally:
+        r.close()
+
+    expected_size = state.get('expected_size')
+    if expected_size and os.path.getsize(partial_path) != expected_size:
+        raise IOError(f'Download of {os.path.basename(dest_path)} ended at {os.path.getsize(partial_path)} of {expected_size} bytes')
+    if streamed_digest is not None:
+        remember_streamed_hash(dest_path, streamed_digest.hexdigest())
+    return True
+
+
+def _download_segment(session, url, partial_path, start, end, timeout, extra_headers=None):
+    """Fetches bytes start..end (inclusive) and writes them at the same offset in partial_path."""
+    r = session.get(url, headers=dict(extra_headers or {}, Range=f'bytes={start}-{end}'), stream=True, timeout=timeout)
+    try:
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise IOError(f'Server ignored range request for bytes {start}-{end}')
+        offset = start
+        with open(partial_path, 'r+b') as fh:
+            fh.seek(start)
+            for chunk in r.iter_content(STREAM_CHUNK_BYTES):
+                if not chunk:
+                    continue
+                if offset + len(chunk) > end + 1:
+                    raise IOError(f'Server sent more data than requested for bytes {start}-{end}')
+                _throttle(len(chunk))
                 fh.write(chunk)
+                offset += len(chunk)
+        if offset != end + 1:
+            raise IOError(f'Segment {start}-{end} ended early at byte {offset}')
+    finally:
+        r.close()
+
+
+def _download_segmented(session, url, dest_path, state, total_size, connections, segment_size, timeout, extra_headers=None):
+    """
+    Fetches byte ranges of url over several connections into a preallocated .part file.
+    Finished segments are recorded in the sidecar so a rerun only fetches the missing ones.
+    """
+    partial_path = dest_path + PARTIAL_SUFFIX
+    if state.get('segment_size') and os.path.exists(partial_path) and os.path.getsize(partial_path) == total_size:
+        segment_size = state['segment_size']
+        completed_segments = set(state.get('completed_segments') or [])
+    else:
+        completed_segments = set()
+        with open(partial_path, 'wb') as fh:
+            fh.truncate(total_size)
+
+    state['segment_size'] = segment_size
+    state['completed_segments'] = sorted(completed_segments)
+    if RESUME_PARTIAL_DOWNLOADS:
+        write_resume_sidecar(dest_path, state)
+
+    segments = [(start, min(start + segment_size, total_size) - 1) for start in range(0, total_size, segment_size)
+                if start not in completed_segments]
+    if completed_segments:
+        print(f'   [Resume] Continuing {os.path.basename(dest_path)}: {len(segments)} segment(s) left')
+
+    state_lock = threading.Lock()
+
+    def fetch_segment(start, end):
+        _download_segment(session, url, partial_path, start, end, timeout, extra_headers=extra_headers)
+        with state_lock:
+            completed_segments.add(start)
+            state['completed_segments'] = sorted(completed_segments)
+            if RESUME_PARTIAL_DOWNLOADS:
+                write_resume_sidecar(dest_path, state)
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        futures = [executor.submit(fetch_segment, start, end) for start, end in segments]
+        for future in futures:
+            # re-raise the first failed segment so the caller can fall back or report it
+            future.result()
     return True
 
-def force_click_download_button(driver, temp_folder: str) -> bool:
-    """Searches through all open iframes on the current page to locate and forcefully click the download button."""
-    iframes = driver.find_elements(By.TAG_NAME, 'iframe')
-    frame_contexts = [(None, None)] + [(i, frame) for i, frame in enumerate(iframes)]
-    for idx, frame in frame_contexts:
+
+def download_url(session, url, dest_path, timeout=120, connections=None, segment_size=None, page_url=None, headers=None):
+    """
+    Downloads url to dest_path with the given session. Uses parallel byte ranges when the server supports them
+    and the file is larger than one segment, otherwise a single stream. Data is written to dest_path + '.part'
+    and renamed into place once complete; an earlier partial for the same file is continued instead of refetched.
+    Returns False without downloading when the server reports a Content-Type listed in SKIP_EXTENSIONS.
+    """
+    transfer_start_time = time.time()
+    connections = max(1, connections or SEGMENT_CONNECTIONS)
+    segment_size = max(STREAM_CHUNK_BYTES, segment_size or SEGMENT_SIZE_BYTES)
+    remote = probe_remote_file(session, url, timeout=timeout, headers=headers)
+    if is_unwanted_media(content_type=remote['content_type']):
+        print(f"   [REMOVE_EXTENSIONS] Skipped {os.path.basename(dest_path)} ({remote['content_type']})")
+        return False
+
+    state = read_resume_sidecar(dest_path) if RESUME_PARTIAL_DOWNLOADS else None
+    if state and not _resume_state_matches(state, remote):
+        remove_resume_state(dest_path)
+        state = None
+    if not state:
+        state = {'segment_size': None, 'completed_segments': []}
+    state.update({
+        'url': url,
+        'page_url': page_url or state.get('page_url'),
+        'expected_size': remote['total_size'] or state.get('expected_size'),
+        'etag': remote['etag'] or state.get('etag'),
+        'last_modified': remote['last_modified'] or state.get('last_modified'),
+    })
+
+    total_size = remote['total_size']
+    zoom_metrics.expect_file(os.path.basename(dest_path), total_size)
+    completed = False
+    if connections > 1 and remote['supports_ranges'] and total_size and total_size > segment_size:
         try:
-            if frame is None:
-                driver.switch_to.default_content()
+            completed = _download_segmented(session, url, dest_path, state, total_size, connections, segment_size, timeout, extra_headers=headers)
+        except Exception as error:
+            if RESUME_PARTIAL_DOWNLOADS:
+                # Finished segments are kept, so one more pass only fetches the missing ones. A second failure
+                # is raised and the partial stays on disk for the next run.
+                print(f'   [Warning] Segmented download interrupted ({error}); retrying missing segments.')
+                completed = _download_segmented(session, url, dest_path, state, total_size, connections, segment_size, timeout, extra_headers=headers)
             else:
-                driver.switch_to.default_content()
-                driver.switch_to.frame(frame)
-            time.sleep(0.05)
-
-            download_button_xpaths = [
-                "//*[contains(translate(normalize-space(text()),'DOWNLOAD','download'),'download')]",
-                "//*[contains(translate(@aria-label,'DOWNLOAD','download'),'download')]",
-                "//button[contains(translate(.,'DOWNLOAD','download'),'download')]",
-                "//a[contains(translate(.,'DOWNLOAD','download'),'download')]",
-                "//*[contains(translate(@title,'DOWNLOAD','download'),'download')]"
-            ]
-
-            button_candidates = []
-            for current_xpath in download_button_xpaths:
-                try:
-                    elements = driver.find_elements(By.XPATH, current_xpath)
-                    for element in elements:
-                        try:
-                            element_text = (element.text or element.get_attribute('aria-label') or element.get_attribute('title') or '').strip()
-                        except Exception:
-                            element_text = ''
-                        if element_text:
-                            button_candidates.append(element)
-                except Exception:
-                    continue
+                print(f'   [Warning] Segmented download failed ({error}); retrying as a single stream.')
+    if not completed:
+        if state.get('segment_size'):
+            # A segmented partial has holes, so a single stream has to start from the beginning
+            try:
+                os.remove(dest_path + PARTIAL_SUFFIX)
+            except Exception:
+                pass
+            state['segment_size'] = None
+            state['completed_segments'] = []
+        _download_single_stream(session, url, dest_path, state, remote, timeout, extra_headers=headers)
 
-            seen_elements = set()
-            unique_candidates = []
-            for element in button_candidates:
-                try:
-                    element_key = (element.tag_name, (element.get_attribute('id') or ''), (element.get_attribute('class') or ''), (element.text or '')[:60])
-                except Exception:
-                    element_key = (element.tag_name, '')
-                if element_key in seen_elements:
-                    continue
-                seen_elements.add(element_key)
-                unique_candidates.append(element)
+    os.replace(dest_path + PARTIAL_SUFFIX, dest_path)
+    remove_resume_state(dest_path)
+    zoom_metrics.record_file(os.path.basename(dest_path), os.path.getsize(dest_path), time.time() - transfer_start_time, 'http')
+    return True
 
-            if not unique_candidates:
-                driver.switch_to.default_content()
+
+def clear_staging_folder(folder: str) -> list:
+    """
+    Empties a temporary download folder from an earlier run, keeping partial downloads that have a resume sidecar.
+    A tab's Chrome partial that was still under its GUID in the shared download folder is brought into the folder.
+    Returns the final file names that can still be resumed.
+    """
+    os.makedirs(folder, exist_ok=True)
+    keep = set()
+    resumable = []
+    if RESUME_PARTIAL_DOWNLOADS:
+        for file_name in os.listdir(folder):
+            if not file_name.endswith(RESUME_SIDECAR_SUFFIX):
                 continue
+            final_name = file_name[:-len(RESUME_SIDECAR_SUFFIX)]
+            guid_partial = (read_resume_sidecar(os.path.join(folder, final_name)) or {}).get('chrome_partial')
+            if guid_partial and not os.path.exists(os.path.join(folder, final_name + '.crdownload')):
+                for partial_path in (guid_partial + '.crdownload', guid_partial):
+                    try:
+                        os.replace(partial_path, os.path.join(folder, final_name + '.crdownload'))
+                        break
+                    except OSError:
+                        pass
+            for partial_name in (final_name + PARTIAL_SUFFIX, final_name + '.crdownload'):
+                if os.path.exists(os.path.join(folder, partial_name)):
+                    keep.update((file_name, partial_name))
+                    resumable.append(final_name)
+                    break
+    for file_name in os.listdir(folder):
+        if file_name in keep:
+            continue
+        file_path = os.path.join(folder, file_name)
+        try:
+            if os.path.isdir(file_path):
+                shutil.rmtree(file_path)
+            else:
+                os.remove(file_path)
+        except Exception:
+            pass
+    return resumable
 
-            for element in unique_candidates:
-                try:
-                    driver.execute_script("arguments[0].scrollIntoView({block:'center'});", element)
-                    time.sleep(0.05)
-                    element.click()
-                    driver.switch_to.default_content()
-                    return True
-                except Exception:
-                    pass
 
-                try:
-                    driver.execute_script("arguments[0].click();", element)
-                    driver.switch_to.default_content()
-                    return True
-                except Exception:
-                    pass
+def note_chrome_partials(folder: str, media_urls, page_url: str) -> list:
+    """
+    Writes resume sidecars for Chrome '.crdownload' files whose name matches one of the captured media URLs,
+    so they can be continued over HTTP if the browser dies before finishing them. Only needed without download
+    events; with them, track_chrome_partial has written the sidecars when the downloads began.
+    """
+    if not RESUME_PARTIAL_DOWNLOADS or not folder or not os.path.isdir(folder):
+        return []
+    urls_by_name = {}
+    for media_url in media_urls or []:
+        urls_by_name.setdefault(unquote(urlparse(media_url).path.split('/')[-1]), media_url)
+    noted = []
+    for file_name in os.listdir(folder):
+        if not file_name.endswith('.crdownload'):
+            continue
+        final_name = file_name[:-len('.crdownload')]
+        dest_path = os.path.join(folder, final_name)
+        if final_name in urls_by_name and read_resume_sidecar(dest_path) is None:
+            write_resume_sidecar(dest_path, {'url': urls_by_name[final_name], 'page_url': page_url,
+                                             'expected_size': None, 'etag': None, 'last_modified': None,
+                                             'segment_size': None, 'completed_segments': []})
+            noted.append(final_name)
+    return noted
+
+
+def track_chrome_partial(download: dict):
+    """
+    DownloadTracker callback that keeps a resume sidecar next to every Chrome download while it is in flight. The
+    sidecar is written as soon as the download begins (and again once its size is known), so a .crdownload left by a
+    crash or kill is continued by the next run instead of cleared; it is removed once the download ends. A tab's
+    download is saved under its GUID elsewhere until it completes, so its sidecar notes that path as chrome_partial.
+    """
+    if not RESUME_PARTIAL_DOWNLOADS or download['intercepted'] or download['skipped']:
+        return
+    if not download['folder'] or not download['suggested_filename'] or not download['url']:
+        return
+    dest_path = os.path.join(download['folder'], download['suggested_filename'])
+    if download['state'] == 'inProgress':
+        write_resume_sidecar(dest_path,
+                             {'url': download['url'], 'page_url': download['page_url'],
+                              'expected_size': download['total_bytes'] or None, 'etag': None, 'last_modified': None,
+                              'segment_size': None, 'completed_segments': [], 'chrome_partial': download.get('partial_path')})
+        return
+    try:
+        os.remove(dest_path + RESUME_SIDECAR_SUFFIX)
+    except OSError:
+        pass
+
+
+def resume_partial_downloads(driver, folder: str, page_url: str, fresh_media_urls=None) -> list:
+    """
+    Continues the partial downloads left in folder by an earlier run of page_url using the browser's cookies.
+    Freshly captured media URLs with the same file name are preferred, since signed Zoom URLs expire.
+    Returns the file names that were completed.
+    """
+    if not RESUME_PARTIAL_DOWNLOADS or not os.path.isdir(folder):
+        return []
+    fresh_by_name = {}
+    for media_url in fresh_media_urls or []:
+        fresh_by_name.setdefault(unquote(urlparse(media_url).path.split('/')[-1]), media_url)
+
+    completed = []
+    for file_name in list(os.listdir(folder)):
+        if not file_name.endswith(RESUME_SIDECAR_SUFFIX):
+            continue
+        final_name = file_name[:-len(RESUME_SIDECAR_SUFFIX)]
+        dest_path = os.path.join(folder, final_name)
+        state = read_resume_sidecar(dest_path)
+        if not state or state.get('page_url') != page_url:
+            continue
+        # Chrome partials are contiguous, so they can be continued like our own .part files
+        chrome_partial = dest_path + '.crdownload'
+        if os.path.exists(chrome_partial) and not os.path.exists(dest_path + PARTIAL_SUFFIX):
+            try:
+                os.replace(chrome_partial, dest_path + PARTIAL_SUFFIX)
+            except Exception:
+                continue
+        media_url = fresh_by_name.get(final_name) or state.get('url')
+        try:
+            download_with_browser_cookies(driver, media_url, dest_path, page_url=page_url)
+            completed.append(final_name)
+        except Exception as error:
+            print(f'   [Warning] Could not resume {final_name}: {error}')
+    return completed
+
+
+def download_with_browser_cookies(driver, url, dest_path, timeout=120, connections=None, segment_size=None, page_url=None):
+    s = get_browser_session(driver)
+    return download_url(s, url, dest_path, timeout=timeout, connections=connections, segment_size=segment_size, page_url=page_url)
+
+
+def _is_trusted_media_host(url: str) -> bool:
+    host = (urlparse(url).hostname or '').lower()
+    return any(host == allowed or host.endswith('.' + allowed) for allowed in HTTP_FAST_PATH_MEDIA_HOSTS)
+
+
+def extract_embedded_media_urls(page_text: str) -> list:
+    """
+    Finds direct .mp4/.m4a/.vtt URLs in a share page or play-info JSON, including ones escaped inside inline
+    script data (\\/ and \\u002F). Returns them in page order without duplicates.
+    """
+    unescaped = page_text.replace('\\u002F', '/').replace('\\u002f', '/').replace('\\/', '/').replace('\\u0026', '&').replace('&amp;', '&')
+    media_urls = []
+    for match in _embedded_media_url_re.finditer(unescaped):
+        media_url = match.group(0)
+        if media_url not in media_urls and _is_trusted_media_host(media_url):
+            media_urls.append(media_url)
+    return media_urls
+
+
+def resolve_share_page_over_http(share_url: str, session=None) -> list:
+    """
+    Fetches a Zoom share page without a browser and returns the direct media URLs it exposes, either in the page
+    itself or in the play-info JSON for the recording file ids it references. Returns [] when nothing is found.
+    """
+    session = session or get_http_session()
+    try:
+        page = session.get(share_url, timeout=HTTP_FAST_PATH_TIMEOUT)
+        page.raise_for_status()
+    except Exception:
+        return []
+    media_urls = extract_embedded_media_urls(page.text)
+    if media_urls:
+        return media_urls
+
+    # Newer players load their file list from the play-info endpoint instead of inlining it
+    page_origin = '{0.scheme}://{0.netloc}'.format(urlparse(page.url))
+    for file_id in dict.fromkeys(_embedded_file_id_re.findall(page.text)):
+        try:
+            play_info = session.get(f'{page_origin}/nws/recording/1.0/play/info/{file_id}',
+                                    headers={'Referer': page.url}, timeout=HTTP_FAST_PATH_TIMEOUT)
+            play_info.raise_for_status()
+        except Exception:
+            continue
+        for media_url in extract_embedded_media_urls(play_info.text):
+            if media_url not in media_urls:
+                media_urls.append(media_url)
+    return media_urls
 
-                try:
-                    ActionChains(driver).move_to_element(element).pause(0.05).click(element).perform()
-                    driver.switch_to.default_content()
-                    return True
-                except Exception:
-                    pass
 
+def probe_recording_size(share_url: str, session=None):
+    """
+    Total size in bytes of the media a share page exposes without a browser (see resolve_share_page_over_http),
+    asked of the server with one-byte range requests. None if the page has no direct media or a size is unknown.
+    """
+    session = session or get_http_session()
+    media_urls = [media_url for media_url in resolve_share_page_over_http(share_url, session=session) if not is_unwanted_media(url=media_url)]
+    if not media_urls:
+        return None
+    total_size = 0
+    for media_url in media_urls:
+        remote = probe_remote_file(session, media_url, timeout=HTTP_FAST_PATH_TIMEOUT, headers={'Referer': share_url})
+        if not remote['total_size']:
+            return None
+        total_size += remote['total_size']
+    return total_size
+
+
+def format_bytes(size_bytes: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size_bytes) < 1000:
+            return f'{size_bytes:.0f} {unit}' if unit == 'B' else f'{size_bytes:.1f} {unit}'
+        size_bytes /= 1000
+    return f'{size_bytes:.1f} TB'
+
+
+def download_share_over_http(share_url: str, temp_folder: str, session=None) -> list:
+    """
+    Browser-free fast path: resolves the share page and downloads every media file into temp_folder.
+    Returns the downloaded file names, or [] if the page couldn't be resolved or any file failed, in which case
+    the caller should fall back to the browser.
+    """
+    session = session or get_http_session()
+    media_urls = resolve_share_page_over_http(share_url, session=session)
+    wanted_urls = [media_url for media_url in media_urls if not is_unwanted_media(url=media_url)]
+    if not wanted_urls:
+        return []
+    downloaded = []
+    for media_url in wanted_urls:
+        file_name = unquote(urlparse(media_url).path.split('/')[-1])
+        try:
+            if not download_url(session, media_url, os.path.join(temp_folder, file_name), page_url=share_url):
+                continue
+        except Exception as error:
+            print(f'   [Warning] Direct download of {file_name} failed ({error}); using the browser instead.')
+            # the browser fetches the whole recording again, so drop the files that did arrive to avoid duplicates
+            for downloaded_name in downloaded:
                 try:
-                    driver.execute_script("""
-                    const el = arguments[0];
-                    const rect = el.getBoundingClientRect();
-                    const x = rect.left + rect.width/2;
-                    const y = rect.top + rect.height/2;
-                    ['pointerdown','pointerup','click'].forEach(evt=>{
-                      el.dispatchEvent(new MouseEvent(evt,{bubbles:true,cancelable:true,clientX:x,clientY:y}));
-                    });
-                    """, element)
-                    driver.switch_to.default_content()
-                    return True
+                    os.remove(os.path.join(temp_folder, downloaded_name))
                 except Exception:
                     pass
+            return []
+        downloaded.append(file_name)
+    return downloaded
+
+
+# Scans the document and every same-origin frame for download controls in a single call. Matching elements and the
+# frames that lead to them are tagged with data attributes, so Python can reach the chosen one with plain CSS lookups.
+# Cross-origin frames can't be entered from script; their marker ids are returned so they can be scanned separately.
+_LOCATE_DOWNLOAD_JS = """
+const maxCandidates = arguments[0];
+const scanId = String(Date.now()) + Math.floor(Math.random() * 1000);
+let frameCounter = 0, candidateCounter = 0;
+const candidates = [], opaqueFrames = [];
+const has = (value) => (value || '').toLowerCase().includes('download');
+function ownText(el) {
+  let text = '';
+  for (const node of el.childNodes) { if (node.nodeType === 3) text += node.nodeValue; }
+  return text.trim();
+}
+function scan(doc, framePath) {
+  for (const el of doc.querySelectorAll('*')) {
+    const tag = el.tagName.toLowerCase();
+    const aria = el.getAttribute('aria-label') || '';
+    const title = el.getAttribute('title') || '';
+    const isControl = tag === 'button' || tag === 'a' || el.getAttribute('role') === 'button';
+    const text = (isControl ? el.textContent : ownText(el)) || '';
+    if (!(has(text) || has(aria) || has(title))) continue;
+    const label = (text.trim() || aria || title).replace(/\\s+/g, ' ').trim();
+    if (!label) continue;
+    const rect = el.getBoundingClientRect();
+    const visible = rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    let score = 0;
+    if (visible) score += 4;
+    if (tag === 'button') score += 3; else if (isControl) score += 2;
+    if (label.toLowerCase() === 'download') score += 3;
+    if (label.length < 40) score += 1;
+    if (el.disabled || el.getAttribute('aria-disabled') === 'true') score -= 5;
+    const marker = scanId + '-' + (candidateCounter++);
+    el.setAttribute('data-zoom-download', marker);
+    candidates.push({marker: marker, frames: framePath, score: score, tag: tag, label: label.slice(0, 60)});
+  }
+  for (const frame of doc.querySelectorAll('iframe, frame')) {
+    const frameMarker = scanId + '-f' + (frameCounter++);
+    frame.setAttribute('data-zoom-frame', frameMarker);
+    let childDoc = null;
+    try { childDoc = frame.contentDocument; } catch (e) { childDoc = null; }
+    if (childDoc && childDoc.documentElement) scan(childDoc, framePath.concat([frameMarker]));
+    else opaqueFrames.push(framePath.concat([frameMarker]));
+  }
+}
+scan(document, []);
+candidates.sort((a, b) => b.score - a.score);
+return {candidates: candidates.slice(0, maxCandidates), opaque_frames: opaqueFrames};
+"""
+
+_DISPATCH_CLICK_JS = """
+const el = arguments[0];
+const rect = el.getBoundingClientRect();
+const x = rect.left + rect.width/2;
+const y = rect.top + rect.height/2;
+['pointerdown','pointerup','click'].forEach(evt=>{
+  el.dispatchEvent(new MouseEvent(evt,{bubbles:true,cancelable:true,clientX:x,clientY:y}));
+});
+"""
+
+
+def _switch_to_frame_path(driver, frame_path):
+    """Enters the chain of frames tagged by _LOCATE_DOWNLOAD_JS, starting from the current frame."""
+    for frame_marker in frame_path:
+        driver.switch_to.frame(driver.find_element(By.CSS_SELECTOR, f'[data-zoom-frame="{frame_marker}"]'))
+
 
+def _click_element(driver, element, prefer_method=None):
+    """
+    Tries a native click, a script click, an action chain and finally synthetic pointer events.
+    Returns the name of the method that worked ('native', 'script', 'actions', 'events'), or None.
+    """
+    click_methods = ['native', 'script', 'actions', 'events']
+    if prefer_method in click_methods:
+        click_methods.remove(prefer_method)
+        click_methods.insert(0, prefer_method)
+    try:
+        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", element)
+        time.sleep(0.05)
+    except Exception:
+        pass
+    for click_method in click_methods:
+        try:
+            if click_method == 'native':
+                element.click()
+            elif click_method == 'script':
+                driver.execute_script("arguments[0].click();", element)
+            elif click_method == 'actions':
+                ActionChains(driver).move_to_element(element).pause(0.05).click(element).perform()
+            else:
+                driver.execute_script(_DISPATCH_CLICK_JS, element)
+            return click_method
+        except Exception:
+            pass
+    return None
+
+
+def locate_download_candidates(driver, max_candidates=10) -> dict:
+    """
+    Runs _LOCATE_DOWNLOAD_JS in the current frame. Returns ranked candidates (best first) with the frame path
+    leading to each, plus the paths of cross-origin frames that could not be scanned.
+    """
+    try:
+        return driver.execute_script(_LOCATE_DOWNLOAD_JS, max_candidates) or {'candidates': [], 'opaque_frames': []}
+    except Exception:
+        return {'candidates': [], 'opaque_frames': []}
+
+
+def force_click_download_button_detailed(driver, preferred_frame=None, prefer_method=None):
+    """
+    Locates the download button in the page and all of its frames with one injected script, then clicks the
+    best-ranked candidate. Cross-origin frames are entered and scanned the same way, one script call each.
+    Returns {'strategy': 'force', 'frame': n, 'method': ...} where frame 0 is the top document (with its
+    same-origin frames) and n > 0 is the n-th cross-origin frame, or None when nothing could be clicked.
+    preferred_frame is scanned first when the page has it.
+    """
+    frame_paths_to_scan = [(0, [])]
+    scanned_top = False
+    while frame_paths_to_scan:
+        frame_number, base_frame_path = frame_paths_to_scan.pop(0)
+        try:
             driver.switch_to.default_content()
+            _switch_to_frame_path(driver, base_frame_path)
         except Exception:
+            continue
+        located = locate_download_candidates(driver)
+        # only follow cross-origin frames one level down from the top document, like the per-iframe scan did
+        if not scanned_top:
+            scanned_top = True
+            opaque_frames = list(enumerate(located.get('opaque_frames') or [], start=1))
+            if preferred_frame and 0 < preferred_frame <= len(opaque_frames):
+                opaque_frames.insert(0, opaque_frames.pop(preferred_frame - 1))
+            frame_paths_to_scan.extend(opaque_frames)
+
+        for candidate in located.get('candidates') or []:
             try:
                 driver.switch_to.default_content()
+                _switch_to_frame_path(driver, base_frame_path + candidate['frames'])
+                element = driver.find_element(By.CSS_SELECTOR, f'[data-zoom-download="{candidate["marker"]}"]')
             except Exception:
-                pass
-            continue
+                continue
+            click_method = _click_element(driver, element, prefer_method=prefer_method)
+            if click_method:
+                driver.switch_to.default_content()
+                return {'strategy': 'force', 'frame': frame_number, 'method': click_method}
 
-    return False
+    try:
+        driver.switch_to.default_content()
+    except Exception:
+        pass
+    return None
 
 
-def wait_for_active_downloads(folder, timeout=180, poll=1.5):
+def wait_for_active_downloads(folder, timeout=180, poll=1.5, tracker=None):
     """
     Wait until Chrome '.crdownload' partial files in folder disappear or timeout.
+    With a download tracker, waits for the folder's in-flight downloads to complete instead, for as long as they keep
+    receiving data; '.crdownload' files the tracker doesn't know (left by a browser that died) aren't waited for.
     Returns True if no active partials remain, False if timeout reached.
     """
     if not folder or not os.path.isdir(folder):
         return True
+    if tracker is not None:
+        if not tracker.active_downloads(folder):
+            return True
+        print(f'   [Wait] Waiting for active downloads to finish in {folder} (max {timeout}s)...')
+        deadline = time.time() + timeout
+        while not tracker.wait_until_idle(folder, timeout=min(DOWNLOAD_STALL_SECONDS, max(0, deadline - time.time())), settle=0):
+            if time.time() >= deadline or tracker.closed or not tracker.is_progressing(folder, DOWNLOAD_STALL_SECONDS):
+                print('   [Warning] Downloads stopped or timed out — they are left to be resumed on the next run.')
+                return False
+        print('   [Success] All downloads completed.')
+        return True
     print(f'   [Wait] Waiting for active downloads to finish in {folder} (max {timeout}s)...')
     deadline = time.time() + timeout
     try:
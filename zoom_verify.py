@@ -0,0 +1,129 @@
+# zoom_verify.py
+import os
+import re
+import mmap
+import struct
+
+# Files that fail verification are renamed with this suffix, which frees their name for a fresh download
+BROKEN_SUFFIX = '.broken'
+
+ISOBMFF_EXTENSIONS = ('.mp4', '.m4a', '.m4v', '.mov')
+VTT_EXTENSIONS = ('.vtt',)
+
+_BOX_TYPE_RE = re.compile(rb'[\x20-\x7e]{4}')
+_VTT_TIMING_RE = re.compile(rb'(?:\d+:)?\d{2}:\d{2}\.\d{3}[ \t]+-->[ \t]+(?:\d+:)?\d{2}:\d{2}\.\d{3}')
+
+
+def _check_isobmff(data, file_size: int):
+    """
+    Walks the top-level boxes of an MP4/M4A file. Only the 8 or 16 header bytes of each box are read, so the check
+    costs a handful of page reads no matter how large the file is.
+    """
+    offset = 0
+    box_types = []
+    while offset < file_size:
+        if file_size - offset < 8:
+            return f'{file_size - offset} stray byte(s) after the last box'
+        box_size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if box_size == 1:
+            if file_size - offset < 16:
+                return f'box header cut off at byte {offset}'
+            box_size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header_size = 16
+        elif box_size == 0:
+            # a size of 0 means the box runs to the end of the file
+            box_size = file_size - offset
+        if not _BOX_TYPE_RE.fullmatch(box_type):
+            return f'no valid box at byte {offset}'
+        box_name = box_type.decode('ascii')
+        if box_size < header_size:
+            return f"'{box_name}' box at byte {offset} has an impossible size of {box_size}"
+        if offset + box_size > file_size:
+            return f"'{box_name}' box needs {offset + box_size} bytes but the file has {file_size}"
+        box_types.append(box_type)
+        offset += box_size
+    if not box_types or box_types[0] not in (b'ftyp', b'styp'):
+        return "doesn't start with an 'ftyp' box"
+    if b'moov' not in box_types:
+        return "no 'moov' box (the index of the media is missing)"
+    if b'mdat' not in box_types and b'moof' not in box_types:
+        return "no 'mdat' box (the media itself is missing)"
+    return None
+
+
+def _check_vtt(data, file_size: int):
+    """Checks the WEBVTT header and that the last cue's timing line is complete and followed by its text."""
+    head = data[:16]
+    if head.startswith(b'\xef\xbb\xbf'):
+        head = head[3:]
+    if not head.startswith(b'WEBVTT') or head[6:7] not in (b'', b' ', b'\t', b'\r', b'\n'):
+        return 'no WEBVTT header'
+    # rfind scans from the end, so only the last cue is read
+    arrow = data.rfind(b'-->')
+    if arrow == -1:
+        return None
+    line_start = data.rfind(b'\n', 0, arrow) + 1
+    line_end = data.find(b'\n', arrow)
+    if line_end == -1 or not _VTT_TIMING_RE.match(data[line_start:line_end].strip()):
+        return 'last cue timing line is cut off'
+    if not data[line_end:file_size].strip():
+        return 'last cue has no text'
+    return None
+
+
+def verify_file(path: str):
+    """
+    Checks that a downloaded MP4/M4A or VTT file is structurally complete, reading it through a memory map so only
+    the few bytes that are looked at come off disk. Returns what is wrong with it, or None if it looks complete (or
+    isn't a type that can be checked).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ISOBMFF_EXTENSIONS:
+        check = _check_isobmff
+    elif extension in VTT_EXTENSIONS:
+        check = _check_vtt
+    else:
+        return None
+    try:
+        file_size = os.path.getsize(path)
+        if file_size == 0:
+            return 'empty file'
+        with open(path, 'rb') as file_handle, mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return check(data, file_size)
+    except (OSError, ValueError) as error:
+        return f'unreadable ({error})'
+
+
+def set_aside(path: str) -> str:
+    """Renames a damaged file out of the way (adding BROKEN_SUFFIX) and returns its new path."""
+    broken_path = path + BROKEN_SUFFIX
+    os.replace(path, broken_path)
+    return broken_path
+
+
+def list_broken(folder: str) -> list:
+    """Names of the files in folder that were set aside as damaged."""
+    try:
+        return [file_name[:-len(BROKEN_SUFFIX)] for file_name in os.listdir(folder) if file_name.endswith(BROKEN_SUFFIX)]
+    except OSError:
+        return []
+
+
+def verify_folder(folder: str):
+    """
+    Verifies every checkable file directly inside folder. Returns (files checked, their total bytes,
+    {file name: problem} for the damaged ones).
+    """
+    checked_count = 0
+    checked_bytes = 0
+    problems = {}
+    for entry in os.scandir(folder):
+        if not entry.is_file() or not entry.name.lower().endswith(ISOBMFF_EXTENSIONS + VTT_EXTENSIONS):
+            continue
+        checked_count += 1
+        checked_bytes += entry.stat().st_size
+        problem = verify_file(entry.path)
+        if problem:
+            problems[entry.name] = problem
+    return checked_count, checked_bytes, problems